@@ -1,7 +1,14 @@
 # The specific endpoint for this data is https://stats.nba.com/stats/playerindex?
-import requests
 import json
+import os
+import sys
+from pathlib import Path
 import pandas as pd
+# Set up the project root directory and append to system path for module imports
+current_working_directory = Path(os.getcwd())
+project_root = current_working_directory.parent
+sys.path.append(str(project_root / 'src'))
+from utils import get_client, result_set_frame
 
 class NBAIDScraper:
     def __init__(self, endpoint: str):
@@ -13,25 +20,18 @@ class NBAIDScraper:
             'LeagueID': '00',
             'TeamID': '0'
         }
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.nba.com/',
-        }
     
     def scraper(self):
-        response = requests.get(
+        # The shared client keeps connections alive and goes through the response cache
+        # when NBA_STATS_CACHE_DIR is set.
+        raw_dict_data = get_client().get_json(
             url     = self.url,
-            params  = self.parameters,
-            headers = self.headers)
-        raw_dict_data = json.loads(response.text)
+            params  = self.parameters)
         return raw_dict_data
     
     def get_data(self):
         raw_dict_data = self.scraper()
-        columns = raw_dict_data['resultSets'][0]['headers']
-        data    = raw_dict_data['resultSets'][0]['rowSet']
-        df      = pd.DataFrame(data = data, columns = columns)
+        df = result_set_frame(raw_dict_data)
         return df
 
 processor = NBAIDScraper('playerindex')
@@ -0,0 +1,453 @@
+"""
+A local stand-in for stats.nba.com serving a synthetic league.
+
+It answers leaguedashlineups, leaguedashplayerstats, playerdashptpass and playerindex in the
+real resultSets / headers / rowSet shape, with injectable latency, 429 throttling and the
+2,000-row truncation of leaguedashlineups, so the scrapers can be load-tested offline:
+
+    python benchmarks/mock_stats_server.py --port 8000 --latency 0.05 --throttle 0.02
+
+and, in another shell (the shared client reads NBA_STATS_BASE_URL):
+
+    NBA_STATS_BASE_URL=http://127.0.0.1:8000/stats python -m lineups_analysis_pipeline scrape lineups
+"""
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+import numpy as np
+import pandas as pd
+
+ROW_CAP = 2000
+DATE_FORMAT = '%m/%d/%Y'
+
+LINEUP_HEADERS = ['GROUP_SET', 'GROUP_ID', 'GROUP_NAME', 'TEAM_ID', 'TEAM_ABBREVIATION',
+                  'GP', 'W', 'L', 'W_PCT', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A',
+                  'FG3_PCT', 'FTM', 'FTA', 'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'TOV', 'STL',
+                  'BLK', 'BLKA', 'PF', 'PFD', 'PTS', 'PLUS_MINUS',
+                  'GP_RANK', 'W_RANK', 'L_RANK', 'MIN_RANK', 'PTS_RANK', 'PLUS_MINUS_RANK']
+PLAYER_STATS_HEADERS = ['PLAYER_ID', 'PLAYER_NAME', 'TEAM_ID', 'TEAM_ABBREVIATION', 'AGE',
+                        'GP', 'W', 'L', 'W_PCT', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A',
+                        'FG3_PCT', 'FTM', 'FTA', 'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'TOV',
+                        'STL', 'BLK', 'PF', 'PTS', 'PLUS_MINUS']
+PASS_HEADERS = ['PLAYER_ID', 'PLAYER_NAME_LAST_FIRST', 'TEAM_ID', 'TEAM_NAME', 'TEAM_ABBREVIATION',
+                'PASS_TYPE', 'G', 'PASS_TEAMMATE_PLAYER_ID', 'PASS_TO', 'FREQUENCY', 'PASS', 'AST',
+                'FGM', 'FGA', 'FG_PCT', 'FG2M', 'FG2A', 'FG2_PCT', 'FG3M', 'FG3A', 'FG3_PCT']
+PLAYER_INDEX_HEADERS = ['PERSON_ID', 'PLAYER_LAST_NAME', 'PLAYER_FIRST_NAME', 'PLAYER_SLUG',
+                        'TEAM_ID', 'TEAM_ABBREVIATION', 'FROM_YEAR', 'TO_YEAR']
+# Counting stats of a stint; GP, W and L count games instead.
+STINT_STATS = ['MIN', 'POSS', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB', 'AST',
+               'TOV', 'STL', 'BLK', 'BLKA', 'PF', 'PFD', 'PLUS_MINUS']
+
+class SyntheticLeague:
+    """
+    A reproducible synthetic league: teams, rosters and a game-by-game log of lineup stints.
+
+    Parameters
+    ----------
+    seasons : list of str
+        Seasons in the format 'YYYY-YY'.
+    n_teams : int
+        The number of teams.
+    roster : int
+        Players per team and season.
+    games : int
+        Games per team and season.
+    lineups : int
+        Distinct five-player lineups a team uses over a season.
+    stints : int
+        Lineups a team uses per game.
+    seed : int
+        The random seed; the same arguments always build the same league.
+    """
+    def __init__(self, seasons=('2021-22',), n_teams=30, roster=15, games=82, lineups=600,
+                 stints=25, seed=0):
+        self.seasons = list(seasons)
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.team_ids = 1610612737 + np.arange(n_teams)
+        self.team_abbreviations = {int(team_id): f'T{i:02d}' for i, team_id in enumerate(self.team_ids)}
+        self.team_names = {int(team_id): f'Team {i:02d}' for i, team_id in enumerate(self.team_ids)}
+        n_players = n_teams * roster + roster
+        self.player_ids = 1_600_000 + np.arange(n_players)
+        self.first_names = {int(player_id): f'First{i}' for i, player_id in enumerate(self.player_ids)}
+        self.last_names = {int(player_id): f'Last{i}' for i, player_id in enumerate(self.player_ids)}
+
+        self.rosters = {}
+        self.lineup_players = {}
+        self.stint_logs = {}
+        for season in self.seasons:
+            # Every season drafts the rosters anew from the player pool.
+            players = rng.permutation(self.player_ids)[:n_teams * roster].reshape(n_teams, roster)
+            self.rosters[season] = {int(team_id): players[i] for i, team_id in enumerate(self.team_ids)}
+            self.stint_logs[season] = self.build_stints(rng, season, players, games, lineups, stints)
+
+    def build_stints(self, rng, season, players, games, lineups, stints):
+        n_teams, roster = players.shape
+        # Each team's pool of lineups: five distinct roster slots, sorted.
+        slots = np.sort(np.argsort(rng.random((n_teams, lineups, roster)), axis=2)[:, :, :5], axis=2)
+        self.lineup_players[season] = np.take_along_axis(players[:, None, :], slots, axis=2)
+
+        start = date(int(season[:4]), 10, 20)
+        team = np.repeat(np.arange(n_teams), games * stints)
+        game = np.tile(np.repeat(np.arange(games), stints), n_teams)
+        # Lineup weights are skewed so a few lineups play most of the minutes.
+        weights = rng.pareto(1.2, (n_teams, lineups)) + 0.01
+        weights /= weights.sum(axis=1, keepdims=True)
+        lineup = np.concatenate([rng.choice(lineups, size=games * stints, p=weights[i])
+                                 for i in range(n_teams)])
+        # Lineups drawn twice into a pool are the same lineup: use the first draw's index.
+        first_draw = np.empty((n_teams, lineups), dtype=int)
+        for i in range(n_teams):
+            _, first, inverse = np.unique(slots[i], axis=0, return_index=True, return_inverse=True)
+            first_draw[i] = first[inverse.ravel()]
+        lineup = first_draw[team, lineup]
+        n = len(team)
+        fga = rng.integers(0, 12, n)
+        fgm = rng.binomial(fga, 0.46)
+        fg3a = rng.binomial(fga, 0.38)
+        fg3m = np.minimum(rng.binomial(fg3a, 0.36), fgm)
+        fta = rng.integers(0, 5, n)
+        stints_df = pd.DataFrame({
+            'team': team,
+            'game': game,
+            'date': np.array([start + timedelta(days=int(d)) for d in range(2 * games + 2)])[2 * game + team % 2],
+            'home': (game + team) % 2 == 0,
+            'win': rng.random(n) < 0.5,
+            'lineup': lineup,
+            'MIN': rng.gamma(2.0, 1.5, n).round(3),
+            'POSS': rng.integers(1, 25, n),
+            'FGM': fgm, 'FGA': fga, 'FG3M': fg3m, 'FG3A': fg3a,
+            'FTM': rng.binomial(fta, 0.77), 'FTA': fta,
+            'OREB': rng.integers(0, 3, n), 'DREB': rng.integers(0, 6, n),
+            'AST': rng.binomial(fgm, 0.6), 'TOV': rng.integers(0, 3, n),
+            'STL': rng.integers(0, 2, n), 'BLK': rng.integers(0, 2, n),
+            'BLKA': rng.integers(0, 2, n), 'PF': rng.integers(0, 3, n),
+            'PFD': rng.integers(0, 3, n), 'PLUS_MINUS': rng.integers(-8, 9, n),
+        })
+        # A team uses each lineup at most once per game.
+        return stints_df.drop_duplicates(['team', 'game', 'lineup']).reset_index(drop=True)
+
+    def player_name(self, player_id, last_first=False):
+        first, last = self.first_names[player_id], self.last_names[player_id]
+        return f'{last}, {first}' if last_first else f'{first} {last}'
+
+    def lineups(self, parameters):
+        """
+        leaguedashlineups: the lineups matching TeamID, Location and DateFrom/DateTo, sorted by
+        minutes, in the Totals, PerGame or Per100Possessions per mode.
+        """
+        season = parameters['Season']
+        stints = self.stint_logs[season]
+        team_id = int(parameters.get('TeamID') or 0)
+        if team_id:
+            stints = stints[stints['team'] == np.searchsorted(self.team_ids, team_id)]
+        location = parameters.get('Location')
+        if location:
+            stints = stints[stints['home'] == (location == 'Home')]
+        if parameters.get('DateFrom'):
+            stints = stints[stints['date'] >= datetime.strptime(parameters['DateFrom'], DATE_FORMAT).date()]
+        if parameters.get('DateTo'):
+            stints = stints[stints['date'] <= datetime.strptime(parameters['DateTo'], DATE_FORMAT).date()]
+
+        df = (stints.assign(GP=1, W=stints['win'].astype(int), L=(~stints['win']).astype(int))
+              .groupby(['team', 'lineup'])[['GP', 'W', 'L'] + STINT_STATS].sum().reset_index())
+        lineup_players = self.lineup_players[season][df['team'].to_numpy(), df['lineup'].to_numpy()]
+        df['GROUP_SET'] = 'Lineups'
+        df['GROUP_ID'] = ['-' + '-'.join(map(str, ids)) + '-' for ids in lineup_players]
+        df['GROUP_NAME'] = [' - '.join(f'{self.first_names[i][0]}. {self.last_names[i]}' for i in ids)
+                            for ids in lineup_players]
+        df['TEAM_ID'] = self.team_ids[df['team'].to_numpy()]
+        df['TEAM_ABBREVIATION'] = df['TEAM_ID'].map(self.team_abbreviations)
+        df['REB'] = df['OREB'] + df['DREB']
+        df['PTS'] = 2 * df['FGM'] + df['FG3M'] + df['FTM']
+
+        df['W_PCT'] = (df['W'] / df['GP']).round(3)
+        for column, (made, attempts) in {'FG_PCT': ('FGM', 'FGA'), 'FG3_PCT': ('FG3M', 'FG3A'),
+                                         'FT_PCT': ('FTM', 'FTA')}.items():
+            df[column] = (df[made] / df[attempts].where(df[attempts] > 0)).fillna(0).round(3)
+        per_mode = parameters.get('PerMode', 'Totals')
+        rates = ['MIN', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB', 'REB', 'AST',
+                 'TOV', 'STL', 'BLK', 'BLKA', 'PF', 'PFD', 'PTS', 'PLUS_MINUS']
+        if per_mode == 'PerGame':
+            df[rates] = df[rates].div(df['GP'], axis=0).round(1)
+        elif per_mode == 'Per100Possessions':
+            df[rates] = df[rates].div(df['POSS'] / 100, axis=0).round(1)
+        elif per_mode != 'Totals':
+            raise ValueError(f'PerMode {per_mode} is not served')
+        for column in ['GP', 'W', 'L', 'MIN', 'PTS', 'PLUS_MINUS']:
+            df[f'{column}_RANK'] = df[column].rank(ascending=column == 'L', method='min').astype(int)
+        return df.sort_values('MIN', ascending=False, kind='stable')[LINEUP_HEADERS]
+
+    def player_stats(self, parameters):
+        """
+        leaguedashplayerstats: every player who appeared in the season, with totals summed
+        from their lineups' stints (divided by five).
+        """
+        season = parameters['Season']
+        stints = self.stint_logs[season]
+        players = self.lineup_players[season][stints['team'].to_numpy(), stints['lineup'].to_numpy()]
+        long = stints.loc[stints.index.repeat(5)].assign(PLAYER_ID=players.ravel())
+        games = long.drop_duplicates(['PLAYER_ID', 'game'])
+        df = pd.DataFrame({'GP': games.groupby('PLAYER_ID').size(),
+                           'W': games.groupby('PLAYER_ID')['win'].sum().astype(int)})
+        totals = long.groupby('PLAYER_ID')[STINT_STATS].sum() / 5
+        df = df.join(totals.round(0).astype(int).drop(columns=['MIN', 'POSS']))
+        df['MIN'] = totals['MIN'].round(3)
+        df = df.reset_index()
+        team_of = {int(player_id): team_id for team_id, roster in self.rosters[season].items()
+                   for player_id in roster}
+        df['TEAM_ID'] = df['PLAYER_ID'].map(team_of)
+        df['TEAM_ABBREVIATION'] = df['TEAM_ID'].map(self.team_abbreviations)
+        df['PLAYER_NAME'] = [self.player_name(int(i)) for i in df['PLAYER_ID']]
+        df['AGE'] = 20 + df['PLAYER_ID'] % 15
+        df['L'] = df['GP'] - df['W']
+        df['W_PCT'] = (df['W'] / df['GP']).round(3)
+        df['REB'] = df['OREB'] + df['DREB']
+        df['PTS'] = 2 * df['FGM'] + df['FG3M'] + df['FTM']
+        for column, (made, attempts) in {'FG_PCT': ('FGM', 'FGA'), 'FG3_PCT': ('FG3M', 'FG3A'),
+                                         'FT_PCT': ('FTM', 'FTA')}.items():
+            df[column] = (df[made] / df[attempts].where(df[attempts] > 0)).fillna(0).round(3)
+        return df[PLAYER_STATS_HEADERS]
+
+    def passes(self, parameters):
+        """
+        playerdashptpass: the passes made by one player to each teammate; no rows when the
+        player did not play the season.
+        """
+        season = parameters['Season']
+        player_id = int(parameters['PlayerID'])
+        team_id = next((team_id for team_id, roster in self.rosters[season].items()
+                        if player_id in roster), None)
+        if team_id is None:
+            return pd.DataFrame(columns=PASS_HEADERS)
+        rng = np.random.default_rng([self.seed, player_id, int(season[:4])])
+        teammates = [int(i) for i in self.rosters[season][team_id] if i != player_id]
+        passes = rng.integers(0, 400, len(teammates))
+        fg2a = rng.binomial(passes, 0.15)
+        fg3a = rng.binomial(passes, 0.1)
+        fg2m = rng.binomial(fg2a, 0.5)
+        fg3m = rng.binomial(fg3a, 0.36)
+        df = pd.DataFrame({
+            'PLAYER_ID': player_id,
+            'PLAYER_NAME_LAST_FIRST': self.player_name(player_id, last_first=True),
+            'TEAM_ID': team_id,
+            'TEAM_NAME': self.team_names[team_id],
+            'TEAM_ABBREVIATION': self.team_abbreviations[team_id],
+            'PASS_TYPE': 'made',
+            'G': int(rng.integers(20, 83)),
+            'PASS_TEAMMATE_PLAYER_ID': teammates,
+            'PASS_TO': [self.player_name(i, last_first=True) for i in teammates],
+            'FREQUENCY': (passes / max(passes.sum(), 1)).round(3),
+            'PASS': passes,
+            'AST': fg2m + fg3m,
+            'FGM': fg2m + fg3m, 'FGA': fg2a + fg3a,
+            'FG2M': fg2m, 'FG2A': fg2a, 'FG3M': fg3m, 'FG3A': fg3a,
+        })
+        for column, (made, attempts) in {'FG_PCT': ('FGM', 'FGA'), 'FG2_PCT': ('FG2M', 'FG2A'),
+                                         'FG3_PCT': ('FG3M', 'FG3A')}.items():
+            df[column] = (df[made] / df[attempts].where(df[attempts] > 0)).round(3)
+        return df.sort_values('PASS', ascending=False)[PASS_HEADERS]
+
+    def player_index(self, parameters):
+        """
+        playerindex: every player of the league with their latest team.
+        """
+        rows = {}
+        for season in self.seasons:
+            for team_id, roster in self.rosters[season].items():
+                for player_id in roster:
+                    first_year = rows.get(int(player_id), {}).get('FROM_YEAR', season[:4])
+                    rows[int(player_id)] = {'FROM_YEAR': first_year, 'TO_YEAR': season[:4],
+                                            'TEAM_ID': team_id}
+        df = pd.DataFrame.from_dict(rows, orient='index').rename_axis('PERSON_ID').reset_index()
+        df['PLAYER_LAST_NAME'] = df['PERSON_ID'].map(self.last_names)
+        df['PLAYER_FIRST_NAME'] = df['PERSON_ID'].map(self.first_names)
+        df['PLAYER_SLUG'] = (df['PLAYER_FIRST_NAME'] + '-' + df['PLAYER_LAST_NAME']).str.lower()
+        df['TEAM_ABBREVIATION'] = df['TEAM_ID'].map(self.team_abbreviations)
+        return df[PLAYER_INDEX_HEADERS]
+
+    # Endpoint -> (method, resultSet name).
+    ENDPOINTS = {
+        'leaguedashlineups': ('lineups', 'Lineups'),
+        'leaguedashplayerstats': ('player_stats', 'LeagueDashPlayerStats'),
+        'playerdashptpass': ('passes', 'PassesMade'),
+        'playerindex': ('player_index', 'PlayerIndex'),
+    }
+
+    def respond(self, endpoint, parameters, row_cap=ROW_CAP):
+        """
+        The JSON response of an endpoint, truncated to row_cap rows like stats.nba.com.
+
+        Raises
+        ------
+        KeyError
+            The endpoint or season is not served.
+        """
+        method, name = self.ENDPOINTS[endpoint]
+        df = getattr(self, method)(parameters)
+        if row_cap is not None and endpoint == 'leaguedashlineups':
+            df = df.head(row_cap)
+        # Plain Python values so the rows serialize as JSON; NaN becomes null.
+        rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+        return {'resource': endpoint, 'parameters': parameters,
+                'resultSets': [{'name': name, 'headers': list(df.columns), 'rowSet': rows}]}
+
+class MockStatsServer:
+    """
+    A threaded HTTP/1.1 (keep-alive) server answering SyntheticLeague requests under /stats/.
+
+    Parameters
+    ----------
+    league : SyntheticLeague
+        The league served.
+    host : str
+        The interface to listen on.
+    port : int
+        The port, 0 picks a free one.
+    latency : float
+        Seconds every response is delayed.
+    jitter : float
+        Mean of an extra exponential delay in seconds, for a long latency tail.
+    throttle : float
+        The probability of answering 429 Too Many Requests.
+    retry_after : int or None
+        The Retry-After seconds sent with a 429.
+    row_cap : int or None
+        Rows of leaguedashlineups kept per response; None serves everything.
+    seed : int, optional
+        Seed of the latency and throttling draws.
+
+    Attributes
+    ----------
+    requests : dict
+        (endpoint, status) -> number of responses.
+    """
+    def __init__(self, league, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, throttle=0.0,
+                 retry_after=1, row_cap=ROW_CAP, seed=None):
+        self.league = league
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.row_cap = row_cap
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.bodies = {}
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/stats'
+
+    def body(self, endpoint, parameters):
+        """
+        The encoded response, built once per distinct request so that the server's own work
+        does not dominate what is measured.
+        """
+        key = (endpoint, tuple(sorted(parameters.items())))
+        body = self.bodies.get(key)
+        if body is None:
+            body = json.dumps(self.league.respond(endpoint, parameters, self.row_cap)).encode()
+            self.bodies[key] = body
+        return body
+
+    def count(self, endpoint, status):
+        with self.lock:
+            self.requests[endpoint, status] = self.requests.get((endpoint, status), 0) + 1
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; without TCP_NODELAY the client's delayed
+            # ACK adds ~40 ms to every response.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, status, body=b'', headers=()):
+                if body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body, compresslevel=1)
+                    headers = (*headers, ('Content-Encoding', 'gzip'))
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+                parameters = dict(parse_qsl(url.query))
+                with mock.lock:
+                    delay = mock.latency + (mock.random.expovariate(1 / mock.jitter) if mock.jitter else 0)
+                    throttled = mock.random.random() < mock.throttle
+                time.sleep(delay)
+                if throttled:
+                    headers = [('Retry-After', str(mock.retry_after))] if mock.retry_after is not None else []
+                    mock.count(endpoint, 429)
+                    return self.send(429, headers=headers)
+                try:
+                    body = mock.body(endpoint, parameters)
+                except (KeyError, ValueError) as error:
+                    mock.count(endpoint, 400)
+                    return self.send(400, json.dumps({'message': str(error)}).encode())
+                mock.count(endpoint, 200)
+                self.send(200, body)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a synthetic league as stats.nba.com.')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--seasons', nargs='+', default=['2021-22'])
+    parser.add_argument('--teams', type=int, default=30)
+    parser.add_argument('--roster', type=int, default=15)
+    parser.add_argument('--lineups', type=int, default=600, help='Distinct lineups per team-season.')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--throttle', type=float, default=0.0, help='Probability of a 429.')
+    parser.add_argument('--row-cap', type=int, default=ROW_CAP)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    league = SyntheticLeague(args.seasons, n_teams=args.teams, roster=args.roster,
+                             lineups=args.lineups, seed=args.seed)
+    server = MockStatsServer(league, port=args.port, latency=args.latency, jitter=args.jitter,
+                             throttle=args.throttle, row_cap=args.row_cap, seed=args.seed)
+    print(f'Serving {len(args.seasons)} season(s) of {args.teams} teams at {server.url}')
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
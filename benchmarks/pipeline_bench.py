@@ -0,0 +1,295 @@
+"""
+Timed and memory-tracked benchmarks of the analysis steps on synthetic leagues of 1, 10 and
+100 times today's volume (see synthetic_project.BASE_VOLUME):
+
+    python benchmarks/pipeline_bench.py --scales 1 10 --output bench.json
+    python benchmarks/pipeline_bench.py --scales 1 --compare bench.json
+
+Every benchmark is run `repeat` times for the wall time and once more under tracemalloc for
+the peak of Python and NumPy allocations. The results are written as JSON with the commit
+and library versions, and --compare prints the time and memory ratios against an earlier
+result file so regressions between versions are visible.
+"""
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import pandas as pd
+# lineups_reg imports statsmodels on the first fit; load it here so no timing includes it.
+import statsmodels.api
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+# EVP reports its progress with tqdm; keep the benchmark output readable.
+os.environ.setdefault('TQDM_DISABLE', '1')
+
+from synthetic_project import SyntheticProject
+from utils import LineupKeyCodec, group_ids_to_array
+from models import (formatted_reg_model, regression_table, OLSSweep, all_specifications,
+                    ClusterInference)
+from lineups_analysis_pipeline.evp import EVP
+from lineups_analysis_pipeline.rapm import lineup_ratings, fit_seasons
+from lineups_analysis_pipeline.lineups_processors import (PlayerIdentityResolver, PassIndex,
+                                                          lineup_player_bridge, join_player_features,
+                                                          process_lineups)
+from lineups_analysis_pipeline.lineups_reg import (REGRESSIONS, BOX_SCORE_COLUMNS,
+                                                   prepare_regression_data, fit_regressions)
+
+def measure(function, repeat=3, memory=True):
+    """
+    Wall times of `repeat` calls and the tracemalloc peak of one more call, in MB.
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return seconds, peak_mb
+
+def prepare(project, workdir):
+    """
+    The inputs of every benchmark, built from the synthetic project with the pipeline's own
+    functions: the Per100Possessions lineups for EVP, the RAPM tables and pass data keyed the
+    way process_lineups keys them, and the regression dataset as lineups_reg reads it.
+    """
+    lineups_100poss = project.lineups('Per100Possessions')
+    players_id = project.players_id()
+    ratings = project.player_ratings()
+    pass_data = project.pass_data()
+    pass_data['per_PASS'] = pass_data['PASS'].div(pass_data['G'], axis=0)
+    season_players = {int(season[:2] + season[-2:]): ids
+                      for season, ids in project.season_players().items()}
+
+    group_apm = project.group_apm()
+    names = dict(zip(players_id['player_id'], players_id['player']))
+    codec = LineupKeyCodec(group_ids_to_array(lineups_100poss['GROUP_ID']).ravel())
+    lineups_100poss['lineup_key'] = codec.encode_group_ids(lineups_100poss['GROUP_ID'])
+    # The regression dataset keeps the lineups of the group APM table, as process_lineups does.
+    appearances = np.round(project.possessions()).astype('int64')
+    dataset = lineups_100poss[appearances >= 800].reset_index(drop=True)
+    dataset = dataset.assign(Appearances=group_apm['Appearances'].to_numpy(),
+                             APM=group_apm['APM'].to_numpy())
+    dataset[[f'player_{i}' for i in range(1, 6)]] = (
+        pd.DataFrame(codec.decode(dataset['lineup_key'])).apply(lambda ids: ids.map(names)).to_numpy())
+    dataset['season'] = dataset['year'].apply(lambda x: f'{x-1}-{str(x)[-2:]}')
+    bridge = lineup_player_bridge(dataset, codec)
+    features = ratings.assign(player_id=ratings['Player'].map({v: k for k, v in names.items()}))
+    dataset = pd.concat([dataset, join_player_features(bridge, features, ['RAPM'], aggs=['sum'])], axis=1)
+    pass_out = PassIndex(pass_data).pass_out(dataset['season'], dataset['team'],
+                                             dataset[[f'player_{i}' for i in range(1, 6)]].to_numpy())
+    dataset['std_pass_out'] = pd.DataFrame(pass_out).std(axis=1)
+    dataset.to_csv(Path(workdir) / '(new) all_100poss_lineups_data.csv', index=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        regression_df = prepare_regression_data(workdir)
+
+    return {
+        'lineups_100poss': lineups_100poss.drop(columns='lineup_key'),
+        'totals': project.totals,
+        'players_id': players_id,
+        'ratings': ratings,
+        'season_players': season_players,
+        'pass_data': pass_data,
+        'dataset': dataset,
+        'codec': codec,
+        'regression_df': regression_df,
+    }
+
+def benchmarks(inputs, sweep_size=3, n_boot=999):
+    """
+    {benchmark name: (zero-argument callable, rows processed)}.
+    """
+    def evp():
+        EVP(inputs['lineups_100poss'].copy(), 9, 'PLUS_MINUS').clean_data()
+
+    def pass_out():
+        dataset = inputs['dataset']
+        PassIndex(inputs['pass_data']).pass_out(dataset['season'], dataset['team'],
+                                                dataset[[f'player_{i}' for i in range(1, 6)]].to_numpy())
+
+    def rapm_merge():
+        # process_lineups' RAPM join: resolve the rating names, then one bridge-table merge.
+        ratings = inputs['ratings'].copy()
+        resolver = PlayerIdentityResolver(inputs['players_id'], season_players=inputs['season_players'])
+        ratings['player_id'] = resolver.resolve_names(ratings['Player'], ratings['year'])
+        bridge = lineup_player_bridge(inputs['dataset'], inputs['codec'])
+        join_player_features(bridge, ratings, ['RAPM'], aggs=['sum'])
+
+    def rapm_fit():
+        fit_seasons(lineup_ratings(inputs['totals']), min_possessions=1200)
+
+    def regressions():
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = fit_regressions(inputs['regression_df'], REGRESSIONS)
+        {name: formatted_reg_model(result) for name, result in results.items()}
+        regression_table(results)
+
+    def ols_sweep():
+        sweep = OLSSweep(inputs['regression_df'], 'PM_minus_RAPM', ['const', *BOX_SCORE_COLUMNS])
+        sweep.fit(all_specifications(BOX_SCORE_COLUMNS, max_size=sweep_size))
+
+    def cluster_bootstrap():
+        df = inputs['regression_df']
+        _, regressors = REGRESSIONS['team_effect']
+        inference = ClusterInference(df[regressors], df['PM_minus_RAPM'],
+                                     df['team'] + ' ' + df['year'].astype(str))
+        inference.result('CR2')
+        inference.wild_bootstrap(n_boot, seed=0)
+
+    n_lineups = len(inputs['lineups_100poss'])
+    n_dataset = len(inputs['dataset'])
+    return {
+        'evp.clean_data': (evp, n_lineups),
+        'pass_out': (pass_out, n_dataset),
+        'rapm_merge': (rapm_merge, n_dataset),
+        'rapm_fit': (rapm_fit, len(inputs['totals'])),
+        'regressions': (regressions, len(inputs['regression_df'])),
+        'ols_sweep': (ols_sweep, len(inputs['regression_df'])),
+        'cluster_bootstrap': (cluster_bootstrap, len(inputs['regression_df'])),
+    }
+
+def process_benchmark(project, workdir):
+    """
+    process_lineups end to end on the data folder written by the project; the lineups
+    reader's columnar cache is built by the first call and reused by the timed ones.
+    """
+    data_dir = project.write(workdir)
+    def process():
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_lineups(data_dir)
+    process()
+    return process, len(project.totals)
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import scipy
+    import statsmodels
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'scipy': scipy.__version__,
+            'statsmodels': statsmodels.__version__, 'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def run(scales, repeat=3, memory=True, names=None, end_to_end=10, seed=0, **volume):
+    """
+    Run the benchmarks at every scale.
+
+    Parameters
+    ----------
+    scales : list of float
+        Multiples of today's volume.
+    repeat : int
+        Timed calls per benchmark.
+    memory : bool
+        Also measure the tracemalloc peak.
+    names : list of str, optional
+        Benchmarks to run, all by default ('process_lineups' included).
+    end_to_end : float
+        The largest scale process_lineups runs at; it writes the JSON lineups to disk.
+    seed : int
+        Seed of the synthetic league.
+    **volume
+        Overrides of synthetic_project.BASE_VOLUME and pass_density.
+
+    Returns
+    -------
+    list of dict
+        One record per benchmark and scale.
+    """
+    records = []
+    for scale in scales:
+        start = time.perf_counter()
+        project = SyntheticProject.at_scale(scale, seed=seed, **volume)
+        with tempfile.TemporaryDirectory() as workdir:
+            inputs = prepare(project, workdir)
+            generated = time.perf_counter() - start
+            print(f'scale {scale:g}: {len(project.totals)} lineups generated in {generated:.1f}s',
+                  file=sys.stderr)
+            cases = benchmarks(inputs)
+            if (names is None or 'process_lineups' in names) and scale <= end_to_end:
+                cases['process_lineups'] = process_benchmark(project, Path(workdir) / 'project')
+            for name, (function, rows) in cases.items():
+                if names is not None and name not in names:
+                    continue
+                seconds, peak_mb = measure(function, repeat, memory)
+                records.append({'benchmark': name, 'scale': scale, 'lineups': len(project.totals),
+                                'rows': rows, 'seconds': float(np.median(seconds)),
+                                'seconds_min': min(seconds), 'repeat': repeat, 'peak_mb': peak_mb})
+                print(f"  {name:<20}{records[-1]['seconds']:>10.3f}s"
+                      + (f'{peak_mb:>10.1f} MB' if peak_mb is not None else ''), file=sys.stderr)
+    return records
+
+def compare(results, baseline):
+    """
+    Time and memory ratios of results against a baseline result file, matched on
+    benchmark and scale (above 1 is slower or larger).
+    """
+    current = pd.DataFrame(results['results']).set_index(['benchmark', 'scale'])
+    previous = pd.DataFrame(baseline['results']).set_index(['benchmark', 'scale'])
+    joined = current.join(previous, rsuffix='_baseline', how='inner')
+    return pd.DataFrame({'seconds': joined['seconds'],
+                         'seconds_baseline': joined['seconds_baseline'],
+                         'time_ratio': joined['seconds'] / joined['seconds_baseline'],
+                         'peak_mb': joined['peak_mb'],
+                         'memory_ratio': joined['peak_mb'] / joined['peak_mb_baseline']})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the analysis steps on synthetic leagues.')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                        help="Multiples of today's volume.")
+    parser.add_argument('--benchmarks', nargs='+',
+                        choices=['evp.clean_data', 'pass_out', 'rapm_merge', 'rapm_fit', 'regressions',
+                                 'ols_sweep', 'cluster_bootstrap', 'process_lineups'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc run.')
+    parser.add_argument('--end-to-end', type=float, default=10,
+                        help='Largest scale process_lineups runs at (it writes the JSON lineups).')
+    parser.add_argument('--seasons', type=int)
+    parser.add_argument('--roster', type=int)
+    parser.add_argument('--lineups', type=int, help='Lineups per team-season.')
+    parser.add_argument('--pass-density', type=float)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='Write the results as JSON.')
+    parser.add_argument('--compare', type=Path, help='An earlier result file to compare with.')
+    args = parser.parse_args(argv)
+
+    volume = {key: value for key, value in [('seasons', args.seasons), ('roster', args.roster),
+                                            ('lineups', args.lineups),
+                                            ('pass_density', args.pass_density)]
+              if value is not None}
+    records = run(args.scales, repeat=args.repeat, memory=not args.no_memory, names=args.benchmarks,
+                  end_to_end=args.end_to_end, seed=args.seed, **volume)
+    results = {'environment': environment(),
+               'config': {'scales': args.scales, 'repeat': args.repeat, 'seed': args.seed, **volume},
+               'results': records}
+    print(pd.DataFrame(records).to_string(index=False, float_format=lambda value: f'{value:.3f}'))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(compare(results, baseline).to_string(float_format=lambda value: f'{value:.2f}'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Load benchmark of the four scraper classes against the local stats.nba.com stand-in.
+
+Every scraper class scrapes a batch of units (a season, team-season or player-season) from
+a MockStatsServer through a thread pool, for each concurrency level, and reports throughput
+and latency percentiles per unit (retries of throttled requests included):
+
+    python benchmarks/scraper_load.py --concurrency 1 4 16 --latency 0.02 --throttle 0.05
+    python benchmarks/scraper_load.py --cache --output scraper_load.json
+"""
+import sys
+import json
+import time
+import tempfile
+import argparse
+import importlib.util
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import utils
+from utils.stats_client import STATS_URL
+from mock_stats_server import SyntheticLeague, MockStatsServer
+from pass_data_analysis_pipeline.pass_to_scraper import NBAPassScraper, retry_delay
+from pass_data_analysis_pipeline.players_data_scraper import NBAScraper
+from lineups_analysis_pipeline.lineups_scraper import NBALineupsScraper
+
+def load_id_scraper():
+    """
+    NBAIDScraper lives in a script that scrapes playerindex when imported, so it is loaded
+    from its file once the shared client points at the stand-in.
+    """
+    spec = importlib.util.spec_from_file_location('players_id_scraper',
+                                                  ROOT / 'NBA_ID' / 'players_id_scraper.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.NBAIDScraper
+
+def scraper_units(league, id_scraper):
+    """
+    {scraper class name: [zero-argument callables, one per unit]} covering the league.
+    """
+    player_stats = {'LeagueID': '00', 'MeasureType': 'Base', 'PerMode': 'Totals',
+                    'SeasonType': 'Regular Season'}
+    return {
+        'NBAIDScraper': [lambda: id_scraper('playerindex').get_data()],
+        'NBAScraper': [lambda season=season: NBAScraper('leaguedashplayerstats',
+                                                        {**player_stats, 'Season': season}).get_data()
+                       for season in league.seasons],
+        'NBALineupsScraper': [lambda season=season, team_id=int(team_id):
+                              NBALineupsScraper('5', season, team_id, 'Per100Possessions').clean_data()
+                              for season in league.seasons for team_id in league.team_ids],
+        'NBAPassScraper': [lambda season=season, player_id=int(player_id):
+                           NBAPassScraper(season, player_id).clean_data()
+                           for season in league.seasons
+                           for roster in league.rosters[season].values() for player_id in roster],
+    }
+
+def run_units(units, concurrency, max_retries=5, backoff=0.05):
+    """
+    Run the units on `concurrency` threads, retrying throttled or failed requests like the
+    asynchronous pass scraper does.
+
+    Returns
+    -------
+    latencies : list of float
+        Seconds per completed unit, retries included.
+    errors : int
+        Units that failed after every retry.
+    seconds : float
+        Wall time of the batch.
+    """
+    def run(unit):
+        start = time.perf_counter()
+        for attempt in range(max_retries + 1):
+            try:
+                unit()
+                return time.perf_counter() - start
+            except Exception as error:
+                delay = retry_delay(error, attempt, backoff)
+                if delay is None or attempt == max_retries:
+                    return None
+                time.sleep(delay)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(run, units))
+    seconds = time.perf_counter() - start
+    latencies = [result for result in results if result is not None]
+    return latencies, len(results) - len(latencies), seconds
+
+def check_cache_keys(server):
+    """
+    Check that responses fetched from the stand-in are cached under its own URL, so an offline
+    replay of the real stats.nba.com URL never returns synthetic data.
+    """
+    params = {'LeagueID': '00', 'Season': server.league.seasons[0]}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        utils.set_response_cache(utils.ResponseCache(cache_dir))
+        utils.NBAStatsClient(base_url=server.url).get_content(f'{STATS_URL}/playerindex', params)
+        utils.set_response_cache(utils.ResponseCache(cache_dir, offline=True))
+        try:
+            utils.NBAStatsClient().get_content(f'{STATS_URL}/playerindex', params)
+        except utils.CacheMissError:
+            pass
+        else:
+            raise AssertionError('a stand-in response was cached under the stats.nba.com URL')
+        finally:
+            utils.set_response_cache(None)
+
+def benchmark(league, server, concurrencies, n_units, cache=False, scrapers=None):
+    """
+    Benchmark every scraper class at every concurrency level.
+
+    Parameters
+    ----------
+    league : SyntheticLeague
+        The league served by server.
+    server : MockStatsServer
+        A started stand-in server.
+    concurrencies : list of int
+        Threads used for the units.
+    n_units : int
+        Units per scraper and run; the league's units are repeated when there are fewer.
+    cache : bool
+        Run every configuration twice through a fresh ResponseCache, reported as 'cold' and
+        'warm'.
+    scrapers : list of str, optional
+        Scraper class names to run, all by default.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per scraper, concurrency and cache state.
+    """
+    if cache:
+        check_cache_keys(server)
+    utils.set_client(utils.NBAStatsClient(base_url=server.url, pool_size=max(concurrencies)))
+    all_units = scraper_units(league, load_id_scraper())
+    rows = []
+    for name, units in all_units.items():
+        if scrapers and name not in scrapers:
+            continue
+        units = [units[i % len(units)] for i in range(n_units)]
+        for concurrency in concurrencies:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                utils.set_response_cache(utils.ResponseCache(cache_dir) if cache else None)
+                for state in (['cold', 'warm'] if cache else ['none']):
+                    before = dict(server.requests)
+                    latencies, errors, seconds = run_units(units, concurrency)
+                    served = {key: count - before.get(key, 0) for key, count in server.requests.items()}
+                    latencies_ms = 1000 * np.array(latencies or [np.nan])
+                    rows.append({
+                        'scraper': name,
+                        'concurrency': concurrency,
+                        'cache': state,
+                        'units': len(units),
+                        'errors': errors,
+                        'requests': sum(served.values()),
+                        'throttled': sum(count for (_, status), count in served.items() if status == 429),
+                        'seconds': seconds,
+                        'units_per_s': len(latencies) / seconds,
+                        'p50_ms': np.percentile(latencies_ms, 50),
+                        'p95_ms': np.percentile(latencies_ms, 95),
+                        'p99_ms': np.percentile(latencies_ms, 99),
+                        'max_ms': latencies_ms.max(),
+                    })
+    utils.set_response_cache(None)
+    return pd.DataFrame(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the scrapers against a local stand-in.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--units', type=int, default=100, help='Units per scraper and run.')
+    parser.add_argument('--scrapers', nargs='+',
+                        choices=['NBAIDScraper', 'NBAScraper', 'NBALineupsScraper', 'NBAPassScraper'])
+    parser.add_argument('--seasons', nargs='+', default=['2021-22'])
+    parser.add_argument('--teams', type=int, default=30)
+    parser.add_argument('--lineups', type=int, default=600, help='Distinct lineups per team-season.')
+    parser.add_argument('--latency', type=float, default=0.02, help='Server delay per request.')
+    parser.add_argument('--jitter', type=float, default=0.01, help='Mean extra exponential delay.')
+    parser.add_argument('--throttle', type=float, default=0.0, help='Probability of a 429.')
+    parser.add_argument('--row-cap', type=int, default=2000)
+    parser.add_argument('--cache', action='store_true', help='Also measure a warm response cache.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='Write the results as JSON records.')
+    args = parser.parse_args(argv)
+
+    league = SyntheticLeague(args.seasons, n_teams=args.teams, lineups=args.lineups, seed=args.seed)
+    with MockStatsServer(league, latency=args.latency, jitter=args.jitter, throttle=args.throttle,
+                         retry_after=0, row_cap=args.row_cap, seed=args.seed) as server:
+        results = benchmark(league, server, args.concurrency, args.units, cache=args.cache,
+                            scrapers=args.scrapers)
+    print(results.to_string(index=False, float_format=lambda value: f'{value:.2f}'))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results.to_dict(orient='records'), f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+"""
+A synthetic league written in the exact shapes the pipeline reads, so EVP, lineups_processors,
+the RAPM fit and lineups_reg can run and be benchmarked without the LFS lineup blobs.
+
+SyntheticProject draws rosters, five-player lineups with box scores driven by hidden player
+ratings, a pass graph of configurable density and the RAPM tables, all from one seed:
+
+    python benchmarks/synthetic_project.py /tmp/nba_synthetic --scale 10
+    cd src && python -m lineups_analysis_pipeline process --data-root /tmp/nba_synthetic/data
+
+SyntheticLeague in mock_stats_server.py plays out games stint by stint to serve stats.nba.com
+responses; this generator draws the season aggregates directly, so 100 times today's volume
+stays cheap to build.
+"""
+import json
+import argparse
+from pathlib import Path
+from itertools import combinations
+import numpy as np
+import pandas as pd
+
+# Today's volume: nine seasons of 30 teams, 15-man rosters and 300 lineups per team-season.
+BASE_VOLUME = {'seasons': 9, 'n_teams': 30, 'roster': 15, 'lineups': 300}
+
+# Columns of a leaguedashlineups row, as stored in lineups_data/5lineups_*.json.
+LINEUP_COLUMNS = ['GROUP_SET', 'GROUP_ID', 'GROUP_NAME', 'TEAM_ID', 'TEAM_ABBREVIATION', 'GP', 'W',
+                  'L', 'W_PCT', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT', 'FTM',
+                  'FTA', 'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'PF', 'PTS',
+                  'PLUS_MINUS']
+# Stats divided by possessions in the Per100Possessions mode.
+RATE_COLUMNS = ['MIN', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB', 'REB', 'AST',
+                'TOV', 'STL', 'BLK', 'PF', 'PTS', 'PLUS_MINUS']
+# Columns of pass_data_14_22.csv, as written by scrape_pass_data.
+PASS_COLUMNS = ['season', 'PLAYER_ID', 'PLAYER_NAME_LAST_FIRST', 'TEAM_ID', 'TEAM_NAME',
+                'TEAM_ABBREVIATION', 'PASS_TYPE', 'G', 'PASS_TEAMMATE_PLAYER_ID', 'PASS_TO',
+                'FREQUENCY', 'PASS', 'AST', 'FGM', 'FGA', 'FG_PCT', 'FG2M', 'FG2A', 'FG2_PCT',
+                'FG3M', 'FG3A', 'FG3_PCT']
+
+def percentage(made, attempts):
+    return np.round(np.divide(made, attempts, out=np.zeros(len(made)), where=attempts > 0), 3)
+
+class SyntheticProject:
+    """
+    A reproducible synthetic league in the shapes of the project's data folder.
+
+    Parameters
+    ----------
+    seasons : int
+        Number of seasons, ending with last_season.
+    n_teams : int
+        Teams per season.
+    roster : int
+        Players per team and season.
+    lineups : int
+        Distinct five-player lineups a team uses per season (at most roster choose 5).
+    pass_density : float
+        Probability that a player passes to a given teammate at all during a season.
+    last_season : int
+        The starting year of the last season, 2021 for '2021-22'. Seasons starting in a
+        year ending in 99 are skipped: the pipeline turns '1999-00' into the year 1900.
+    seed : int
+        The random seed; the same arguments always build the same league.
+    """
+    def __init__(self, seasons=9, n_teams=30, roster=15, lineups=300, pass_density=0.8,
+                 last_season=2021, seed=0):
+        rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.pass_density = pass_density
+        years = [year for year in range(last_season, 0, -1) if year % 100 != 99][:seasons]
+        self.seasons = [f'{year}-{str(year + 1)[-2:]}' for year in reversed(years)]
+        self.team_ids = 1610612737 + np.arange(n_teams)
+        self.team_names = np.array([f'Team {i:04d}' for i in range(n_teams)], dtype=object)
+        self.team_abbreviations = np.array([f'T{i:04d}' for i in range(n_teams)], dtype=object)
+        self.player_ids = 1_600_000 + np.arange((n_teams + 1) * roster)
+        self.names = {int(player_id): f'First{i} Last{i}' for i, player_id in enumerate(self.player_ids)}
+        self.short_names = {int(player_id): f'F. Last{i}' for i, player_id in enumerate(self.player_ids)}
+        # Hidden net ratings per 100 possessions that drive the lineups' plus-minus.
+        self.quality = dict(zip(self.player_ids.tolist(), rng.normal(0, 2.5, len(self.player_ids))))
+
+        combos = np.array(list(combinations(range(roster), 5)))
+        n_lineups = min(lineups, len(combos))
+        self.rosters = {}
+        frames = []
+        for season in self.seasons:
+            # Every season drafts the rosters anew from the player pool.
+            rosters = rng.permutation(self.player_ids)[:n_teams * roster].reshape(n_teams, roster)
+            self.rosters[season] = rosters
+            picks = np.stack([rng.choice(len(combos), n_lineups, replace=False) for _ in range(n_teams)])
+            players = np.take_along_axis(rosters[:, None, :], combos[picks], axis=2).reshape(-1, 5)
+            frames.append(self.box_scores(rng, season, np.repeat(np.arange(n_teams), n_lineups), players))
+        self.totals = pd.concat(frames, ignore_index=True)
+
+    def box_scores(self, rng, season, teams, players):
+        """
+        Season totals of the lineups: minutes are heavy-tailed, counting stats follow the
+        possessions and plus-minus follows the five players' hidden ratings.
+        """
+        n = len(players)
+        minutes = np.minimum(rng.pareto(1.1, n) * 15 + 0.5, 1500).round(3)
+        possessions = minutes * 2.05
+        fga = rng.poisson(possessions * 0.88)
+        fgm = rng.binomial(fga, 0.46)
+        fg3a = rng.binomial(fga, 0.38)
+        fg3m = np.minimum(rng.binomial(fg3a, 0.36), fgm)
+        fta = rng.poisson(possessions * 0.25)
+        ftm = rng.binomial(fta, 0.77)
+        oreb = rng.poisson(possessions * 0.10)
+        dreb = rng.poisson(possessions * 0.33)
+        quality = np.vectorize(self.quality.get)(players).sum(axis=1)
+        gp = np.clip(np.ceil(minutes / rng.uniform(2, 8, n)), 1, 82).astype(int)
+        wins = rng.binomial(gp, 1 / (1 + np.exp(-quality / 10)))
+        df = pd.DataFrame({
+            'GROUP_SET': 'Lineups',
+            'GROUP_ID': ['-' + '-'.join(map(str, ids)) + '-' for ids in players.tolist()],
+            'GROUP_NAME': [' - '.join(self.short_names[i] for i in ids) for ids in players.tolist()],
+            'TEAM_ID': self.team_ids[teams],
+            'TEAM_ABBREVIATION': self.team_abbreviations[teams],
+            'GP': gp, 'W': wins, 'L': gp - wins, 'W_PCT': np.round(wins / gp, 3),
+            'MIN': minutes,
+            'FGM': fgm, 'FGA': fga, 'FG_PCT': percentage(fgm, fga),
+            'FG3M': fg3m, 'FG3A': fg3a, 'FG3_PCT': percentage(fg3m, fg3a),
+            'FTM': ftm, 'FTA': fta, 'FT_PCT': percentage(ftm, fta),
+            'OREB': oreb, 'DREB': dreb, 'REB': oreb + dreb,
+            'AST': rng.binomial(fgm, 0.6), 'TOV': rng.poisson(possessions * 0.13),
+            'STL': rng.poisson(possessions * 0.08), 'BLK': rng.poisson(possessions * 0.05),
+            'PF': rng.poisson(possessions * 0.19),
+            'PTS': 2 * fgm + fg3m + ftm,
+            'PLUS_MINUS': np.round(rng.normal(quality * possessions / 100, 1.2 * np.sqrt(possessions))),
+        })
+        df['year'] = int(season[:2] + season[-2:])
+        df['team'] = self.team_names[teams]
+        return df
+
+    def lineups(self, per_mode='Totals'):
+        """
+        The lineups of every season as read_lineups_df returns them.
+
+        Parameters
+        ----------
+        per_mode : str
+            'Totals' or 'Per100Possessions'.
+
+        Returns
+        -------
+        pandas.DataFrame
+            LINEUP_COLUMNS plus 'year' (e.g. 2014 for 2013-14) and 'team'.
+        """
+        df = self.totals.copy()
+        if per_mode == 'Per100Possessions':
+            possessions = df['FGA'] - df['OREB'] + df['TOV'] + 0.44 * df['FTA']
+            df[RATE_COLUMNS] = df[RATE_COLUMNS].astype(float).div(possessions.clip(lower=1) / 100, axis=0).round(1)
+        elif per_mode != 'Totals':
+            raise ValueError(f'Unknown per mode: {per_mode!r}')
+        return df
+
+    def lineups_json(self, per_mode='Totals'):
+        """
+        The lineups as the scraped JSON, {season: {team: {column: {row: value}}}}.
+        """
+        df = self.lineups(per_mode)
+        data = {season: {} for season in self.seasons}
+        for (year, team), team_df in df.groupby(['year', 'team'], sort=False):
+            season = f'{year - 1}-{str(year)[-2:]}'
+            data[season][team] = team_df[LINEUP_COLUMNS].reset_index(drop=True).to_dict()
+        return data
+
+    def players_id(self):
+        return pd.DataFrame({'player_id': self.player_ids,
+                             'player': [self.names[int(i)] for i in self.player_ids]})
+
+    def season_players(self):
+        """
+        {season: {player ID: name}} of the rostered players, as season_players_id_14_22.json.
+        """
+        return {season: {str(i): self.names[int(i)] for i in rosters.ravel()}
+                for season, rosters in self.rosters.items()}
+
+    def pass_data(self):
+        """
+        Passes made between teammates, as pass_data_14_22.csv: every pair of teammates is
+        linked with probability pass_density.
+        """
+        rng = np.random.default_rng([self.seed, 1])
+        frames = []
+        for season, rosters in self.rosters.items():
+            n_teams, roster = rosters.shape
+            passer, receiver = np.nonzero(~np.eye(roster, dtype=bool))
+            team = np.repeat(np.arange(n_teams), len(passer))
+            passer_ids = rosters[team, np.tile(passer, n_teams)]
+            receiver_ids = rosters[team, np.tile(receiver, n_teams)]
+            linked = rng.random(len(team)) < self.pass_density
+            team, passer_ids, receiver_ids = team[linked], passer_ids[linked], receiver_ids[linked]
+            passes = rng.poisson(rng.gamma(1.5, 60, len(team)))
+            fg2a = rng.binomial(passes, 0.15)
+            fg3a = rng.binomial(passes, 0.1)
+            fg2m = rng.binomial(fg2a, 0.5)
+            fg3m = rng.binomial(fg3a, 0.36)
+            games = dict(zip(rosters.ravel().tolist(), rng.integers(20, 83, rosters.size).tolist()))
+            df = pd.DataFrame({
+                'season': season,
+                'PLAYER_ID': passer_ids,
+                'PLAYER_NAME_LAST_FIRST': [self.names[i] for i in passer_ids.tolist()],
+                'TEAM_ID': self.team_ids[team],
+                'TEAM_NAME': self.team_names[team],
+                'TEAM_ABBREVIATION': self.team_abbreviations[team],
+                'PASS_TYPE': 'made',
+                'G': [games[i] for i in passer_ids.tolist()],
+                'PASS_TEAMMATE_PLAYER_ID': receiver_ids,
+                'PASS_TO': [self.names[i] for i in receiver_ids.tolist()],
+                'PASS': passes,
+                'AST': fg2m + fg3m, 'FGM': fg2m + fg3m, 'FGA': fg2a + fg3a,
+                'FG_PCT': percentage(fg2m + fg3m, fg2a + fg3a),
+                'FG2M': fg2m, 'FG2A': fg2a, 'FG2_PCT': percentage(fg2m, fg2a),
+                'FG3M': fg3m, 'FG3A': fg3a, 'FG3_PCT': percentage(fg3m, fg3a),
+            })
+            totals = df.groupby('PLAYER_ID')['PASS'].transform('sum')
+            df['FREQUENCY'] = np.round(df['PASS'] / totals.clip(lower=1), 3)
+            frames.append(df[PASS_COLUMNS])
+        return pd.concat(frames, ignore_index=True)
+
+    def possessions(self):
+        """
+        Possessions of every lineup at both ends, the 'Appearances' of the RAPM tables.
+        """
+        df = self.totals
+        return 2 * (df['FGA'] - df['OREB'] + df['TOV'] + 0.44 * df['FTA']).to_numpy()
+
+    def player_ratings(self):
+        """
+        Player APM and RAPM per season, as RAPM_data/adj_apm_rapm_14_22.csv: the hidden
+        ratings plus noise, with the players' possessions as 'Appearances'.
+        """
+        rng = np.random.default_rng([self.seed, 2])
+        players = self.totals['GROUP_ID'].str.strip('-').str.split('-', expand=True).astype('int64')
+        long = pd.DataFrame({'year': np.repeat(self.totals['year'].to_numpy(), 5),
+                             'player_id': players.to_numpy().ravel(),
+                             'Appearances': np.repeat(self.possessions(), 5)})
+        df = long.groupby(['year', 'player_id'], sort=False)['Appearances'].sum().reset_index()
+        quality = df['player_id'].map(self.quality).to_numpy()
+        return pd.DataFrame({'Player': df['player_id'].map(self.names),
+                             'APM': quality + rng.normal(0, 3, len(df)),
+                             'Appearances': np.round(df['Appearances']).astype('int64'),
+                             'RAPM': 0.4 * quality + rng.normal(0, 0.5, len(df)),
+                             'year': df['year']})
+
+    def group_apm(self, min_appearances=800):
+        """
+        Lineup APM, as RAPM_data/group_apm_14_22_800possup.csv, for the lineups with at least
+        min_appearances possessions.
+        """
+        rng = np.random.default_rng([self.seed, 3])
+        players = self.totals['GROUP_ID'].str.strip('-').str.split('-', expand=True).astype('int64')
+        quality = np.vectorize(self.quality.get)(players.to_numpy()).sum(axis=1)
+        df = pd.DataFrame({
+            'Group': [str(tuple(sorted(self.names[i] for i in ids)))
+                      for ids in players.to_numpy().tolist()],
+            'APM': quality + rng.normal(0, 4, len(players)),
+            'Appearances': np.round(self.possessions()).astype('int64'),
+            'year': self.totals['year'],
+        })
+        return df[df['Appearances'] >= min_appearances].reset_index(drop=True)
+
+    def write(self, root, min_appearances=800):
+        """
+        Write the data folder the pipeline reads under root/data.
+
+        Returns
+        -------
+        pathlib.Path
+            The data folder, to pass as --data-root.
+        """
+        data_dir = Path(root) / 'data'
+        (data_dir / 'lineups_data').mkdir(parents=True, exist_ok=True)
+        (data_dir / 'RAPM_data').mkdir(exist_ok=True)
+        for per_mode, name in [('Totals', 'totals'), ('Per100Possessions', '100poss')]:
+            with open(data_dir / 'lineups_data' / f'5lineups_{name}.json', 'w') as f:
+                json.dump(self.lineups_json(per_mode), f)
+        self.players_id().to_csv(data_dir / 'players_id.csv', index=False)
+        pd.DataFrame(columns=['version', 'alias', 'player_id', 'player', 'note']).to_csv(
+            data_dir / 'player_aliases.csv', index=False)
+        with open(data_dir / 'season_players_id_14_22.json', 'w') as f:
+            json.dump(self.season_players(), f)
+        self.pass_data().to_csv(data_dir / 'pass_data_14_22.csv', index=False)
+        self.player_ratings().to_csv(data_dir / 'RAPM_data' / 'adj_apm_rapm_14_22.csv', index=False)
+        self.group_apm(min_appearances).to_csv(data_dir / 'RAPM_data' / 'group_apm_14_22_800possup.csv',
+                                               index=False)
+        return data_dir
+
+    @classmethod
+    def at_scale(cls, scale, **options):
+        """
+        A league with scale times today's volume (BASE_VOLUME), scaled by the number of
+        seasons; the player pool stays small enough for the packed lineup keys.
+        """
+        volume = {**BASE_VOLUME, **options}
+        volume['seasons'] = max(1, int(round(volume['seasons'] * scale)))
+        return cls(**volume)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic data folder for the pipeline.')
+    parser.add_argument('root', type=Path, help='The project folder; the data goes to ROOT/data.')
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiple of today's volume.")
+    parser.add_argument('--seasons', type=int, default=BASE_VOLUME['seasons'])
+    parser.add_argument('--roster', type=int, default=BASE_VOLUME['roster'])
+    parser.add_argument('--lineups', type=int, default=BASE_VOLUME['lineups'])
+    parser.add_argument('--pass-density', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    project = SyntheticProject.at_scale(args.scale, seasons=args.seasons, roster=args.roster,
+                                        lineups=args.lineups, pass_density=args.pass_density,
+                                        seed=args.seed)
+    print(project.write(args.root))
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
-from .models import *
-from .lineups_analysis_pipeline import *
-from .pass_data_analysis_pipeline import *
-from .utils import *
+import importlib
 
 __all__ = ['models', 'lineups_analysis_pipeline', 'pass_data_analysis_pipeline', 'utils']
+
+# Subpackages are imported on first access to keep `import src` free of heavy imports.
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return importlib.import_module(f'.{name}', __name__)
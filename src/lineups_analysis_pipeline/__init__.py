@@ -1,11 +1,32 @@
-from .EVP import EVP
-from .lineups_scraper import lineups_scraper
-from .lineups_processors import lineups_processors
-from .lineups_reg import lineups_reg
-
-__all__ = [
-    'EVP',
-    'lineups_scraper',
-    'lineups_processors',
-    'lineups_reg'
-]
+# Submodules are imported on first attribute access, so importing the package loads
+# neither pandas, statsmodels nor requests and does no I/O.
+import importlib
+
+_exports = {
+    'EVP'                    : 'evp',
+    'IncrementalEVP'         : 'evp',
+    'evp_sweep'              : 'evp',
+    'run_evp'                : 'evp',
+    'NBALineupsScraper'      : 'lineups_scraper',
+    'scrape_lineups'         : 'lineups_scraper',
+    'PlayerIdentityResolver' : 'lineups_processors',
+    'PassIndex'              : 'lineups_processors',
+    'lineup_player_bridge'   : 'lineups_processors',
+    'join_player_features'   : 'lineups_processors',
+    'process_lineups'        : 'lineups_processors',
+    'run_regressions'        : 'lineups_reg',
+    'RAPM'                   : 'rapm',
+    'run_rapm'               : 'rapm'
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_exports[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
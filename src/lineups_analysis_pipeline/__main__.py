@@ -0,0 +1,5 @@
+from .cli import main
+
+# EVP worker processes re-import the main module, so the CLI only runs under __main__.
+if __name__ == '__main__':
+    main()
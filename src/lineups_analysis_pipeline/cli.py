@@ -0,0 +1,238 @@
+"""
+Command line entry points of the lineups pipeline.
+
+Run from src/ (or with src/ on PYTHONPATH):
+
+    python -m lineups_analysis_pipeline scrape lineups --per-mode Totals
+    python -m lineups_analysis_pipeline scrape players --refresh --seasons 2023-24
+    python -m lineups_analysis_pipeline process
+    python -m lineups_analysis_pipeline evp --gp 9 --jobs 0 --output evp.csv
+    python -m lineups_analysis_pipeline rapm --output-dir ../data/RAPM_fit
+    python -m lineups_analysis_pipeline regress
+    python -m lineups_analysis_pipeline regress --cluster team-season --bootstrap 9999
+    python -m lineups_analysis_pipeline sweep --interactions --max-size 4
+    python -m lineups_analysis_pipeline run latex --force regress
+
+Every command takes --data-root, the project's data/ folder by default.
+"""
+import json
+import argparse
+from pathlib import Path
+
+DEFAULT_DATA_ROOT = Path(__file__).resolve().parents[2] / 'data'
+
+def configure_cache(args):
+    from utils import ResponseCache, set_response_cache
+    cache_dir = args.cache_dir or args.data_root / '.http_cache'
+    set_response_cache(ResponseCache(cache_dir, ttl=args.ttl, offline=args.offline))
+
+def scrape(args):
+    configure_cache(args)
+    # Interrupted scrapes resume from their journal on the next run.
+    journal_dir = None
+    if not args.no_journal:
+        journal_dir = args.data_root / '.scrape_journal' / f'{args.target}-{args.per_mode}'
+    if args.target == 'lineups':
+        from .lineups_scraper import SEASONS, scrape_lineups
+        scrape_lineups(args.data_root, seasons=args.seasons or SEASONS, per_mode=args.per_mode,
+                       output=args.output, journal_dir=journal_dir, refresh=args.refresh,
+                       league_wide=args.league_wide)
+    elif args.target == 'pass':
+        from pass_data_analysis_pipeline import scrape_pass_data
+        options = {}
+        if args.concurrency > 1:
+            options = {'mode': 'async', 'concurrency': args.concurrency, 'rate': args.rate}
+        scrape_pass_data(args.data_root, seasons=args.seasons, output=args.output,
+                         journal_dir=journal_dir, refresh=args.refresh, **options)
+    else:
+        from pass_data_analysis_pipeline import scrape_season_players
+        scrape_season_players(args.data_root, seasons=args.seasons, refresh=args.refresh)
+    from utils import get_client
+    metrics = get_client().metrics()
+    if not metrics.empty:
+        print(metrics.to_string())
+
+def process(args):
+    from .lineups_processors import process_lineups
+    process_lineups(args.data_root, min_minutes=args.min_minutes)
+
+def evp(args):
+    from .evp import run_evp
+    _, std_evp_df, _, ci = run_evp(args.data_root, args.lineups, args.gp, args.team_effect,
+                                   n_boot=args.bootstrap, seed=args.seed,
+                                   engine=args.engine, eigensolver=args.eigensolver,
+                                   jobs=args.jobs)
+    if args.output is None:
+        print(std_evp_df)
+        return
+    output = Path(args.output)
+    std_evp_df.to_csv(output, index=False)
+    if ci is not None:
+        lineups_ci_df, players_ci_df = ci
+        lineups_ci_df.to_csv(output.with_name(f'{output.stem}_lineups_ci.csv'), index=False)
+        players_ci_df.to_csv(output.with_name(f'{output.stem}_players_ci.csv'), index=False)
+
+def rapm(args):
+    from .rapm import DEFAULT_LAMBDAS, run_rapm
+    outputs = run_rapm(args.data_root, args.lineups, output_dir=args.output_dir,
+                       min_possessions=args.min_possessions,
+                       lambdas=args.lambdas or DEFAULT_LAMBDAS, folds=args.folds, seed=args.seed)
+    for year, penalty in outputs.pop('lambdas').items():
+        print(f'{year}  lambda = {penalty:.1f}')
+    for name, df in outputs.items():
+        print(f'{name:<40}{len(df):>8} rows')
+
+def regress(args):
+    from .lineups_reg import run_regressions
+    run_regressions(args.data_root, latex_dir=args.latex_dir, combined_table=args.combined,
+                    cluster=args.cluster, cov_type=args.cov_type, n_boot=args.bootstrap,
+                    seed=args.seed, jobs=args.jobs)
+
+def sweep(args):
+    from .lineups_reg import BOX_SCORE_COLUMNS, sweep_team_effect
+    results = sweep_team_effect(args.data_root, columns=args.columns or BOX_SCORE_COLUMNS,
+                                dependent=args.dependent, interactions=args.interactions,
+                                max_size=args.max_size, output=args.output)
+    print(f'{len(results.summary)} specifications')
+    print(results.best(args.criterion, args.top).to_string())
+
+def run(args):
+    from .pipeline import Pipeline, default_stages
+    configure_cache(args)
+    specs = None
+    if args.specs is not None:
+        with open(args.specs) as f:
+            specs = json.load(f)
+    stages = default_stages(seasons=args.seasons, min_minutes=args.min_minutes, gp=args.gp,
+                            team_effect=args.team_effect, specs=specs, jobs=args.evp_jobs,
+                            latex_dir=args.latex_dir)
+    pipeline = Pipeline(args.data_root, stages, jobs=args.jobs)
+    timings = pipeline.run(args.stages or None, force=set(args.force))
+    for timing in timings:
+        print(f"{timing['stage']:<16}{timing['status']:<8}{timing['seconds']:>10.3f}s")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='lineups_analysis_pipeline',
+                                     description='NBA lineups teamwork analysis pipeline.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--data-root', type=Path, default=DEFAULT_DATA_ROOT,
+                        help='The data folder (default: %(default)s).')
+    http = argparse.ArgumentParser(add_help=False)
+    http.add_argument('--cache-dir', type=Path,
+                      help='Response cache of stats.nba.com (default: DATA_ROOT/.http_cache).')
+    http.add_argument('--ttl', type=float, default=6 * 3600,
+                      help='Seconds before cached responses of unfinished seasons expire.')
+    http.add_argument('--offline', action='store_true',
+                      help='Replay cached responses only; fail on a cache miss.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parser_scrape = commands.add_parser('scrape', parents=[common, http],
+                                        help='Scrape lineups, passing data or season players.')
+    parser_scrape.add_argument('target', choices=['lineups', 'pass', 'players'])
+    parser_scrape.add_argument('--seasons', nargs='+', help="Seasons such as 2021-22.")
+    parser_scrape.add_argument('--per-mode', choices=['Per100Possessions', 'Totals'],
+                               default='Per100Possessions')
+    parser_scrape.add_argument('--output', type=Path)
+    parser_scrape.add_argument('--refresh', action='store_true',
+                               help='Re-scrape only units of unfinished seasons whose games played '
+                                    'changed and merge them into the existing dataset.')
+    parser_scrape.add_argument('--league-wide', action='store_true',
+                               help='Scrape lineups with one sharded league-wide query per season '
+                                    'instead of one query per team.')
+    parser_scrape.add_argument('--no-journal', action='store_true',
+                               help='Do not journal completed units for resuming an interrupted scrape.')
+    parser_scrape.add_argument('--concurrency', type=int, default=1,
+                               help='Requests in flight for the pass scrape; above 1 scrapes asynchronously.')
+    parser_scrape.add_argument('--rate', type=float, default=4.0,
+                               help='Maximum requests started per second by the asynchronous pass scrape.')
+    parser_scrape.set_defaults(func=scrape)
+
+    parser_process = commands.add_parser('process', parents=[common],
+                                         help='Build the lineup regression dataset.')
+    parser_process.add_argument('--min-minutes', type=float, default=100)
+    parser_process.set_defaults(func=process)
+
+    parser_evp = commands.add_parser('evp', parents=[common],
+                                     help='Calculate EVP for every team-season.')
+    parser_evp.add_argument('--lineups', type=Path,
+                            help='The lineups JSON (default: lineups_data/5lineups_100poss.json).')
+    parser_evp.add_argument('--gp', type=int, default=9)
+    parser_evp.add_argument('--team-effect', default='PLUS_MINUS')
+    parser_evp.add_argument('--engine', choices=['sparse', 'loop'], default='sparse')
+    parser_evp.add_argument('--eigensolver', choices=['power', 'eig'], default='power')
+    parser_evp.add_argument('--jobs', type=int, default=1,
+                            help='Number of worker processes; 0 uses every CPU core.')
+    parser_evp.add_argument('--bootstrap', type=int, default=0,
+                            help='Number of bootstrap replicates for confidence intervals; 0 skips them.')
+    parser_evp.add_argument('--seed', type=int, default=None)
+    parser_evp.add_argument('--output', type=Path,
+                            help='CSV for the lineups and their evp_std; printed when omitted.')
+    parser_evp.set_defaults(func=evp)
+
+    parser_rapm = commands.add_parser('rapm', parents=[common],
+                                      help='Fit APM and ridge RAPM from the Totals lineups.')
+    parser_rapm.add_argument('--lineups', type=Path,
+                             help='The Totals lineups JSON (default: lineups_data/5lineups_totals.json).')
+    parser_rapm.add_argument('--output-dir', type=Path,
+                             help='Where the RAPM CSVs are written (default: DATA_ROOT/RAPM_fit).')
+    parser_rapm.add_argument('--min-possessions', type=float, default=1200,
+                             help='Players at or below this are pooled in the adjusted ratings.')
+    parser_rapm.add_argument('--lambdas', type=float, nargs='+',
+                             help='Ridge penalties searched by cross-validation.')
+    parser_rapm.add_argument('--folds', type=int, default=5)
+    parser_rapm.add_argument('--seed', type=int, default=0)
+    parser_rapm.set_defaults(func=rapm)
+
+    parser_regress = commands.add_parser('regress', parents=[common],
+                                         help='Fit the regressions and write the LaTeX tables.')
+    parser_regress.add_argument('--latex-dir', type=Path,
+                                help='Where the LaTeX tables are written (default: latex_table/).')
+    parser_regress.add_argument('--combined', metavar='FILE.tex',
+                                help='Also write all specifications side by side to this table.')
+    parser_regress.add_argument('--cluster', choices=['team-season', 'team', 'year', 'team+year'],
+                                help='Report cluster-robust standard errors instead of the OLS ones.')
+    parser_regress.add_argument('--cov-type', choices=['CR1', 'CR2'], default='CR1')
+    parser_regress.add_argument('--bootstrap', type=int, default=0,
+                                help='Wild cluster bootstrap replications; 0 uses --cov-type.')
+    parser_regress.add_argument('--seed', type=int, default=None)
+    parser_regress.add_argument('--jobs', type=int, default=1,
+                                help='Worker processes of the bootstrap; 0 uses every CPU core.')
+    parser_regress.set_defaults(func=regress)
+
+    parser_sweep = commands.add_parser('sweep', parents=[common],
+                                       help='Fit the team effect regression on every subset of the '
+                                            'box-score regressors.')
+    parser_sweep.add_argument('--columns', nargs='+', help='Candidate regressors (default: box score).')
+    parser_sweep.add_argument('--dependent', default='PM_minus_RAPM')
+    parser_sweep.add_argument('--interactions', action='store_true',
+                              help='Also sweep the pairwise interactions of the candidates.')
+    parser_sweep.add_argument('--max-size', type=int, help='Most candidates in one specification.')
+    parser_sweep.add_argument('--criterion', choices=['aic', 'bic', 'rsquared_adj'], default='bic')
+    parser_sweep.add_argument('--top', type=int, default=10, help='Specifications printed.')
+    parser_sweep.add_argument('--output', type=Path, help='CSV of every specification.')
+    parser_sweep.set_defaults(func=sweep)
+
+    parser_run = commands.add_parser('run', parents=[common, http],
+                                     help='Bring the pipeline up to date, rerunning only stale stages.')
+    parser_run.add_argument('stages', nargs='*',
+                            help='Target stages and their upstream stages (default: all).')
+    parser_run.add_argument('--force', nargs='+', default=[], metavar='STAGE',
+                            help='Stages rerun even if they are up to date.')
+    parser_run.add_argument('--jobs', type=int, default=2,
+                            help='Number of stages run at the same time.')
+    parser_run.add_argument('--seasons', nargs='+', help="Seasons such as 2021-22.")
+    parser_run.add_argument('--min-minutes', type=float, default=100)
+    parser_run.add_argument('--gp', type=int, default=9)
+    parser_run.add_argument('--team-effect', default='PLUS_MINUS')
+    parser_run.add_argument('--evp-jobs', type=int, default=1,
+                            help='Worker processes used by EVP; 0 uses every CPU core.')
+    parser_run.add_argument('--specs', type=Path,
+                            help='JSON of regression specifications, {name: [dependent, [regressors]]}.')
+    parser_run.add_argument('--latex-dir', type=Path,
+                            help='Where the LaTeX tables are written (default: latex_table/).')
+    parser_run.set_defaults(func=run)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
@@ -0,0 +1,1028 @@
+import os
+import json
+import warnings
+from pathlib import Path
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from tqdm import tqdm
+from .lineups_reader import read_lineups
+
+def dominant_eigenpairs(matrices, initial=None, tol=1e-10, max_iter=1000):
+    """
+    Compute the dominant eigenpair of a batch of non-negative square matrices by power iteration.
+
+    The matrices are zero-padded into one (groups, n_max, n_max) array so every iteration is a
+    single batched product. Groups stop updating once converged, and any group that has not
+    converged after max_iter iterations falls back to np.linalg.eig.
+
+    Parameters
+    ----------
+    matrices : list of numpy.ndarray
+        The square matrices, which may have different sizes.
+    initial : list, optional
+        Starting vectors for each matrix (e.g. the previous season's EVP); None entries start from ones.
+    tol : float
+        Convergence tolerance on the relative residual ||Gv - lambda v|| / |lambda|.
+    max_iter : int
+        The maximum number of power iterations.
+
+    Returns
+    -------
+    vectors : list of numpy.ndarray
+        The non-negative, unit-norm dominant eigenvector of each matrix.
+    report : pandas.DataFrame
+        One row per matrix with 'eigenvalue', 'iterations', 'residual' and 'converged'.
+    """
+    sizes = np.array([len(matrix) for matrix in matrices])
+    n_groups, n_max = len(matrices), int(sizes.max(initial=0))
+    G = np.zeros((n_groups, n_max, n_max))
+    v = np.zeros((n_groups, n_max))
+    for k, matrix in enumerate(matrices):
+        G[k, :sizes[k], :sizes[k]] = matrix
+        start = None if initial is None else initial[k]
+        v[k, :sizes[k]] = 1.0 if start is None else np.abs(start)
+    norm = np.linalg.norm(v, axis=1, keepdims=True)
+    v = np.divide(v, norm, out=np.zeros_like(v), where=norm > 0)
+
+    eigenvalues = np.zeros(n_groups)
+    residuals = np.full(n_groups, np.inf)
+    iterations = np.zeros(n_groups, dtype=int)
+    active = np.arange(n_groups)
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        Gv = np.einsum('bij,bj->bi', G[active], v[active])
+        lam = np.einsum('bi,bi->b', v[active], Gv)
+        residual = np.linalg.norm(Gv - lam[:, None] * v[active], axis=1)
+        eigenvalues[active] = lam
+        residuals[active] = residual
+        iterations[active] += 1
+
+        done = residual <= tol * np.abs(lam)
+        norm = np.linalg.norm(Gv, axis=1, keepdims=True)
+        # A zero G (all lineups scored 0) has no direction to follow; keep the current vector.
+        done |= norm[:, 0] == 0
+        step = active[~done]
+        v[step] = Gv[~done] / norm[~done]
+        active = step
+
+    converged = np.ones(n_groups, dtype=bool)
+    converged[active] = False
+    vectors = []
+    for k, matrix in enumerate(matrices):
+        if converged[k]:
+            vectors.append(np.abs(v[k, :sizes[k]]))
+            continue
+        values, vecs = np.linalg.eig(matrix)
+        top = np.argmax(values)
+        vector = np.abs(vecs[:, top])
+        eigenvalues[k] = values[top].real
+        residuals[k] = np.linalg.norm(matrix @ vector - eigenvalues[k] * vector)
+        vectors.append(vector)
+
+    report = pd.DataFrame({
+        'n_players' : sizes,
+        'eigenvalue': eigenvalues,
+        'iterations': iterations,
+        'residual'  : residuals,
+        'converged' : converged
+    })
+    return vectors, report
+
+def _create_G_worker(payload):
+    """
+    Build matrix G of one team-season in a worker process.
+    Only the group's player names, weights and normalized scores are sent, not the whole DataFrame.
+    """
+    players, weights, scores, team_effect, engine = payload
+    df = pd.DataFrame(players, columns=[f'player_{i+1}' for i in range(5)])
+    df['GP'] = weights
+    df[f'normal_{team_effect}'] = scores
+    return EVP(df, None, team_effect, engine=engine).create_G_group(df)
+
+def pair_incidence(codes: np.ndarray, n_players: int):
+    """
+    Build a lineups x (players * players) sparse matrix whose row k marks the (i, j) cells
+    of matrix S that lineup k contributes to. W @ pair_incidence gives the pair weights of
+    every row of weights W in one product.
+    """
+    n_lineups = codes.shape[0]
+    cells = (codes[:, :, None] * n_players + codes[:, None, :]).reshape(n_lineups, -1)
+    pairs = sparse.csr_matrix(
+        (np.ones(cells.size), (np.repeat(np.arange(n_lineups), cells.shape[1]), cells.ravel())),
+        shape=(n_lineups, n_players * n_players)
+    )
+    pairs.data[:] = 1.0
+    return pairs
+
+def batched_evp(pairs, n_players: int, weights: np.ndarray, weighted_scores: np.ndarray,
+                tol=1e-10, max_iter=1000) -> np.ndarray:
+    """
+    Solve EVP for many weightings of the same team-season at once.
+
+    Parameters
+    ----------
+    pairs : scipy.sparse.csr_matrix
+        The matrix from pair_incidence.
+    n_players : int
+        The number of players of the team-season.
+    weights : numpy.ndarray
+        A (batches, lineups) array of lineup weights; a weight of 0 drops the lineup.
+    weighted_scores : numpy.ndarray
+        The (batches, lineups) array of weights times the normalized team outcome.
+
+    Returns
+    -------
+    evp : numpy.ndarray
+        The (batches, players) EVP, NaN for players without any weighted lineup in a batch.
+    """
+    shape = (weights.shape[0], n_players, n_players)
+    pair_weight = np.asarray(pairs.T @ weights.T).T.reshape(shape)
+    pair_score = np.asarray(pairs.T @ weighted_scores.T).T.reshape(shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        matrix_S = np.where(pair_weight > 0, pair_score / pair_weight, np.nan)
+        diagonal = np.diagonal(matrix_S, axis1=1, axis2=2)
+        fill = np.sqrt(diagonal[:, :, None] * diagonal[:, None, :])
+        matrix_S = np.where(np.isnan(matrix_S), fill, matrix_S)
+        matrix_G = np.where(diagonal[:, None, :] != 0, matrix_S / diagonal[:, None, :], 0.0)
+    # Absent players have NaN rows and columns, which become 0 and drop out of the eigenproblem.
+    matrix_G = np.nan_to_num(matrix_G, nan=0)
+
+    present = np.diagonal(pair_weight, axis1=1, axis2=2) > 0
+    vectors, _ = dominant_eigenpairs(list(matrix_G), list(present.astype(float)), tol, max_iter)
+    evp = np.vstack(vectors)
+    evp[~present] = np.nan
+    return evp
+
+def bootstrap_group(players, weights, scores, n_boot, alpha, seed, tol=1e-10, max_iter=1000):
+    """
+    Bootstrap the EVP of a single team-season.
+
+    Each replicate draws sum(GP) games across the lineups with probabilities GP / sum(GP),
+    and all replicates are solved together with batched_evp. Players whose lineups are all
+    missing from a replicate get NaN for that replicate.
+
+    Parameters
+    ----------
+    players : numpy.ndarray
+        The (lineups, 5) array of player names.
+    weights : numpy.ndarray
+        GP of each lineup.
+    scores : numpy.ndarray
+        The normalized team outcome of each lineup.
+    n_boot : int
+        The number of replicates.
+    alpha : float
+        Intervals cover the central 1 - alpha of the replicates.
+    seed : int or numpy.random.SeedSequence
+        Seed of the random generator.
+
+    Returns
+    -------
+    dict
+        'p_lst', point 'evp' with 'evp_lower'/'evp_upper' per player, and point 'evp_std'
+        with 'evp_std_lower'/'evp_std_upper' per lineup.
+    """
+    p_lst, codes = np.unique(players, return_inverse=True)
+    codes = codes.reshape(players.shape)
+    n_lineups, n_players = codes.shape[0], len(p_lst)
+
+    pairs = pair_incidence(codes, n_players)
+
+    weights = np.asarray(weights, dtype=float)
+    scores = np.asarray(scores, dtype=float)
+    rng = np.random.default_rng(seed)
+    total = int(np.rint(weights.sum()))
+    draws = rng.multinomial(total, weights / weights.sum(), size=n_boot).astype(float)
+    # Row 0 holds the original weights, so the point estimate is solved in the same batch.
+    W = np.vstack([weights, draws])
+
+    evp = batched_evp(pairs, n_players, W, W * scores, tol, max_iter)
+    evp_std = evp[:, codes].std(axis=2, ddof=1)
+
+    quantiles = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+    evp_lower, evp_upper = np.nanpercentile(evp[1:], quantiles, axis=0)
+    std_lower, std_upper = np.nanpercentile(evp_std[1:], quantiles, axis=0)
+    return {
+        'p_lst'        : list(p_lst),
+        'evp'          : evp[0],
+        'evp_lower'    : evp_lower,
+        'evp_upper'    : evp_upper,
+        'evp_std'      : evp_std[0],
+        'evp_std_lower': std_lower,
+        'evp_std_upper': std_upper
+    }
+
+def evp_sweep(df: pd.DataFrame, gps: list, team_effects: list, weights=('GP',),
+              tol=1e-10, max_iter=1000) -> pd.DataFrame:
+    """
+    Calculate EVP for every combination of GP cutoff, team outcome and weight column in one pass.
+
+    GROUP_NAME is parsed and each team-season's incidence structure is built once, from the
+    lineups above the lowest cutoff; a higher cutoff only removes rows, so it is a zero weight
+    on the shared structure. Every configuration of a team-season is then solved in one batch.
+    With weight 'GP', each configuration matches EVP(df, gp, team_effect).clean_data().
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        All lineups, in the layout read_lineups_df produces.
+    gps : list of int
+        GP cutoffs; lineups with GP above the cutoff are kept.
+    team_effects : list of str
+        Team outcome columns, e.g. ['PLUS_MINUS', 'PTS'].
+    weights : tuple of str
+        Lineup weight columns, e.g. ('GP', 'MIN').
+
+    Returns
+    -------
+    pandas.DataFrame
+        Tidy table with columns 'gp', 'team_effect', 'weight', 'year', 'team', 'player', 'evp'.
+    """
+    df = df[df['GP'] > min(gps)]
+    players = df['GROUP_NAME'].str.split(' - ', expand=True).to_numpy()
+    configs = list(product(gps, team_effects, weights))
+
+    gp_values = df['GP'].to_numpy(dtype=float)
+    masks = {gp: gp_values > gp for gp in gps}
+    # The outcome is min-max normalized over the lineups kept by each cutoff, as in clean_data.
+    normals = {}
+    for gp, team_effect in product(gps, team_effects):
+        x = df[team_effect].to_numpy(dtype=float)
+        kept = x[masks[gp]]
+        normals[(gp, team_effect)] = (x - kept.min()) / (kept.max() - kept.min())
+    W = np.vstack([masks[gp] * df[weight].to_numpy(dtype=float)
+                   for gp, _, weight in configs])
+    WX = np.vstack([W[c] * normals[(gp, team_effect)]
+                    for c, (gp, team_effect, _) in enumerate(configs)])
+
+    result_dfs = []
+    for (year, team), rows in tqdm(df.groupby(['year', 'team']).indices.items()):
+        p_lst, codes = np.unique(players[rows], return_inverse=True)
+        codes = codes.reshape(len(rows), -1)
+        pairs = pair_incidence(codes, len(p_lst))
+        active = np.flatnonzero(W[:, rows].sum(axis=1) > 0)
+        if active.size == 0:
+            continue
+        evp = batched_evp(pairs, len(p_lst), W[np.ix_(active, rows)], WX[np.ix_(active, rows)],
+                          tol, max_iter)
+        config_idx, player_idx = np.nonzero(~np.isnan(evp))
+        result_dfs.append(pd.DataFrame({
+            'config': active[config_idx],
+            'year'  : year,
+            'team'  : team,
+            'player': p_lst[player_idx],
+            'evp'   : evp[config_idx, player_idx]
+        }))
+
+    result_df = (pd.concat(result_dfs, ignore_index=True)
+                 .sort_values('config', kind='stable')
+                 .reset_index(drop=True))
+    config_df = pd.DataFrame(configs, columns=['gp', 'team_effect', 'weight'])
+    result_df = pd.concat([config_df.loc[result_df.pop('config')].reset_index(drop=True),
+                           result_df], axis=1)
+    return result_df
+
+def _bootstrap_worker(payload):
+    return bootstrap_group(*payload)
+
+class EVP:
+    """
+    Calculate EVP using the method outlined in "Eigenvalue Productivity: Measurement of Individual Contributions in Teams."
+    This class calculates the EVP for all players and the standard deviation for each lineup by receiving a large DataFrame containing all the lineups data.
+    """
+    def __init__(self, df, gp, team_effect, engine='sparse',
+                 eigensolver='power', tol=1e-10, max_iter=1000, warm_start=None, jobs=1,
+                 key_codec=None):
+        self.df = df
+        self.gp = gp          # Number of joint appearances for lineups.
+        self.sp = team_effect # Select data used to measure team outcomes.
+        # 'sparse' builds matrix S from a lineups x players incidence matrix,
+        # 'loop' is the original pairwise scan kept as the reference implementation.
+        if engine not in ('sparse', 'loop'):
+            raise ValueError(f"engine must be 'sparse' or 'loop', got {engine!r}")
+        self.engine = engine
+        # 'power' solves every season's team G matrices in one batched power iteration,
+        # 'eig' runs a full np.linalg.eig per team-season.
+        if eigensolver not in ('power', 'eig'):
+            raise ValueError(f"eigensolver must be 'power' or 'eig', got {eigensolver!r}")
+        self.eigensolver = eigensolver
+        self.tol = tol
+        self.max_iter = max_iter
+        # An evp_dict from an earlier run ({year: {team: {player: evp}}}) used as starting vectors.
+        self.warm_start = warm_start or {}
+        self.eigen_report = None
+        # Number of worker processes used to build the team-season matrices; 0 or less uses every core.
+        self.jobs = jobs if jobs >= 1 else os.cpu_count()
+        self.prepared = False
+        # A utils.LineupKeyCodec; when given, every lineup also gets its packed int64 'lineup_key'.
+        self.key_codec = key_codec
+    
+    def normalized_fun(self, lst: list) -> np.array:
+        x = np.array(lst)
+        normalized_x = (x - np.min(x)) / (np.max(x) - np.min(x))
+        return normalized_x
+   
+    # Create two n x n player matrices, DataFrame S and DataFrame G, both initialized with values of 0.
+    def create_M(self, p_lst: list) -> pd.DataFrame:
+        return pd.DataFrame(
+            data    = np.zeros((len(p_lst), len(p_lst))),
+            index   = p_lst,
+            columns = p_lst
+        )
+    
+    def create_G_loop(
+        self,
+        df: pd.DataFrame,
+        p_lst: list,
+        matrix_S: pd.DataFrame
+    ) -> np.ndarray:
+        # create matrix S
+        for player_1 in p_lst:
+            for player_2 in p_lst:
+                if player_1 != player_2:
+                    # Create two boolean Series to indicate whether the row contains the player being searched for.
+                    condition_1 = df.isin([player_1]).any(axis=1)
+                    condition_2 = df.isin([player_2]).any(axis=1)
+                    # Retrieve the rows that contain both of the players being searched for simultaneously.
+                    pair_df = df[condition_1 & condition_2]
+                    # Calculate the weighted average of the Plus/Minus values based on the number of appearances.
+                    if pair_df.empty:
+                        mean_score = np.nan
+                    else:
+                        mean_score = (
+                            (pair_df['GP'] * pair_df[f'normal_{self.sp}'])
+                            .sum()
+                            / pair_df['GP']
+                            .sum()
+                        )
+                    # Populate the pre-created matrix with the calculated values.
+                    matrix_S.loc[player_1, player_2] = mean_score
+                else:
+                    # Calculate the mean of all lineups that include the player to represent their individual ability.
+                    condition_3 = df.isin([player_1]).any(axis=1)
+                    self_df = df[condition_3]
+                    mean_score = (
+                        (self_df['GP']*self_df[f'normal_{self.sp}']).sum()
+                        / self_df['GP'].sum()
+                    )
+                    matrix_S.loc[player_1, player_1] = mean_score
+                    
+        for row in range(len(matrix_S)):
+            for col in range(len(matrix_S)):
+                if np.isnan(matrix_S.iloc[row, col]):
+                    player_1_score = matrix_S.iloc[row, row]
+                    player_2_score = matrix_S.iloc[col, col]
+                    matrix_S.iloc[row, col] = np.sqrt(player_1_score * player_2_score)
+        
+        # create matrix G
+        matrix_G_np = np.zeros((len(matrix_S), len(matrix_S)))
+        matrix_S_np = np.array(matrix_S)
+        for col in range(len(matrix_S)):
+            if matrix_S_np[col, col] == 0:
+                matrix_G_np[:, col] = 0
+            else:
+                matrix_G_np[:, col] = matrix_S_np[:, col] / matrix_S_np[col, col]      
+        # If a player's individual ability Sii is 0, it indicates that the player only appears in combinations with a Plus/Minus of 0.
+        # This can cause division by zero during the calculation, resulting in NaN values in the G matrix. Fill these NaN values with 0 (indicating no contribution).
+        matrix_G_np = np.nan_to_num(matrix_G_np, nan=0)
+        return matrix_G_np
+
+    def leading_eigenvector(self, matrix_G_np: np.ndarray) -> np.ndarray:
+        """
+        Return the eigenvector of the largest eigenvalue of matrix G from a full decomposition.
+        G is non-negative, so the leading eigenpair is real; a warning is raised if the
+        discarded imaginary parts are not negligible.
+        """
+        eigenvalues, eigenvectors = np.linalg.eig(matrix_G_np)
+        max_eigenvalue_index = np.argmax(eigenvalues)
+        evp = eigenvectors[:, max_eigenvalue_index]
+        if np.abs(evp.imag).max(initial=0) > 1e-10 or abs(eigenvalues[max_eigenvalue_index].imag) > 1e-10:
+            warnings.warn('The leading eigenpair of matrix G has a non-negligible imaginary part.')
+        evp = np.abs(evp)
+        return evp
+
+    def get_evp(
+        self,
+        df: pd.DataFrame,
+        p_lst: list,
+        matrix_S: pd.DataFrame
+    ):
+        matrix_G_np = self.create_G_loop(df, p_lst, matrix_S)
+        evp = self.leading_eigenvector(matrix_G_np)
+
+        evp_dict = dict(zip(p_lst, evp))
+        def evp_std(row, evp_dict):
+            player_scores = [evp_dict[player] for player in row.values]
+            return pd.Series([pd.Series(player_scores).std()], index=['std']) 
+                
+        df['evp_std'] = (
+            df.loc[:, 'player_1':'player_5']
+            .apply(evp_std, axis=1, args=(evp_dict,))
+        )
+        return evp_dict, df
+
+    def create_incidence(self, df: pd.DataFrame):
+        """
+        Build the lineups x players incidence matrix of a single team-season.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            The lineups of one team-season, with columns 'player_1' to 'player_5'.
+
+        Returns
+        -------
+        p_lst : list
+            The sorted player names, in the same order as np.unique in clean_data.
+        codes : numpy.ndarray
+            The (lineups, 5) array of column positions of each player in p_lst.
+        incidence : scipy.sparse.csr_matrix
+            A 0/1 matrix where entry (k, i) is 1 if lineup k contains player i.
+        """
+        players = df.loc[:, 'player_1':'player_5'].to_numpy()
+        p_lst, codes = np.unique(players, return_inverse=True)
+        codes = codes.reshape(players.shape)
+        rows = np.repeat(np.arange(players.shape[0]), players.shape[1])
+        incidence = sparse.csr_matrix(
+            (np.ones(codes.size), (rows, codes.ravel())),
+            shape=(players.shape[0], len(p_lst))
+        )
+        # A player listed twice in one lineup still counts as one appearance, as with df.isin.
+        incidence.data[:] = 1.0
+        return list(p_lst), codes, incidence
+
+    def create_S(self, incidence, weights: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """
+        Build matrix S from weighted products of the incidence matrix.
+
+        Entry (i, j) of A' diag(w) A is the total weight of the lineups shared by players i and j,
+        and A' diag(w * score) A is the matching weighted score, so their ratio is the
+        weighted mean used by the loop engine. The diagonal gives each player's self score.
+
+        Parameters
+        ----------
+        incidence : scipy.sparse.csr_matrix
+            The lineups x players incidence matrix from create_incidence.
+        weights : numpy.ndarray
+            The weight of each lineup (GP).
+        scores : numpy.ndarray
+            The normalized team outcome of each lineup.
+
+        Returns
+        -------
+        matrix_S : numpy.ndarray
+            The dense n x n matrix S, with missing pairs filled by sqrt(Sii * Sjj).
+        """
+        weights = np.asarray(weights, dtype=float)
+        scores = np.asarray(scores, dtype=float)
+        pair_weight = (incidence.T @ incidence.multiply(weights[:, None])).toarray()
+        pair_score = (incidence.T @ incidence.multiply((weights * scores)[:, None])).toarray()
+
+        shared = incidence.T @ incidence
+        matrix_S = np.full(pair_weight.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_score = pair_score / pair_weight
+        mask = shared.toarray() > 0
+        matrix_S[mask] = mean_score[mask]
+
+        # Pairs that never shared the floor fall back to the geometric mean of their self scores.
+        self_score = np.diag(matrix_S)
+        missing = np.isnan(matrix_S)
+        matrix_S[missing] = np.sqrt(np.outer(self_score, self_score))[missing]
+        return matrix_S
+
+    def create_G(self, matrix_S_np: np.ndarray) -> np.ndarray:
+        """
+        Normalize each column of matrix S by its diagonal entry to obtain matrix G.
+        Columns with Sii = 0 are set to 0, and any remaining NaN is filled with 0.
+        """
+        diagonal = np.diag(matrix_S_np)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix_G_np = np.where(diagonal != 0, matrix_S_np / diagonal, 0.0)
+        return np.nan_to_num(matrix_G_np, nan=0)
+
+    def create_G_sparse(self, df: pd.DataFrame):
+        """
+        Build matrix G of a single team-season with the incidence-matrix engine.
+
+        Returns
+        -------
+        p_lst : list
+            The sorted player names.
+        codes : numpy.ndarray
+            The (lineups, 5) array of column positions of each player in p_lst.
+        matrix_G_np : numpy.ndarray
+            The column-normalized matrix G.
+        """
+        p_lst, codes, incidence = self.create_incidence(df)
+        matrix_S_np = self.create_S(incidence,
+                                    df['GP'].to_numpy(),
+                                    df[f'normal_{self.sp}'].to_numpy())
+        return p_lst, codes, self.create_G(matrix_S_np)
+
+    def get_evp_sparse(self, df: pd.DataFrame):
+        """
+        Same result as get_evp, with matrices S and G built from array operations.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            The lineups of one team-season.
+
+        Returns
+        -------
+        evp_dict : dict
+            Player name to EVP.
+        df : pandas.DataFrame
+            The input lineups with an added 'evp_std' column.
+        """
+        p_lst, codes, matrix_G_np = self.create_G_sparse(df)
+        evp = self.leading_eigenvector(matrix_G_np)
+
+        evp_dict = dict(zip(p_lst, evp))
+        df = df.copy()
+        df['evp_std'] = evp[codes].std(axis=1, ddof=1)
+        return evp_dict, df
+
+    def initial_vector(self, p_lst: list, year, team, previous_year, result_dict: dict):
+        """
+        Starting vector for the power iteration of one team-season: the warm_start EVP of the same
+        team-season if given, otherwise the EVP the same franchise got in the previous season.
+        Players without a previous value start from the mean of the known ones.
+        """
+        sources = [self.warm_start.get(year, {}).get(team),
+                   result_dict.get(previous_year, {}).get(team)]
+        for source in sources:
+            if not source:
+                continue
+            known = [source.get(player) for player in p_lst]
+            values = [value for value in known if value is not None]
+            if values:
+                fill = np.mean(values)
+                return np.array([fill if value is None else value for value in known])
+        return None
+
+    def create_G_group(self, df: pd.DataFrame):
+        """
+        Build matrix G of a single team-season with the selected engine.
+
+        Returns
+        -------
+        p_lst : list
+            The sorted player names.
+        codes : numpy.ndarray
+            The (lineups, 5) array of column positions of each player in p_lst.
+        matrix_G_np : numpy.ndarray
+            The column-normalized matrix G.
+        """
+        if self.engine == 'sparse':
+            return self.create_G_sparse(df)
+        players = df.loc[:, 'player_1':'player_5'].to_numpy()
+        p_lst, codes = np.unique(players, return_inverse=True)
+        p_lst, codes = list(p_lst), codes.reshape(players.shape)
+        matrix_G_np = self.create_G_loop(df, p_lst, self.create_M(p_lst))
+        return p_lst, codes, matrix_G_np
+
+    def create_G_parallel(self, group_dfs) -> list:
+        """
+        Build the G matrices of all team-seasons in a process pool.
+        Results come back in the same order as group_dfs, so the output matches the serial run.
+        """
+        payloads = [
+            (group_df.loc[:, 'player_1':'player_5'].to_numpy(),
+             group_df['GP'].to_numpy(),
+             group_df[f'normal_{self.sp}'].to_numpy(),
+             self.sp,
+             self.engine)
+            for group_df in group_dfs
+        ]
+        chunksize = max(1, len(payloads) // (self.jobs * 4))
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            return list(tqdm(executor.map(_create_G_worker, payloads, chunksize=chunksize),
+                             total=len(payloads)))
+
+    def solve_groups(self, keys, group_dfs, matrices):
+        """
+        Solve the leading eigenvector of every team-season and attach 'evp_std' to its lineups.
+
+        With eigensolver='power', each season's teams are solved as one batch,
+        warm-started from the franchise's previous season.
+
+        Returns
+        -------
+        result_dfs : list of pandas.DataFrame
+            The lineups of each team-season with an added 'evp_std' column, in the order of keys.
+        result_dict : dict
+            EVP of every player, keyed by year and team.
+        """
+        season_groups = {}
+        for (year, team), group_df, (p_lst, codes, matrix_G_np) in zip(keys, group_dfs, matrices):
+            season_groups.setdefault(year, []).append(
+                (team, group_df, p_lst, codes, matrix_G_np)
+            )
+
+        result_dfs = []
+        result_dict = {}
+        reports = []
+        previous_year = None
+        for year, groups in season_groups.items():
+            if self.eigensolver == 'eig':
+                vectors = [self.leading_eigenvector(group[4]) for group in groups]
+            else:
+                initial = [self.initial_vector(p_lst, year, team, previous_year, result_dict)
+                           for team, _, p_lst, _, _ in groups]
+                vectors, report = dominant_eigenpairs([group[4] for group in groups],
+                                                      initial, self.tol, self.max_iter)
+                report.insert(0, 'team', [group[0] for group in groups])
+                report.insert(0, 'year', year)
+                reports.append(report)
+            result_dict[year] = {}
+            for (team, group_df, p_lst, codes, _), evp in zip(groups, vectors):
+                result_dict[year][team] = dict(zip(p_lst, evp))
+                df = group_df.copy()
+                df['evp_std'] = evp[codes].std(axis=1, ddof=1)
+                result_dfs.append(df)
+            previous_year = year
+        self.eigen_report = pd.concat(reports, ignore_index=True) if reports else None
+        return result_dfs, result_dict
+
+    def prepare_data(self):
+        """
+        Filter lineups by GP, normalize the team outcome and split GROUP_NAME into player columns.
+        Runs once; later calls (e.g. clean_data followed by bootstrap) reuse the prepared frame.
+        """
+        if self.prepared:
+            return
+        self.df = self.df[self.df['GP'] > self.gp]        
+        self.df[f'normal_{self.sp}'] = (self
+                                        .normalized_fun(self.df[self.sp])
+                                        )
+        df_col = [f'player_{i+1}' for i in range(5)]
+        self.df[df_col] = (self
+                           .df['GROUP_NAME']
+                           .str
+                           .split(' - ', expand=True)
+                           )
+        df_col.extend(['GROUP_ID', 'year', 'team', 'TEAM_ABBREVIATION',
+                       'W_PCT', 'GP', f'normal_{self.sp}'])
+        if self.key_codec is not None:
+            self.df['lineup_key'] = self.key_codec.encode_group_ids(self.df['GROUP_ID'])
+            df_col.append('lineup_key')
+        self.df = self.df[df_col]
+        self.prepared = True
+
+    def clean_data(self) -> pd.DataFrame:
+        self.prepare_data()
+        result_dfs = []
+        result_dict = {}
+        if self.eigensolver == 'eig' and self.jobs == 1:
+            # Serial reference implementation.
+            for (year, team), group_df in tqdm(self.df.groupby(['year', 'team'])):
+                p_lst = list(
+                    (np
+                     .unique(
+                         group_df
+                         .loc[:, 'player_1':'player_5']
+                         .to_numpy())
+                     )
+                )
+                if self.engine == 'loop':
+                    matrix_S = self.create_M(p_lst)
+                    evp_dict, df = self.get_evp(group_df, p_lst, matrix_S)
+                else:
+                    evp_dict, df = self.get_evp_sparse(group_df)
+                if year not in result_dict:
+                    result_dict[year] = {}
+                result_dict[year][team] = evp_dict
+                result_dfs.append(df)
+            self.eigen_report = None
+        else:
+            keys, group_dfs = zip(*self.df.groupby(['year', 'team']))
+            if self.jobs > 1:
+                matrices = self.create_G_parallel(group_dfs)
+            else:
+                matrices = [self.create_G_group(group_df) for group_df in tqdm(group_dfs)]
+            result_dfs, result_dict = self.solve_groups(keys, group_dfs, matrices)
+
+        result_df = pd.concat(result_dfs)      
+        return result_df, result_dict
+
+    def bootstrap(self, n_boot=1000, alpha=0.05, seed=None, jobs=None):
+        """
+        Percentile confidence intervals for every player's EVP and every lineup's evp_std.
+
+        Within each team-season, every replicate redraws the season's games across lineups
+        in proportion to GP, and the redrawn counts replace GP as weights. All replicates of
+        a team-season are solved together as batched matrix products.
+
+        Parameters
+        ----------
+        n_boot : int
+            The number of bootstrap replicates B.
+        alpha : float
+            Intervals cover the central 1 - alpha of the bootstrap distribution.
+        seed : int, optional
+            Seed of the random generator; each team-season gets its own child seed,
+            so the result does not depend on jobs.
+        jobs : int, optional
+            Number of worker processes; defaults to the jobs given to the class.
+
+        Returns
+        -------
+        lineup_df : pandas.DataFrame
+            The lineups with 'evp_std', 'evp_std_lower' and 'evp_std_upper' columns.
+        player_df : pandas.DataFrame
+            One row per player and team-season with 'evp', 'evp_lower' and 'evp_upper'.
+        """
+        self.prepare_data()
+        jobs = self.jobs if jobs is None else (jobs if jobs >= 1 else os.cpu_count())
+        keys, group_dfs = zip(*self.df.groupby(['year', 'team']))
+        seeds = np.random.SeedSequence(seed).spawn(len(keys))
+        payloads = [
+            (group_df.loc[:, 'player_1':'player_5'].to_numpy(),
+             group_df['GP'].to_numpy(),
+             group_df[f'normal_{self.sp}'].to_numpy(),
+             n_boot, alpha, group_seed, self.tol, self.max_iter)
+            for group_df, group_seed in zip(group_dfs, seeds)
+        ]
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(tqdm(executor.map(_bootstrap_worker, payloads),
+                                    total=len(payloads)))
+        else:
+            results = [_bootstrap_worker(payload) for payload in tqdm(payloads)]
+
+        lineup_dfs = []
+        player_dfs = []
+        for (year, team), group_df, result in zip(keys, group_dfs, results):
+            df = group_df.copy()
+            df['evp_std'] = result['evp_std']
+            df['evp_std_lower'] = result['evp_std_lower']
+            df['evp_std_upper'] = result['evp_std_upper']
+            lineup_dfs.append(df)
+            player_dfs.append(pd.DataFrame({
+                'year'     : year,
+                'team'     : team,
+                'player'   : result['p_lst'],
+                'evp'      : result['evp'],
+                'evp_lower': result['evp_lower'],
+                'evp_upper': result['evp_upper']
+            }))
+        return pd.concat(lineup_dfs), pd.concat(player_dfs, ignore_index=True)
+        
+class IncrementalEVP(EVP):
+    """
+    Keep EVP up to date as lineup rows are appended or changed during a season.
+
+    For every team-season the class keeps GP-weighted sufficient statistics of matrix S:
+    the total GP each pair of players shared (the diagonal holds each player's own GP) and the
+    matching GP-weighted sum of the raw team outcome. The sums use the raw outcome rather than
+    the min-max normalized one, so a change of the global min or max only rescales the stored
+    means; in that case every team-season's G is rebuilt from its sums and re-solved.
+    Eigenvectors are warm-started from the last solution of the same team-season.
+    """
+    def __init__(self, gp, team_effect, tol=1e-10, max_iter=1000):
+        super().__init__(None, gp, team_effect, engine='sparse', eigensolver='power',
+                         tol=tol, max_iter=max_iter)
+        self.lineups = None # Latest row of every lineup, keyed by (year, team, GROUP_ID).
+        self.stats = {}     # (year, team) -> player index and pair sums.
+        self.bounds = None  # (min, max) of the outcome over lineups with GP above the cutoff.
+        self.result_dict = {}
+
+    def accumulate(self, key, rows: pd.DataFrame, sign: int):
+        """
+        Add (sign=1) or remove (sign=-1) the contribution of lineup rows to one team-season's sums.
+        """
+        stats = self.stats.setdefault(key, {'players': {},
+                                            'weight': np.zeros((0, 0)),
+                                            'score': np.zeros((0, 0))})
+        players = rows.loc[:, 'player_1':'player_5'].to_numpy()
+        for player in pd.unique(players.ravel()):
+            if player not in stats['players']:
+                stats['players'][player] = len(stats['players'])
+        n_players = len(stats['players'])
+        if len(stats['weight']) < n_players:
+            grow = n_players - len(stats['weight'])
+            stats['weight'] = np.pad(stats['weight'], (0, grow))
+            stats['score'] = np.pad(stats['score'], (0, grow))
+
+        codes = np.vectorize(stats['players'].get, otypes=[int])(players)
+        cells = (codes[:, :, None] * n_players + codes[:, None, :]).reshape(len(rows), -1)
+        weights = sign * rows['GP'].to_numpy(dtype=float)
+        scores = weights * rows[self.sp].to_numpy(dtype=float)
+        np.add.at(stats['weight'].reshape(-1), cells, weights[:, None])
+        np.add.at(stats['score'].reshape(-1), cells, scores[:, None])
+
+    def create_S_from_sums(self, key):
+        """
+        Build matrix S of one team-season from its sums and the current min-max bounds.
+
+        Returns
+        -------
+        p_lst : list
+            The sorted names of players that still have lineups above the GP cutoff.
+        matrix_S : numpy.ndarray
+            Matrix S over p_lst, with missing pairs filled by sqrt(Sii * Sjj).
+        """
+        stats = self.stats[key]
+        names = np.array(list(stats['players']), dtype=object)
+        present = np.diag(stats['weight']) > 0
+        order = np.flatnonzero(present)[np.argsort(names[present])]
+        weight = stats['weight'][np.ix_(order, order)]
+        score = stats['score'][np.ix_(order, order)]
+
+        low, high = self.bounds
+        matrix_S = np.full(weight.shape, np.nan)
+        shared = weight > 0
+        # The weighted mean of a min-max normalized outcome is the normalized weighted mean.
+        matrix_S[shared] = (score[shared] / weight[shared] - low) / (high - low)
+        self_score = np.diag(matrix_S)
+        missing = np.isnan(matrix_S)
+        matrix_S[missing] = np.sqrt(np.outer(self_score, self_score))[missing]
+        return list(names[order]), matrix_S
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Apply appended or changed lineup rows and re-solve the affected team-seasons.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Lineup rows in the scraped layout ('GROUP_NAME', 'GROUP_ID', 'year', 'team', 'GP',
+            the team outcome column, ...). A row whose (year, team, GROUP_ID) is already known
+            replaces the stored one.
+
+        Returns
+        -------
+        report : pandas.DataFrame
+            The power-iteration report of every re-solved team-season, with a 'rescaled'
+            column that is True when a changed min or max forced every team-season to be rebuilt.
+        """
+        df = df.drop_duplicates(['year', 'team', 'GROUP_ID'], keep='last').copy()
+        df_col = [f'player_{i+1}' for i in range(5)]
+        df[df_col] = df['GROUP_NAME'].str.split(' - ', expand=True)
+        df_col.extend(['GROUP_ID', 'year', 'team', 'TEAM_ABBREVIATION', 'W_PCT', 'GP', self.sp])
+        df = df[df_col]
+        df.index = pd.MultiIndex.from_arrays([df['year'], df['team'], df['GROUP_ID']],
+                                             names=[None, None, None])
+
+        if self.lineups is None:
+            old = df.iloc[:0]
+            self.lineups = df
+        else:
+            old = self.lineups[self.lineups.index.isin(df.index)]
+            appended = ~df.index.isin(old.index)
+            # Changed rows keep their position, so the output order matches a full rerun.
+            lineups = self.lineups.copy()
+            lineups.loc[old.index] = df.loc[old.index]
+            self.lineups = pd.concat([lineups, df[appended]])
+
+        touched = set()
+        for sign, rows in ((-1, old), (1, df)):
+            rows = rows[rows['GP'] > self.gp]
+            for key, group_df in rows.groupby(['year', 'team']):
+                self.accumulate(key, group_df, sign)
+                touched.add(key)
+
+        included = self.lineups.loc[self.lineups['GP'] > self.gp, self.sp]
+        bounds = (included.min(), included.max())
+        rescaled = self.bounds is not None and bounds != self.bounds
+        self.bounds = bounds
+        keys = sorted(self.stats) if rescaled else sorted(touched)
+        if not keys:
+            return pd.DataFrame()
+
+        matrices, p_lsts, initial = [], [], []
+        for year, team in keys:
+            p_lst, matrix_S = self.create_S_from_sums((year, team))
+            last = self.result_dict.get(year, {}).get(team, {})
+            p_lsts.append(p_lst)
+            matrices.append(self.create_G(matrix_S))
+            initial.append(np.array([last.get(player, 1.0) for player in p_lst]) if last else None)
+        vectors, report = dominant_eigenpairs(matrices, initial, self.tol, self.max_iter)
+        for (year, team), p_lst, evp in zip(keys, p_lsts, vectors):
+            self.result_dict.setdefault(year, {})[team] = dict(zip(p_lst, evp))
+
+        report.insert(0, 'team', [team for _, team in keys])
+        report.insert(0, 'year', [year for year, _ in keys])
+        report['rescaled'] = rescaled
+        return report
+
+    def rebuild(self):
+        """
+        Recompute every team-season's sums from the stored lineups, discarding any
+        rounding drift accumulated by repeated updates.
+        """
+        lineups, self.lineups = self.lineups, None
+        self.stats, self.bounds = {}, None
+        if lineups is not None:
+            self.update(lineups.reset_index(drop=True).assign(
+                GROUP_NAME=lambda d: d.loc[:, 'player_1':'player_5'].agg(' - '.join, axis=1)
+            ))
+
+    def result(self):
+        """
+        Return the current lineups and EVP in the same layout as EVP.clean_data.
+
+        Returns
+        -------
+        result_df : pandas.DataFrame
+            Lineups above the GP cutoff with the normalized outcome and 'evp_std'.
+        result_dict : dict
+            EVP of every player, keyed by year and team.
+        """
+        low, high = self.bounds
+        result_df = (self.lineups[self.lineups['GP'] > self.gp]
+                     .reset_index(drop=True)
+                     .sort_values(['year', 'team'], kind='stable'))
+        result_df[f'normal_{self.sp}'] = (result_df.pop(self.sp) - low) / (high - low)
+        evp_std = []
+        for (year, team), group_df in result_df.groupby(['year', 'team'], sort=False):
+            evp_dict = self.result_dict[year][team]
+            scores = group_df.loc[:, 'player_1':'player_5'].apply(lambda col: col.map(evp_dict))
+            evp_std.append(scores.std(axis=1))
+        result_df['evp_std'] = pd.concat(evp_std)
+        result_dict = {year: {team: dict(self.result_dict[year][team])
+                              for team in sorted(self.result_dict[year])}
+                       for year in sorted(self.result_dict)}
+        return result_df, result_dict
+
+def read_lineups_df(lineups):
+    """
+    Convert lineup data to a pandas DataFrame, keeping the season labels ('2013-14') as the year.
+
+    lineups is either the lineups dictionary or the path of a lineups JSON file, which is
+    streamed and cached by lineups_reader.read_lineups.
+    """
+    if not isinstance(lineups, dict):
+        return read_lineups(lineups)
+    dfs = []
+    for year, data in lineups.items():
+        for team, team_data in data.items():
+            print(f'Processing data for the {year} season of the {team} team')
+            df = pd.DataFrame(team_data)
+            df['year'] = year
+            df['team'] = team
+            dfs.append(df)
+    df = pd.concat(dfs)
+    return df
+
+def run_evp(data_dir, lineups_path=None, gp=9, team_effect='PLUS_MINUS', n_boot=0, seed=None,
+            **options):
+    """
+    Calculate EVP for every team-season of the scraped Per100Possessions lineups.
+
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        The data root; the lineup key code table written by lineups_processors is read from it
+        when present, so the outputs share the same lineup_key.
+    lineups_path : str or pathlib.Path, optional
+        The lineups JSON, lineups_data/5lineups_100poss.json under data_dir by default.
+    gp : int
+        Number of joint appearances for lineups.
+    team_effect : str
+        The column used to measure team outcomes.
+    n_boot : int
+        Number of bootstrap replicates for confidence intervals; 0 skips them.
+    seed : int, optional
+        Seed of the bootstrap.
+    **options
+        Passed on to EVP (engine, eigensolver, tol, max_iter, jobs, ...).
+
+    Returns
+    -------
+    processor : EVP
+        The fitted EVP, with the power-iteration report in processor.eigen_report.
+    std_evp_df : pandas.DataFrame
+        The lineups with their 'evp_std'.
+    evp_dict : dict
+        {year: {team: {player: evp}}}.
+    ci : tuple of pandas.DataFrame or None
+        The lineup and player bootstrap intervals when n_boot > 0.
+    """
+    from utils import LineupKeyCodec
+
+    data_dir = Path(data_dir)
+    lineups_path = Path(lineups_path or data_dir / 'lineups_data' / '5lineups_100poss.json')
+    lineups_df = read_lineups_df(lineups_path)
+    # Share the lineup key code space written by lineups_processors so the outputs can be joined.
+    if (data_dir / 'lineup_key_codes.csv').exists():
+        key_codec = LineupKeyCodec.from_csv(data_dir / 'lineup_key_codes.csv')
+    else:
+        key_codec = LineupKeyCodec(
+            lineups_df['GROUP_ID'].str.strip('-').str.split('-').explode().astype('int64')
+        )
+
+    # engine='loop' runs the original pairwise scan for benchmarking against the default sparse engine.
+    processor = EVP(lineups_df, gp, team_effect, key_codec=key_codec, **options)
+    std_evp_df, evp_dict = processor.clean_data()
+
+    ci = None
+    if n_boot:
+        ci = processor.bootstrap(n_boot, seed=seed)
+    return processor, std_evp_df, evp_dict, ci
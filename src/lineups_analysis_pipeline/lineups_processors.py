@@ -1,49 +1,37 @@
+import re
+import ast
 import json
+import warnings
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
-import os
-import sys
 from pathlib import Path
-# Set up the project root directory and append to system path for module imports
-current_working_directory = Path(os.getcwd())
-project_root = current_working_directory.parents[1]
-sys.path.append(str(project_root / 'src'))
-
-# Define the directory for data storage
-data_dir = project_root / 'data'
-
-#%% Load data
-with open(data_dir / 'lineups_data' / '5lineups_totals.json') as f:
-    lineups_totals = json.load(f)
-with open(data_dir / 'lineups_data' / '5lineups_100poss.json') as f:
-    lineups_100poss = json.load(f)
-
-players_id = pd.read_csv(data_dir / 'players_id.csv')
-players_id_dict = {}
-for player_id, player in zip(players_id['player_id'], players_id['player']):
-    players_id_dict[player_id] = player
-
-group_apm = pd.read_csv(data_dir / 'RAPM_data' / 'group_apm_14_22_800possup.csv')
-adj_apm_rapm = pd.read_csv(data_dir / 'RAPM_data' / 'adj_apm_rapm_14_22.csv')
-# unadj_apm_rapm = pd.read_csv(data_dir / 'unadj_apm_rapm_14_22.csv')
-
-#%%
-def read_lineups_df(lineups_dict):
+from utils import LineupKeyCodec, group_ids_to_array
+from .lineups_reader import read_lineups
+
+def read_lineups_df(lineups):
     """
-    Convert lineup data from a dictionary to a pandas DataFrame.
+    Convert lineup data to a pandas DataFrame.
 
     Parameters
     ----------
-    lineups_dict : dict
-        The dictionary containing lineup data for multiple seasons and teams.
+    lineups : dict or str or pathlib.Path
+        The dictionary containing lineup data for multiple seasons and teams, or the path of
+        a lineups JSON file, which is streamed and cached by lineups_reader.read_lineups.
 
     Returns
     -------
     df : pandas.DataFrame
         The consolidated DataFrame containing all lineup data.
     """
+    if not isinstance(lineups, dict):
+        df = read_lineups(lineups)
+        df['year'] = (df['year'].str[:2] + df['year'].str[-2:]).astype('int64')
+        return df
     dfs = []
-    for year, data in lineups_dict.items():
+    for year, data in lineups.items():
         for team, team_data in data.items():
             print(f'Processing data for {team} in the {year} season.')
             df = pd.DataFrame(team_data)
@@ -53,190 +41,527 @@ def read_lineups_df(lineups_dict):
     df = pd.concat(dfs)
     return df
 
-def find_player_id(player_name, players_id_dict):
+# Generational suffixes dropped by the suffix-free name key, e.g. 'Reggie Bullock Jr.' -> 'reggie bullock'.
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'v'}
+
+def normalize_name(name, drop_suffix=False):
     """
-    Find the player ID corresponding to a given player name.
+    Build a comparison key for a player name.
+
+    The key is lower-case ASCII without accents or punctuation, in 'First Last' order
+    ('Bertans, Davis' as written by the passing data becomes 'davis bertans').
 
     Parameters
     ----------
-    player_name : str
-        The name of the player.
-    players_id_dict : dict
-        A dictionary mapping player IDs to player names.
+    name : str
+        The player name.
+    drop_suffix : bool
+        Whether to drop a trailing generational suffix (Jr., Sr., II, III, ...).
 
     Returns
     -------
-    int or None
-        The ID of the player, or None if not found.
+    key : str
+        The normalized name.
+    """
+    if ', ' in name:
+        last, first = name.split(', ', 1)
+        name = f'{first} {last}'
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    name = re.sub(r'[^a-z0-9 ]', '', name.lower().replace('-', ' '))
+    tokens = name.split()
+    while drop_suffix and len(tokens) > 2 and tokens[-1] in NAME_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+class PlayerIdentityResolver:
+    """
+    Resolve player names from any data source to NBA player IDs.
+
+    Names are looked up, in order, in the alias table, the exact name index, the normalized
+    name index, the suffix-free normalized index and finally a fuzzy match restricted to
+    players with the same (or a similar) last name. When several players share a name, the
+    one active in the given season is preferred, otherwise the first in players_id order.
+
+    Parameters
+    ----------
+    players_id : pandas.DataFrame
+        The 'player_id' and 'player' columns of players_id.csv.
+    aliases : pandas.DataFrame, optional
+        The versioned alias table (player_aliases.csv) with 'version', 'alias' and 'player_id'.
+    alias_version : int, optional
+        Only use aliases up to this version; later versions override earlier ones.
+    season_players : dict, optional
+        Season to the player IDs active in that season, used to break ties between namesakes.
+    fuzzy_cutoff : float
+        The minimum difflib similarity ratio accepted by the fuzzy fallback.
+
+    Attributes
+    ----------
+    unresolved : collections.Counter
+        Names that could not be resolved and how many times they were looked up.
+    fuzzy_matches : dict
+        Names resolved by the fuzzy fallback, for review before adding them to the alias table.
+    """
+    def __init__(self, players_id, aliases=None, alias_version=None,
+                 season_players=None, fuzzy_cutoff=0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.exact = {}
+        self.normalized = {}
+        self.stripped = {}
+        self.keys = {}
+        self.blocks = {}
+        self.prefix_blocks = {}
+        for player_id, player in zip(players_id['player_id'], players_id['player']):
+            player_id = int(player_id)
+            key = normalize_name(player, drop_suffix=True)
+            self.exact.setdefault(player, []).append(player_id)
+            self.normalized.setdefault(normalize_name(player), []).append(player_id)
+            self.stripped.setdefault(key, []).append(player_id)
+            self.keys[player_id] = key
+            last_name = key.split()[-1] if key else ''
+            self.blocks.setdefault(last_name, []).append(player_id)
+            self.prefix_blocks.setdefault(last_name[:3], []).append(player_id)
+
+        self.aliases = {}
+        if aliases is not None:
+            if alias_version is not None:
+                aliases = aliases[aliases['version'] <= alias_version]
+            aliases = aliases.sort_values('version', kind='stable')
+            for alias, player_id in zip(aliases['alias'], aliases['player_id']):
+                self.aliases[alias] = int(player_id)
+                self.aliases[normalize_name(alias)] = int(player_id)
+
+        self.season_players = {
+            season: {int(player_id) for player_id in ids}
+            for season, ids in (season_players or {}).items()
+        }
+        self.unresolved = Counter()
+        self.fuzzy_matches = {}
+        self.cache = {}
+
+    def pick(self, candidates, season=None):
+        """
+        Choose between players sharing a name: the one active in the season if known,
+        otherwise the first in players_id order, as the original linear scan did.
+        """
+        if len(candidates) > 1 and season in self.season_players:
+            active = [player_id for player_id in candidates
+                      if player_id in self.season_players[season]]
+            if active:
+                return active[0]
+        return candidates[0]
+
+    def fuzzy(self, name):
+        """
+        Match a name against players with the same last name (or the same first three letters
+        of it when there is none), returning the closest one above fuzzy_cutoff.
+        """
+        key = normalize_name(name, drop_suffix=True)
+        if not key:
+            return None
+        last_name = key.split()[-1]
+        candidates = self.blocks.get(last_name) or self.prefix_blocks.get(last_name[:3], [])
+        best_score, best_id = 0.0, None
+        for player_id in candidates:
+            score = SequenceMatcher(None, key, self.keys[player_id]).ratio()
+            if score > best_score:
+                best_score, best_id = score, player_id
+        if best_score >= self.fuzzy_cutoff:
+            self.fuzzy_matches[name] = best_id
+            return best_id
+        return None
+
+    def resolve(self, name, season=None):
+        """
+        Return the player ID of a name.
+
+        Parameters
+        ----------
+        name : str
+            The player name as written by any data source.
+        season : optional
+            The season the name appears in, used to break ties between namesakes.
+
+        Returns
+        -------
+        int
+            The player ID.
+
+        Raises
+        ------
+        KeyError
+            If the name cannot be resolved; it is also counted in self.unresolved.
+        """
+        if (name, season) in self.cache:
+            return self.cache[(name, season)]
+        player_id = self.aliases.get(name, self.aliases.get(normalize_name(name)))
+        if player_id is None:
+            for index, key in ((self.exact, name),
+                               (self.normalized, normalize_name(name)),
+                               (self.stripped, normalize_name(name, drop_suffix=True))):
+                if key in index:
+                    player_id = self.pick(index[key], season)
+                    break
+        if player_id is None:
+            player_id = self.fuzzy(name)
+        if player_id is None:
+            self.unresolved[name] += 1
+            raise KeyError(f'Unresolved player name: {name!r}')
+        self.cache[(name, season)] = player_id
+        return player_id
+
+    def resolve_names(self, names, seasons=None, errors='raise'):
+        """
+        Resolve a column of player names, looking each distinct (name, season) up once.
+
+        Parameters
+        ----------
+        names : pandas.Series
+            Player names.
+        seasons : array-like, optional
+            The season of each name, used to break ties between namesakes.
+        errors : str
+            'raise' reports every unresolved name in one ValueError;
+            'ignore' leaves them as <NA>.
+
+        Returns
+        -------
+        pandas.Series
+            Player IDs as a nullable Int64 column with the index of names.
+        """
+        season_values = ([None] * len(names) if seasons is None else np.asarray(seasons))
+        pairs = list(zip(names, season_values))
+
+        lookup = {}
+        missing = set()
+        for name, season in set(pairs):
+            try:
+                lookup[(name, season)] = self.resolve(name, season)
+            except KeyError:
+                missing.add(name)
+        if missing and errors == 'raise':
+            raise ValueError(f'Unresolved player names: {sorted(missing)}')
+        return pd.Series([lookup.get(pair) for pair in pairs], index=names.index, dtype='Int64')
+
+    def resolve_groups(self, groups, seasons=None, errors='raise'):
+        """
+        Convert lineups written as tuples of names into strings of player IDs.
+
+        Parameters
+        ----------
+        groups : pandas.Series
+            Lineups such as "('Al Horford', 'DeMarre Carroll', ...)", as in group_apm.
+        seasons : array-like, optional
+            The season of each lineup, used to break ties between namesakes.
+        errors : str
+            'raise' reports every unresolved name in one ValueError;
+            'ignore' leaves the lineups containing them as NaN.
+
+        Returns
+        -------
+        pandas.Series
+            Formatted strings of player IDs, '-id-id-id-id-id-', in the original name order.
+        """
+        names = groups.map(ast.literal_eval).explode()
+        if seasons is not None:
+            seasons = pd.Series(np.asarray(seasons), index=groups.index).loc[names.index]
+        ids = self.resolve_names(names, seasons, errors)
+        complete = ids.notna().groupby(level=0).all()
+        ids_string = '-' + ids.astype(str).groupby(level=0).agg('-'.join) + '-'
+        return ids_string.where(complete)
+
+class PassIndex:
     """
-    for player_id, name in players_id_dict.items():
-        if name == player_name:
-            return player_id
+    Passing data indexed by (season, team, passer, receiver).
+
+    Each team-season gets a dense passer x receiver matrix of passes per game, so the passes
+    of every lineup come from one gather over its 5 x 5 submatrix instead of boolean masks
+    over the whole passing table. The sums are identical to the boolean-mask version.
 
-def process_players_column(players_string):
+    Parameters
+    ----------
+    pass_data : pandas.DataFrame
+        Passing data with 'season', 'TEAM_NAME', 'PLAYER_NAME_LAST_FIRST', 'PASS_TO'
+        and the value column.
+    value : str
+        The column to aggregate, 'per_PASS' by default.
     """
-    Process a string of player names into a formatted string of player IDs.
+    def __init__(self, pass_data, value='per_PASS'):
+        passers = pass_data['PLAYER_NAME_LAST_FIRST'].to_numpy()
+        receivers = pass_data['PASS_TO'].to_numpy()
+        values = pass_data[value].to_numpy(dtype=float)
+        self.players = {}
+        self.matrices = {}
+        for key, rows in pass_data.groupby(['season', 'TEAM_NAME']).indices.items():
+            codes, names = pd.factorize(np.concatenate([passers[rows], receivers[rows]]))
+            passer_codes, receiver_codes = codes[:len(rows)], codes[len(rows):]
+            valid = (passer_codes >= 0) & (receiver_codes >= 0)
+            passer_codes, receiver_codes = passer_codes[valid], receiver_codes[valid]
+            # A pair listed on several rows gets one layer per occurrence, so the rows are still
+            # added one at a time in pass_data order and the sums match the boolean-mask version.
+            layer = (pd.Series(passer_codes * len(names) + receiver_codes)
+                     .groupby(passer_codes * len(names) + receiver_codes)
+                     .cumcount()
+                     .to_numpy())
+            shape = (layer.max(initial=0) + 1, len(names), len(names))
+            matrix = np.zeros(shape)
+            matrix[layer, passer_codes, receiver_codes] = values[rows][valid]
+            position = np.full(shape, np.inf)
+            position[layer, passer_codes, receiver_codes] = rows[valid]
+            self.players[key] = dict(zip(names, range(len(names))))
+            self.matrices[key] = (matrix, position)
+
+    def pass_out(self, seasons, teams, players):
+        """
+        Passes per game from each player of a lineup to the other four.
+
+        Parameters
+        ----------
+        seasons : array-like
+            The season of each lineup, e.g. '2013-14'.
+        teams : array-like
+            The team name of each lineup.
+        players : numpy.ndarray
+            The (lineups, 5) array of player names.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (lineups, 5) array; players missing from the passing data get 0.
+        """
+        players = np.asarray(players, dtype=object)
+        result = np.zeros(players.shape)
+        groups = pd.DataFrame({'season': seasons, 'team': teams}).groupby(['season', 'team'])
+        off_diagonal = ~np.eye(players.shape[1], dtype=bool)
+        for key, rows in groups.indices.items():
+            if key not in self.matrices:
+                continue
+            index = self.players[key]
+            matrix, position = self.matrices[key]
+            codes = np.vectorize(lambda name: index.get(name, -1), otypes=[int])(players[rows])
+            known = (codes[:, :, None] >= 0) & (codes[:, None, :] >= 0) & off_diagonal
+            passer, receiver = codes[:, :, None], codes[:, None, :]
+            values = np.where(known, matrix[:, passer, receiver], 0.0)
+            order = np.where(known, position[:, passer, receiver], np.inf)
+            # Stack the occurrence layers of all receivers and sort them by pass_data row.
+            values = np.moveaxis(values, 0, -1).reshape(len(rows), players.shape[1], -1)
+            order = np.moveaxis(order, 0, -1).reshape(len(rows), players.shape[1], -1)
+            values = np.take_along_axis(values, np.argsort(order, axis=2, kind='stable'), axis=2)
+            # Add the receivers one at a time in pass_data row order, as Series.sum did.
+            total = np.zeros(values.shape[:2])
+            for j in range(values.shape[2]):
+                total = total + values[:, :, j]
+            result[rows] = total
+        return result
+
+def lineup_player_bridge(lineups_df, codec, key_col='lineup_key', keys=('year',)):
+    """
+    Build the lineup-player bridge table: one row per (lineup, slot, player_id).
 
     Parameters
     ----------
-    players_string : str
-        A string containing the names of players in a lineup.
+    lineups_df : pandas.DataFrame
+        Lineups with a packed lineup key column.
+    codec : utils.LineupKeyCodec
+        The codec that produced the lineup keys.
+    key_col : str
+        The name of the lineup key column.
+    keys : tuple of str
+        Lineup columns copied onto every row, used to join per-player-season attributes.
 
     Returns
     -------
-    ids_string : str
-        A formatted string of player IDs, separated by hyphens.
+    bridge : pandas.DataFrame
+        Columns 'lineup' (row position in lineups_df), 'slot' (1-5), 'player_id' (int64)
+        and the keys, with the five slots of each lineup on consecutive rows.
     """
-    # Remove parentheses and quotes from the string
-    players_list = [player.strip()[1:-1] for player in players_string.strip('()').split(",")]
-
-    player_ids = []
-    for player in players_list:
-        player_id = find_player_id(player, players_id_dict)
-        player_ids.append(str(player_id))
-    
-    # Create a string of IDs, formatted as '-id-id-id-id-id-'
-    ids_string = '-' + '-'.join(player_ids) + '-'
-    return ids_string
-
-def sorted_players_id(players_string):
+    ids = codec.decode(lineups_df[key_col])
+    n_lineups, n_slots = ids.shape
+    bridge = pd.DataFrame({
+        'lineup'   : np.repeat(np.arange(n_lineups), n_slots),
+        'slot'     : np.tile(np.arange(1, n_slots + 1), n_lineups),
+        'player_id': ids.ravel()
+    })
+    for key in keys:
+        bridge[key] = np.repeat(lineups_df[key].to_numpy(), n_slots)
+    return bridge
+
+def join_player_features(bridge, features, columns, keys=('year',), slots=True, aggs=()):
     """
-    Sort the player IDs in a given string.
+    Join per-player-season attributes onto the bridge table once and bring them back to lineups.
 
     Parameters
     ----------
-    players_string : str
-        A string of player IDs, separated by hyphens.
+    bridge : pandas.DataFrame
+        The table from lineup_player_bridge.
+    features : pandas.DataFrame
+        One row per player and keys, with a 'player_id' column (e.g. RAPM, APM, EVP).
+    columns : list of str
+        The attributes to attach.
+    keys : tuple of str
+        The columns besides player_id that identify a row of features.
+    slots : bool
+        Whether to return one column per slot, 'player_{slot}_{column}'.
+    aggs : list of str
+        Lineup-level aggregates among 'sum', 'std', 'min' and 'max', returned as
+        'player_{column}_{agg}'. They are NaN when any player lacks the attribute,
+        as with adding the slot columns by hand.
 
     Returns
     -------
-    sorted_string : str
-        A sorted and rejoined string of player IDs.
+    pandas.DataFrame
+        One row per lineup, in bridge order, with lower-case attribute names.
     """
-    # Split the string by "-", sort the IDs, and rejoin them
-    players_list = players_string.split('-')[1:-1]
-    players_list = [int(idx) for idx in players_list]
-    players_list_sorted = sorted(players_list)
-    players_list_sorted = [str(idx) for idx in players_list_sorted]
-    sorted_string = '-' + '-'.join(players_list_sorted) + '-'
-    return sorted_string
-
-def convert_ids_to_players(player_ids):
+    n_slots = int(bridge['slot'].max())
+    merged = bridge.merge(features[['player_id', *keys, *columns]],
+                          on=['player_id', *keys],
+                          how='left',
+                          validate='many_to_one')
+    result = {}
+    for column in columns:
+        values = merged[column].to_numpy(dtype=float).reshape(-1, n_slots)
+        name = column.lower()
+        if slots:
+            for slot in range(n_slots):
+                result[f'player_{slot + 1}_{name}'] = values[:, slot]
+        for agg in aggs:
+            if agg == 'sum':
+                # Add the slots in order so the result matches player_1 + ... + player_5.
+                total = values[:, 0]
+                for slot in range(1, n_slots):
+                    total = total + values[:, slot]
+                result[f'player_{name}_sum'] = total
+            elif agg == 'std':
+                result[f'player_{name}_std'] = values.std(axis=1, ddof=1)
+            elif agg in ('min', 'max'):
+                result[f'player_{name}_{agg}'] = getattr(values, agg)(axis=1)
+            else:
+                raise ValueError(f'Unknown aggregate: {agg!r}')
+    return pd.DataFrame(result)
+
+def process_lineups(data_dir, min_minutes=100):
     """
-    Convert a string of player IDs to a list of player names.
+    Build the lineup regression dataset, '(new) all_100poss_lineups_data.csv'.
+
+    Lineups with at least min_minutes in a season are joined with their group APM, their
+    Per100Possessions box score, the players' RAPM and the passes between the five players.
+    The lineup key code table is also written to 'lineup_key_codes.csv'.
 
     Parameters
     ----------
-    player_ids : str
-        A string of player IDs, separated by hyphens.
+    data_dir : str or pathlib.Path
+        The data root holding lineups_data/, RAPM_data/ and the player tables.
+    min_minutes : float
+        The minimum minutes a lineup must have played in a single season.
 
     Returns
     -------
-    list
-        A list of player names corresponding to the IDs.
+    merged_100poss_df : pandas.DataFrame
+        The dataset that was written.
     """
-    # Strip the hyphens and split the IDs
-    ids = player_ids.strip('-').split('-')
-    # Convert IDs to player names
-    players = [players_id_dict.get(int(idx), None) for idx in ids]
-    return players
-
-#%%
-
-group_apm['Group'] = group_apm['Group'].apply(process_players_column)
-group_apm['Group'] = group_apm['Group'].apply(sorted_players_id)
-
-lineups_df_totals = read_lineups_df(lineups_totals)
-lineups_df_100poss = read_lineups_df(lineups_100poss)
-
-lineups_df_totals['Group'] = (lineups_df_totals['GROUP_ID']
-                              .apply(sorted_players_id)
-                              )
-# lineups_df.columns
-lineups_df_totals = lineups_df_totals[['Group', 'team', 'year', 'MIN']]
-
-# Filter lineups that played more than 100 minutes in a single season
-lineups_df_totals = lineups_df_totals[lineups_df_totals['MIN'] >= 100]
-
-merged_df = pd.merge(group_apm, lineups_df_totals, on=['Group', 'year'])
-
-lineups_df_100poss['Group'] = (lineups_df_100poss['GROUP_ID']
-                               .apply(sorted_players_id)
-                               )
-# lineups_df_100poss.columns
-lineups_df_100poss = lineups_df_100poss[['Group', 'team', 'year', 'GP',
-    'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT',
-    'FTM', 'FTA', 'FT_PCT', 'OREB', 'DREB', 'REB',
-    'AST', 'TOV', 'STL', 'BLK', 'PF',
-    'PTS', 'PLUS_MINUS']]
-
-merged_100poss_df = pd.merge(merged_df,
-                             lineups_df_100poss,
-                             on=['Group', 'team', 'year'])
-
-merged_100poss_df[['player_1',
-                   'player_2',
-                   'player_3',
-                   'player_4',
-                   'player_5']] = (merged_100poss_df['Group']
-                                   .apply(convert_ids_to_players)
-                                   .apply(pd.Series)
-                                   )
-
-# Merge RAPM data into the corresponding player columns
-for i in range(1, 6):
-    merged_100poss_df = (merged_100poss_df
-                         .merge(adj_apm_rapm[['Player', 'RAPM', 'year']],
-                                left_on=[f'player_{i}', 'year'],
-                                right_on=['Player', 'year'],
-                                how='left')
-                         .drop(columns=['Player'])
-                         .rename(columns={'RAPM': f'player_{i}_rapm'})
-                         )
-
-merged_100poss_df['player_rapm_sum'] = (merged_100poss_df['player_1_rapm']
-                                        + merged_100poss_df['player_2_rapm']
-                                        + merged_100poss_df['player_3_rapm']
-                                        + merged_100poss_df['player_4_rapm']
-                                        + merged_100poss_df['player_5_rapm']
-                                        )
-
-# merged_100poss_df.to_csv(data_dir / 'all_100poss_lineups_data.csv',
-#                          index=False)
-
-#%% 2024/08/10 Add passing data into regression dataset
-
-pass_data = pd.read_csv(data_dir / 'pass_data_14_22.csv')
-
-pass_data['TEAM_NAME'].replace({
-    'Charlotte Bobcats'   : 'Charlotte Hornets',
-    'Los Angeles Clippers': 'LA Clippers'
-    }, inplace=True)
-
-pass_data['per_PASS'] = (
-    pass_data['PASS'].div(pass_data['G'], axis = 0)
-)
-
-def calculate_passes(row, pass_data):
-    passes = {}
+    data_dir = Path(data_dir)
+
+    players_id = pd.read_csv(data_dir / 'players_id.csv')
+    players_id_dict = {}
+    for player_id, player in zip(players_id['player_id'], players_id['player']):
+        players_id_dict[player_id] = player
+    # Name fixes between data sources live in the versioned alias table instead of manual edits.
+    player_aliases = pd.read_csv(data_dir / 'player_aliases.csv')
+    with open(data_dir / 'season_players_id_14_22.json') as f:
+        season_players = {int(season[:2] + season[-2:]): ids
+                          for season, ids in json.load(f).items()}
+
+    group_apm = pd.read_csv(data_dir / 'RAPM_data' / 'group_apm_14_22_800possup.csv')
+    adj_apm_rapm = pd.read_csv(data_dir / 'RAPM_data' / 'adj_apm_rapm_14_22.csv')
+    # unadj_apm_rapm = pd.read_csv(data_dir / 'unadj_apm_rapm_14_22.csv')
+
+    resolver = PlayerIdentityResolver(players_id, player_aliases,
+                                      season_players=season_players)
+    group_apm['Group'] = resolver.resolve_groups(group_apm['Group'], group_apm['year'])
+
+    lineups_df_totals = read_lineups_df(data_dir / 'lineups_data' / '5lineups_totals.json')
+    lineups_df_100poss = read_lineups_df(data_dir / 'lineups_data' / '5lineups_100poss.json')
+
+    # Join and group on packed int64 lineup keys over a dense code space of the players seen here
+    group_apm_ids = group_ids_to_array(group_apm['Group'])
+    totals_ids = group_ids_to_array(lineups_df_totals['GROUP_ID'])
+    poss_ids = group_ids_to_array(lineups_df_100poss['GROUP_ID'])
+    lineup_codec = LineupKeyCodec(np.concatenate([group_apm_ids.ravel(),
+                                                  totals_ids.ravel(),
+                                                  poss_ids.ravel()]))
+    lineup_codec.to_csv(data_dir / 'lineup_key_codes.csv')
+
+    group_apm['lineup_key'] = lineup_codec.encode(group_apm_ids)
+    group_apm['Group'] = lineup_codec.decode_group_ids(group_apm['lineup_key'])
+    lineups_df_totals['lineup_key'] = lineup_codec.encode(totals_ids)
+    lineups_df_100poss['lineup_key'] = lineup_codec.encode(poss_ids)
+
+    lineups_df_totals = lineups_df_totals[['lineup_key', 'team', 'year', 'MIN']]
+
+    # Filter lineups that played more than 100 minutes in a single season
+    lineups_df_totals = lineups_df_totals[lineups_df_totals['MIN'] >= min_minutes]
+
+    merged_df = pd.merge(group_apm, lineups_df_totals, on=['lineup_key', 'year'])
+
+    lineups_df_100poss = lineups_df_100poss[['lineup_key', 'team', 'year', 'GP',
+        'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT',
+        'FTM', 'FTA', 'FT_PCT', 'OREB', 'DREB', 'REB',
+        'AST', 'TOV', 'STL', 'BLK', 'PF',
+        'PTS', 'PLUS_MINUS']]
+
+    merged_100poss_df = pd.merge(merged_df,
+                                 lineups_df_100poss,
+                                 on=['lineup_key', 'team', 'year'])
+
+    lineup_ids = pd.DataFrame(lineup_codec.decode(merged_100poss_df['lineup_key']),
+                              index=merged_100poss_df.index)
+    merged_100poss_df[['player_1',
+                       'player_2',
+                       'player_3',
+                       'player_4',
+                       'player_5']] = (lineup_ids
+                                       .apply(lambda ids: ids.map(players_id_dict))
+                                       .to_numpy()
+                                       )
+
+    # Join RAPM once through the lineup-player bridge table, keyed by player ID and year
+    # A RAPM name missing from the ID table leaves that player's RAPM as NaN instead of failing.
+    adj_apm_rapm['player_id'] = resolver.resolve_names(adj_apm_rapm['Player'], adj_apm_rapm['year'],
+                                                       errors='ignore')
+    unresolved = adj_apm_rapm['player_id'].isna()
+    if unresolved.any():
+        warnings.warn(f'RAPM players missing from the ID table, their RAPM is left as NaN: '
+                      f'{sorted(adj_apm_rapm.loc[unresolved, "Player"].unique())}')
+    lineup_players = lineup_player_bridge(merged_100poss_df, lineup_codec)
+    player_rapm = join_player_features(lineup_players, adj_apm_rapm[~unresolved], ['RAPM'],
+                                       aggs=['sum'])
+    merged_100poss_df = pd.concat([merged_100poss_df, player_rapm.set_axis(merged_100poss_df.index)],
+                                  axis=1)
+
+    # 2024/08/10 Add passing data into regression dataset
+    pass_data = pd.read_csv(data_dir / 'pass_data_14_22.csv')
+
+    pass_data['TEAM_NAME'] = pass_data['TEAM_NAME'].replace({
+        'Charlotte Bobcats'   : 'Charlotte Hornets',
+        'Los Angeles Clippers': 'LA Clippers'
+        })
+
+    pass_data['per_PASS'] = (
+        pass_data['PASS'].div(pass_data['G'], axis = 0)
+    )
+
+    merged_100poss_df['season'] = merged_100poss_df['year'].apply(lambda x: f'{x-1}-{str(x)[-2:]}')
+
+    pass_index = PassIndex(pass_data)
+    pass_out = pass_index.pass_out(merged_100poss_df['season'],
+                                   merged_100poss_df['team'],
+                                   merged_100poss_df[[f'player_{i}' for i in range(1, 6)]].to_numpy())
     for i in range(1, 6):
-        # 計算每個球員的 pass_out
-        pass_out = (pass_data['season'] == row['season']) & \
-            (pass_data['TEAM_NAME'] == row['team']) & \
-            (pass_data['PLAYER_NAME_LAST_FIRST'] == row[f'player_{i}']) & \
-            (pass_data['PASS_TO'].isin([row[f'player_{j}'] for j in range(1, 6) if j != i]))
-        passes[f'player_{i}_pass_out'] = pass_data[pass_out]['per_PASS'].sum()
-    return passes
-
-merged_100poss_df['season'] = merged_100poss_df['year'].apply(lambda x: f'{x-1}-{str(x)[-2:]}')
-
-for index, row in tqdm(merged_100poss_df.iterrows()):
-    result = calculate_passes(row, pass_data)
-    for key, value in result.items():
-        merged_100poss_df.at[index, key] = value
-        
-std_pass_out = merged_100poss_df[['player_1_pass_out', 'player_2_pass_out', 'player_3_pass_out', 'player_4_pass_out', 'player_5_pass_out']].std(axis=1)
-merged_100poss_df['std_pass_out'] = std_pass_out
-
-merged_100poss_df.to_csv(data_dir / '(new) all_100poss_lineups_data.csv',
-                         index=False)
+        merged_100poss_df[f'player_{i}_pass_out'] = pass_out[:, i - 1]
+
+    std_pass_out = merged_100poss_df[['player_1_pass_out', 'player_2_pass_out', 'player_3_pass_out', 'player_4_pass_out', 'player_5_pass_out']].std(axis=1)
+    merged_100poss_df['std_pass_out'] = std_pass_out
+
+    merged_100poss_df.to_csv(data_dir / '(new) all_100poss_lineups_data.csv',
+                             index=False)
+    return merged_100poss_df
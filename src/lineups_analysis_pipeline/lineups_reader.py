@@ -0,0 +1,278 @@
+"""
+Streaming reader for the scraped lineups JSON ({season: {team: {column: {row: value}}}})
+with a columnar cache.
+
+The JSON is walked one team at a time, so only one team's lineups are decoded at once
+instead of the whole file. On first read every column is written as an .npy file (string
+columns as dictionary codes plus their distinct values) to a cache folder named after the
+source file's SHA-256; later reads memory-map the cache instead of parsing the JSON.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1
+
+class _JSONStream:
+    """
+    A read buffer over a JSON text file that decodes one token or value at a time.
+    """
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, size):
+        if self.pos > self.chunk_size:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.f.read(size)
+        self.buffer += chunk
+        return bool(chunk)
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill(self.chunk_size):
+                raise ValueError('Unexpected end of the lineups JSON.')
+
+    def expect(self, token):
+        if self.peek() != token:
+            raise ValueError(f'Expected {token!r} at offset {self.pos} of the lineups JSON.')
+        self.pos += 1
+
+    def decode(self):
+        # Only strings and objects are decoded here; both are complete only once their
+        # closing character is in the buffer, so a failed decode just needs more text.
+        if self.peek() not in '"{':
+            raise ValueError(f'Expected a string or an object at offset {self.pos} of the lineups JSON.')
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(max(self.chunk_size, len(self.buffer) - self.pos)):
+                    raise
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """
+        Iterate over the keys of the object starting here, leaving each value to the caller.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+def iter_lineups_json(path, chunk_size=1 << 23):
+    """
+    Stream a lineups JSON file.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        A file written by the lineups scraper.
+    chunk_size : int
+        Number of characters read at a time.
+
+    Yields
+    ------
+    season : str
+    team : str
+    team_data : dict
+        The team's lineups in the df.to_dict() layout.
+    """
+    with open(path, encoding='utf-8') as f:
+        stream = _JSONStream(f, chunk_size)
+        for season in stream.items():
+            for team in stream.items():
+                yield season, team, stream.decode()
+
+def file_digest(path, chunk_size=1 << 24):
+    """
+    SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _concat_column(parts):
+    """
+    Concatenate one column's per-team arrays (an int stands for a team lacking the column) the
+    way concatenating the per-team DataFrames would.
+    """
+    arrays = [part for part in parts if not isinstance(part, int)]
+    dtype = arrays[0].dtype
+    if len(arrays) == len(parts) and all(array.dtype == dtype for array in arrays):
+        return pd.Series(type(arrays[0])._concat_same_type(arrays), dtype=dtype, copy=False)
+    dtype = pd.concat([pd.Series(array[:0], dtype=array.dtype) for array in arrays]).dtype
+    if len(arrays) < len(parts):
+        # Missing rows are NaN, which turns an integer or boolean column into floats or objects.
+        fill = dtype if dtype.kind in 'fcO' or not isinstance(dtype, np.dtype) else float
+        parts = [pd.Series(np.nan, index=range(part), dtype=fill) if isinstance(part, int)
+                 else pd.Series(part, dtype=part.dtype, copy=False) for part in parts]
+    else:
+        parts = [pd.Series(part, dtype=part.dtype, copy=False) for part in parts]
+    return pd.concat(parts, ignore_index=True)
+
+def lineups_frame(items):
+    """
+    Build the lineups DataFrame from (season, team, team_data) items, adding 'year'
+    (the season label, e.g. '2013-14') and 'team' columns.
+
+    Every team's columns are copied out as separate arrays and each column is concatenated on
+    its own once the stream ends, dropping its pieces right away, so the peak memory is the
+    table plus one column instead of twice the table. The dtypes are those of concatenating
+    the per-team DataFrames.
+    """
+    pieces = {}
+    index = []
+    rows = 0
+    for season, team, team_data in items:
+        df = pd.DataFrame(team_data)
+        df['year'] = season
+        df['team'] = team
+        for name, values in df.items():
+            if name not in pieces:
+                # Earlier teams, even empty ones, lack a new column; an int marks such a gap.
+                pieces[name] = [rows] if index else []
+            # A copy, so that no piece keeps the team's whole block alive.
+            pieces[name].append(values.array.copy())
+        for name in pieces.keys() - set(df.columns):
+            pieces[name].append(len(df))
+        index.append(df.index)
+        rows += len(df)
+        del df
+
+    data = {}
+    for name in list(pieces):
+        data[name] = _concat_column(pieces.pop(name))
+    # Series keep their dtypes; the index is set afterwards so they are not realigned.
+    df = pd.DataFrame(data, copy=False)
+    df.index = index[0].append(index[1:]) if index else pd.RangeIndex(0)
+    return df
+
+def write_columns(df, folder):
+    """
+    Write a DataFrame as one .npy file per column, plus its index, described by columns.json.
+    Columns of strings are stored as int32 codes into their distinct values; missing values
+    get the code -1.
+    """
+    folder = Path(folder)
+    columns = []
+    for i, (name, values) in enumerate([('__index__', df.index.to_series())] + list(df.items())):
+        dtype = str(values.dtype)
+        if values.dtype.kind in 'biufcmM':
+            np.save(folder / f'{i}.npy', values.to_numpy(), allow_pickle=False)
+            kind = 'array'
+        else:
+            codes, uniques = pd.factorize(values.to_numpy(dtype=object), use_na_sentinel=True)
+            if not all(isinstance(value, str) for value in uniques):
+                raise TypeError(f'Column {name!r} mixes strings with other values.')
+            np.save(folder / f'{i}.codes.npy', codes.astype('int32'), allow_pickle=False)
+            np.save(folder / f'{i}.values.npy', np.array(uniques, dtype=str), allow_pickle=False)
+            kind = 'dictionary'
+        columns.append({'name': name, 'kind': kind, 'dtype': dtype})
+    with open(folder / 'columns.json', 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'rows': len(df), 'columns': columns}, f, indent=4)
+
+def read_columns(folder):
+    """
+    Load a DataFrame written by write_columns. Numeric columns are memory-mapped copy-on-write,
+    so they are paged in on use and never written back to the cache.
+    """
+    folder = Path(folder)
+    with open(folder / 'columns.json') as f:
+        meta = json.load(f)
+    if meta['version'] != CACHE_VERSION:
+        raise ValueError(f'Unsupported lineups cache version {meta["version"]}.')
+    data = {}
+    index = None
+    for i, column in enumerate(meta['columns']):
+        if column['kind'] == 'array':
+            values = np.load(folder / f'{i}.npy', mmap_mode='c')
+        else:
+            codes = np.load(folder / f'{i}.codes.npy', mmap_mode='c')
+            uniques = np.load(folder / f'{i}.values.npy').astype(object)
+            values = np.append(uniques, None)[codes]
+            values = pd.array(values, dtype=column['dtype'])
+        if column['name'] == '__index__':
+            index = pd.Index(values, dtype=column['dtype'])
+        else:
+            data[column['name']] = values
+    return pd.DataFrame(data, index=index, copy=False)
+
+def read_lineups(path, cache_dir=None, use_cache=True):
+    """
+    Read a lineups JSON file into one DataFrame, through the columnar cache.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        A file written by the lineups scraper.
+    cache_dir : str or pathlib.Path, optional
+        Where cached columns are kept, '.lineups_cache' next to the file by default.
+    use_cache : bool
+        False streams the JSON without reading or writing the cache.
+
+    Returns
+    -------
+    pandas.DataFrame
+        All lineups with 'year' (the season label, e.g. '2013-14') and 'team' columns.
+    """
+    path = Path(path)
+    if not use_cache:
+        return lineups_frame(iter_lineups_json(path))
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else path.parent / '.lineups_cache'
+    stat = path.stat()
+    # A cache whose recorded size and mtime match the file is reused without rehashing it.
+    for source in cache_dir.glob(f'{path.stem}-*/source.json'):
+        with open(source) as f:
+            recorded = json.load(f)
+        if recorded['size'] == stat.st_size and recorded['mtime_ns'] == stat.st_mtime_ns:
+            return read_columns(source.parent)
+
+    digest = file_digest(path)
+    folder = cache_dir / f'{path.stem}-{digest[:16]}'
+    if not (folder / 'columns.json').exists():
+        df = lineups_frame(iter_lineups_json(path))
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary folder first, so an interrupted run never leaves a partial cache.
+        tmp = Path(tempfile.mkdtemp(dir=cache_dir, prefix=f'.{path.stem}-'))
+        try:
+            write_columns(df, tmp)
+            if folder.exists():
+                shutil.rmtree(folder)
+            os.replace(tmp, folder)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        for stale in cache_dir.glob(f'{path.stem}-*'):
+            if stale != folder and stale.is_dir():
+                shutil.rmtree(stale, ignore_errors=True)
+    with open(folder / 'source.json', 'w') as f:
+        json.dump({'path': str(path), 'sha256': digest,
+                   'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}, f, indent=4)
+    return read_columns(folder)
@@ -1,57 +1,219 @@
 import pandas as pd
-import statsmodels.api as sm
-import os
-import sys
 from pathlib import Path
-# Set up the project root directory and append to system path for module imports
-current_working_directory = Path(os.getcwd())
-project_root = current_working_directory.parents[1]
-sys.path.append(str(project_root / 'src'))
-from models import formatted_reg_model
-from utils import generate_latex_table
-
-# Define the directory for data storage
-data_dir = project_root / 'data'
-
-#%%
-
-df = pd.read_csv(data_dir / '(new) all_100poss_lineups_data.csv')
-df['const'] = 1
-df.columns
-y = df['PLUS_MINUS']
-X = df[['const', 'player_rapm_sum']]
-model = sm.OLS(y, X)
-results = model.fit()
-print(results.summary())
-
-#%%
-
-result_df = formatted_reg_model(results)
-generate_latex_table(result_df, "reg_team_apm.tex")
-
-#%%
-# In my master's thesis,
-# I overlooked the issue of mismatched player names between the passing data and the Lineups data,
-# resulting in some discrepancies.
-# The values in the code have been updated to the correct version.
-df['PM_minus_RAPM'] = df['PLUS_MINUS'] - df['player_rapm_sum']*2.1760
-view = df[['year', 'team', 'player_1', 'player_2', 'player_3',
-           'player_4', 'player_5', 'PM_minus_RAPM', 'Appearances']]
-
-view.to_csv(data_dir / 'team_effect.csv', index=False)
-
-#%%
-
-y = df['PM_minus_RAPM']
-X = df[['const',
-        'OREB', 'DREB', 'AST', 'TOV', 'STL',
-        'std_pass_out']]
-
-model = sm.OLS(y, X)
-results = model.fit()
-print(results.summary())
-
-#%%
-
-result_df = formatted_reg_model(results)
-generate_latex_table(result_df, "team_effect.tex")
+from models import (formatted_reg_model, regression_table, OLSSweep, all_specifications,
+                    ClusterInference)
+from utils import generate_latex_table, LineupKeyCodec, group_ids_to_array
+
+# Regression specifications: table name -> (dependent variable, regressors).
+REGRESSIONS = {
+    'reg_team_apm': ('PLUS_MINUS', ['const', 'player_rapm_sum']),
+    'team_effect' : ('PM_minus_RAPM', ['const',
+                                       'OREB', 'DREB', 'AST', 'TOV', 'STL',
+                                       'std_pass_out'])
+}
+
+# Cluster choices of the robust standard errors: name -> one column per cluster dimension.
+CLUSTERS = {
+    'team-season': ['team_season'],
+    'team': ['team'],
+    'year': ['year'],
+    'team+year': ['team', 'year']
+}
+
+# Candidate regressors of the team effect specification sweep.
+BOX_SCORE_COLUMNS = ['FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB',
+                     'AST', 'TOV', 'STL', 'BLK', 'PF', 'std_pass_out']
+
+def prepare_regression_data(data_dir):
+    """
+    Load the lineup dataset, add the team effect (PLUS_MINUS net of the players' RAPM)
+    and write it to 'team_effect.csv'.
+
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        The data root holding '(new) all_100poss_lineups_data.csv'.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        The dataset with 'const', 'lineup_key' and 'PM_minus_RAPM' columns.
+    """
+    data_dir = Path(data_dir)
+    df = pd.read_csv(data_dir / '(new) all_100poss_lineups_data.csv')
+    # Datasets written before the packed lineup key existed only carry the sorted Group IDs.
+    if 'lineup_key' not in df:
+        if (data_dir / 'lineup_key_codes.csv').exists():
+            lineup_codec = LineupKeyCodec.from_csv(data_dir / 'lineup_key_codes.csv')
+        else:
+            lineup_codec = LineupKeyCodec(group_ids_to_array(df['Group']).ravel())
+        df['lineup_key'] = lineup_codec.encode_group_ids(df['Group'])
+    df['const'] = 1
+
+    # In my master's thesis,
+    # I overlooked the issue of mismatched player names between the passing data and the Lineups data,
+    # resulting in some discrepancies.
+    # The values in the code have been updated to the correct version.
+    df['PM_minus_RAPM'] = df['PLUS_MINUS'] - df['player_rapm_sum']*2.1760
+    view = df[['lineup_key', 'year', 'team', 'player_1', 'player_2', 'player_3',
+               'player_4', 'player_5', 'PM_minus_RAPM', 'Appearances']]
+
+    view.to_csv(data_dir / 'team_effect.csv', index=False)
+    return df
+
+def fit_regressions(df, specs=REGRESSIONS):
+    """
+    Fit one OLS model per specification.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The dataset from prepare_regression_data.
+    specs : dict
+        Table name -> (dependent variable, regressors).
+
+    Returns
+    -------
+    dict
+        Table name -> statsmodels RegressionResults.
+    """
+    # statsmodels is slow to import, so only load it when fitting.
+    import statsmodels.api as sm
+    results = {}
+    for name, (dependent, regressors) in specs.items():
+        model = sm.OLS(df[dependent], df[list(regressors)])
+        results[name] = model.fit()
+        print(results[name].summary())
+    return results
+
+def cluster_results(results, df, cluster='team-season', cov_type='CR1', n_boot=0,
+                    weights='rademacher', seed=None, jobs=1):
+    """
+    Replace the OLS standard errors of fitted regressions with cluster-robust ones.
+
+    Lineups of the same team-season share coaching, schemes and opponents, so their
+    errors are correlated and the OLS standard errors are too small.
+
+    Parameters
+    ----------
+    results : dict
+        Table name -> statsmodels RegressionResults, as from fit_regressions.
+    df : pandas.DataFrame
+        The dataset the models were fitted on.
+    cluster : str
+        A key of CLUSTERS; 'team+year' clusters two-way by team and by year.
+    cov_type : str
+        'CR1' or 'CR2'.
+    n_boot : int
+        Wild cluster bootstrap replications on the first cluster dimension instead of
+        cov_type; 0 skips the bootstrap.
+    weights : str
+        The bootstrap weights, 'rademacher' or 'webb'.
+    seed : int, optional
+        Seed of the bootstrap.
+    jobs : int
+        Worker processes of the bootstrap; 0 uses every CPU core.
+
+    Returns
+    -------
+    dict
+        Table name -> ClusterResult, accepted by formatted_reg_model and regression_table.
+    """
+    df = df.assign(team_season=df['team'].astype(str) + ' ' + df['year'].astype(str))
+    clusters = df[CLUSTERS[cluster]]
+    robust = {}
+    for name, result in results.items():
+        inference = ClusterInference.from_results(result, clusters.loc[result.model.data.row_labels])
+        if n_boot > 0:
+            robust[name] = inference.wild_bootstrap(n_boot, weights=weights, seed=seed, jobs=jobs)
+        else:
+            robust[name] = inference.result(cov_type)
+    return robust
+
+def write_latex_tables(tables, latex_dir):
+    """
+    Write each formatted table to '<name>.tex' in latex_dir.
+    """
+    for name, result_df in tables.items():
+        generate_latex_table(result_df, f'{name}.tex', path=Path(latex_dir))
+
+def run_regressions(data_dir, latex_dir=None, specs=REGRESSIONS, combined_table=None,
+                    cluster=None, cov_type='CR1', n_boot=0, seed=None, jobs=1):
+    """
+    Fit the team APM and team effect regressions on the lineup dataset.
+
+    The lineups' team effect is written to 'team_effect.csv' and one LaTeX table per
+    specification ('reg_team_apm.tex' and 'team_effect.tex' by default) to latex_dir.
+
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        The data root holding '(new) all_100poss_lineups_data.csv'.
+    latex_dir : str or pathlib.Path, optional
+        Where the LaTeX tables are written, latex_table/ next to data_dir by default.
+    specs : dict
+        Table name -> (dependent variable, regressors).
+    combined_table : str, optional
+        Also write every specification side by side, one column per model, to this
+        '.tex' file in latex_dir.
+    cluster : str, optional
+        Report cluster-robust standard errors clustered by this key of CLUSTERS instead of
+        the OLS ones; see cluster_results for cov_type, n_boot, seed and jobs.
+
+    Returns
+    -------
+    dict
+        Table name -> statsmodels RegressionResults, or ClusterResult with cluster.
+    """
+    data_dir = Path(data_dir)
+    latex_dir = Path(latex_dir) if latex_dir is not None else data_dir.parent / 'latex_table'
+
+    df = prepare_regression_data(data_dir)
+    results = fit_regressions(df, specs)
+    if cluster is not None:
+        results = cluster_results(results, df, cluster, cov_type=cov_type, n_boot=n_boot,
+                                  seed=seed, jobs=jobs)
+    tables = {name: formatted_reg_model(result) for name, result in results.items()}
+    if combined_table is not None:
+        tables[Path(combined_table).stem] = regression_table(results)
+    write_latex_tables(tables, latex_dir)
+    return results
+
+def sweep_team_effect(data_dir, columns=BOX_SCORE_COLUMNS, dependent='PM_minus_RAPM',
+                      interactions=False, max_size=None, output=None):
+    """
+    Fit the team effect regression on every subset of the candidate regressors (and,
+    with interactions, of their pairwise products whose main effects are included).
+
+    Every specification keeps the constant. The models are solved from one cross-product
+    matrix by OLSSweep instead of one sm.OLS fit each.
+
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        The data root holding '(new) all_100poss_lineups_data.csv'.
+    columns : list of str
+        Candidate regressors.
+    dependent : str
+        The dependent variable.
+    interactions : bool
+        Also sweep the pairwise interactions of the candidates.
+    max_size : int, optional
+        Most candidates in one specification, all of them by default.
+    output : str or pathlib.Path, optional
+        CSV with one row per specification: its statistics, then the coefficients and
+        '<variable>_stderr' standard errors, sorted by BIC.
+
+    Returns
+    -------
+    SweepResults
+        The statistics, coefficients, standard errors and p-values of every specification.
+    """
+    df = prepare_regression_data(data_dir)
+    sweep = OLSSweep(df, dependent, ['const', *columns], interactions=interactions)
+    results = sweep.fit(all_specifications(sweep.columns[1:], max_size=max_size))
+    if output is not None:
+        table = pd.concat([results.summary, results.params,
+                           results.bse.add_suffix('_stderr')], axis=1)
+        table.sort_values('bic', kind='stable').to_csv(output)
+    return results
@@ -1,20 +1,146 @@
-import requests
 import json
+import warnings
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from tqdm import tqdm   
-import os
-import sys
 from pathlib import Path
+from utils import get_client, result_set_frame, ScrapeJournal, ScrapeManifest, MANIFEST_NAME
 
-# Set up the project root directory and append to system path for module imports
-current_working_directory = Path(os.getcwd())
-project_root = current_working_directory.parents[1]
-sys.path.append(str(project_root / 'src'))
+# NBA.com restricts data to 2000 rows per request, so lineups are scraped one team at a time,
+# and a response that still reaches the cap is split into shards (see split_parameters).
+SEASONS = ['2013-14', '2014-15', '2015-16', '2016-17', '2017-18',
+           '2018-19', '2019-20', '2020-21', '2021-22']
+ROW_CAP = 2000
 
-# Define the directory for data storage
-data_dir = project_root / 'data'
+# Columns identifying a lineup, and the counting stats summed over shards.
+LINEUP_COLUMNS = ['GROUP_SET', 'GROUP_ID', 'GROUP_NAME', 'TEAM_ID', 'TEAM_ABBREVIATION']
+COUNTING_STATS = ['GP', 'W', 'L', 'MIN', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA',
+                  'OREB', 'DREB', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'BLKA', 'PF', 'PFD',
+                  'PTS', 'PLUS_MINUS']
+# Games are never divided by the per mode.
+GAME_COUNTS = ['GP', 'W', 'L']
+PERCENTAGES = {'W_PCT': ('W', 'GP'), 'FG_PCT': ('FGM', 'FGA'),
+               'FG3_PCT': ('FG3M', 'FG3A'), 'FT_PCT': ('FTM', 'FTA')}
+# Stats where fewer is better, ranked in ascending order.
+ASCENDING_RANKS = {'L', 'TOV', 'PF', 'BLKA'}
+DATE_FORMAT = '%m/%d/%Y'
+
+def season_dates(season):
+    """
+    A date range covering every game of the season, e.g. 2019-08-01 to 2020-10-31 for
+    '2019-20' (the bubble season ran into October).
+    """
+    start_year = int(season[:4])
+    return date(start_year, 8, 1), date(start_year + 1, 10, 31)
+
+def split_parameters(parameters):
+    """
+    Split a leaguedashlineups query into disjoint shards whose rows together cover it.
+
+    A query without a Location is split into home and road games; otherwise its date range
+    (the whole season by default) is cut in half.
+
+    Parameters
+    ----------
+    parameters : dict
+        The query parameters.
+
+    Returns
+    -------
+    list of dict or None
+        The shards' parameters, or None when the query covers a single day at home or on
+        the road and cannot be split any further.
+    """
+    if parameters.get('Location') is None:
+        return [{**parameters, 'Location': location} for location in ('Home', 'Road')]
+    date_from, date_to = season_dates(parameters['Season'])
+    if parameters.get('DateFrom'):
+        date_from = datetime.strptime(parameters['DateFrom'], DATE_FORMAT).date()
+    if parameters.get('DateTo'):
+        date_to = datetime.strptime(parameters['DateTo'], DATE_FORMAT).date()
+    if date_from >= date_to:
+        return None
+    middle = date_from + (date_to - date_from) // 2
+    return [{**parameters, 'DateFrom': date_from.strftime(DATE_FORMAT),
+             'DateTo': middle.strftime(DATE_FORMAT)},
+            {**parameters, 'DateFrom': (middle + timedelta(days=1)).strftime(DATE_FORMAT),
+             'DateTo': date_to.strftime(DATE_FORMAT)}]
+
+def merge_shards(dfs, totals_dfs=None):
+    """
+    Merge the lineups of disjoint shards by re-aggregating their counting stats.
+
+    Counting stats are summed per lineup, percentages are recomputed from their makes and
+    attempts and ranks are recomputed over the merged lineups. Any other column cannot be
+    re-aggregated; it is passed through with the lineup's value in the first shard that has the
+    lineup, and a warning names it.
+
+    Parameters
+    ----------
+    dfs : list of pandas.DataFrame
+        The shards in the requested per mode.
+    totals_dfs : list of pandas.DataFrame, optional
+        The same shards in the 'Totals' per mode, required unless dfs already are totals.
+        A per-mode value is a total divided by a denominator (possessions / 100, games or
+        minutes / 36), so every shard's denominator is recovered by least squares from its
+        totals and per-mode values, and the merged values are the summed totals over the summed
+        denominators. The per-mode values are rounded to one decimal, so the recovered
+        denominators, and the merged Per100Possessions (or PerGame, Per36) values with them, are
+        approximate: they can differ from an unsharded response in the last decimal.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per lineup, with the columns of the shards.
+    """
+    columns = dfs[0].columns
+    keys = [column for column in LINEUP_COLUMNS if column in columns]
+    counting = [column for column in COUNTING_STATS if column in columns]
+    frames = totals_dfs if totals_dfs is not None else dfs
+    # Empty shards have object columns; infer_objects keeps the stats numeric.
+    merged = (pd.concat(frames, ignore_index=True).infer_objects()
+              .groupby(keys, sort=False)[counting].sum())
+    known = set(keys) | set(counting) | set(PERCENTAGES)
+    unknown = [column for column in columns if column not in known and not (
+        column.endswith('_RANK') and column[:-len('_RANK')] in known)]
+
+    rates = [column for column in counting if column not in GAME_COUNTS]
+    # Percentages come from the summed makes and attempts, before any per-mode division.
+    for column, (made, attempts) in PERCENTAGES.items():
+        if column in columns:
+            merged[column] = (merged[made] / merged[attempts].where(merged[attempts] > 0)).fillna(0).round(3)
+
+    if totals_dfs is not None:
+        denominators = []
+        for df, totals_df in zip(dfs, totals_dfs):
+            index = df.set_index(keys).index
+            per_mode = df[rates].to_numpy(dtype=float)
+            totals = totals_df.set_index(keys)[rates].reindex(index).to_numpy(dtype=float)
+            # Least squares of totals = denominator * per-mode values over every stat, which
+            # averages out the rounding of the per-mode values.
+            squares = (per_mode ** 2).sum(axis=1)
+            denominator = np.divide((totals * per_mode).sum(axis=1), squares,
+                                    out=np.zeros(len(index)), where=squares > 0)
+            denominators.append(pd.Series(denominator, index=index))
+        denominator = pd.concat(denominators).groupby(level=keys, sort=False).sum()
+        denominator = denominator.reindex(merged.index)
+        merged[rates] = merged[rates].div(denominator.where(denominator > 0), axis=0).fillna(0).round(1)
+
+    for column in columns:
+        stat = column[:-len('_RANK')]
+        if column.endswith('_RANK') and stat in merged:
+            merged[column] = merged[stat].rank(ascending=stat in ASCENDING_RANKS,
+                                               method='min').astype(int)
+    if unknown:
+        warnings.warn(f'Passing through columns that cannot be merged over shards: {unknown}')
+        first = (pd.concat(dfs, ignore_index=True).infer_objects()
+                 .groupby(keys, sort=False)[unknown].first())
+        merged = merged.join(first)
+    merged = merged.reset_index()
+    return merged[[column for column in columns if column in merged]]
 
-#%%
 class NBALineupsScraper:
     """
     A class used to scrape NBA lineup data from the NBA Stats website.
@@ -25,18 +151,20 @@ class NBALineupsScraper:
         The API endpoint for fetching NBA lineup data.
     parameters : dict
         The parameters required for the API request.
-    headers : dict
-        The HTTP headers required to simulate a browser request.
 
     Methods
     -------
-    scraper()
+    scraper(parameters=None)
         Sends a GET request to the NBA Stats API and returns the raw JSON data.
+    fetch_shards()
+        Requests the lineups, sharding responses truncated at ROW_CAP rows.
+    get_data()
+        Returns the lineups as a DataFrame, merging the shards.
     clean_data()
         Processes the raw JSON data into a dictionary format.
     """
 
-    def __init__(self, group_quantity, season, team_id, per_mode):
+    def __init__(self, group_quantity, season, team_id, per_mode, shard_jobs=4):
         """
         Constructs all the necessary attributes for the NBALineupsScraper object.
 
@@ -50,7 +178,10 @@ class NBALineupsScraper:
             The ID of the NBA team.
         per_mode : str
             The statistical mode for data (e.g., 'Per100Possessions').
+        shard_jobs : int
+            The number of shards of a truncated response requested at the same time.
         """
+        self.shard_jobs = shard_jobs
         self.url = 'https://stats.nba.com/stats/leaguedashlineups'
         self.parameters = {
             'GroupQuantity': group_quantity,
@@ -80,28 +211,80 @@ class NBALineupsScraper:
             'VsConference': None,
             'VsDivision': None
         }
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36",
-            "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Referer": "https://www.nba.com/",
-        }
     
-    def scraper(self):
+    def scraper(self, parameters=None):
         """
         Sends a GET request to the NBA Stats API to retrieve raw lineup data.
 
+        Parameters
+        ----------
+        parameters : dict, optional
+            The parameters of a shard, self.parameters by default.
+
         Returns
         -------
         dict
             The raw JSON data converted to a dictionary.
         """
-        response = requests.get(
+        # The shared client keeps connections alive and goes through the response cache.
+        raw_dict_data = get_client().get_json(
             url     = self.url,
-            params  = self.parameters,
-            headers = self.headers
+            params  = parameters or self.parameters
         )
-        raw_dict_data = json.loads(response.text)
         return raw_dict_data
+
+    def fetch_shards(self):
+        """
+        Request the lineups, splitting every response that reaches ROW_CAP rows into shards
+        until none is truncated. Each level of shards is requested in parallel.
+
+        Returns
+        -------
+        shards : list of tuple
+            (parameters, DataFrame) of every complete shard; a single item when the query
+            was not truncated.
+        totals_dfs : list of pandas.DataFrame or None
+            The shards in the 'Totals' per mode, for merging per-mode shards; None when there
+            is a single shard or the query already asks for totals.
+
+        Raises
+        ------
+        RuntimeError
+            A single day at home or on the road still reaches ROW_CAP rows.
+        """
+        shards = []
+        pending = [self.parameters]
+        with ThreadPoolExecutor(max_workers=self.shard_jobs) as executor:
+            while pending:
+                dfs = executor.map(lambda parameters: result_set_frame(self.scraper(parameters)),
+                                   pending)
+                split = []
+                for parameters, df in zip(pending, dfs):
+                    if len(df) < ROW_CAP:
+                        shards.append((parameters, df))
+                        continue
+                    children = split_parameters(parameters)
+                    if children is None:
+                        raise RuntimeError(f'leaguedashlineups is still truncated at {ROW_CAP} '
+                                           f'rows for {parameters}')
+                    split.extend(children)
+                pending = split
+            if len(shards) == 1 or self.parameters['PerMode'] == 'Totals':
+                return shards, None
+            # Per-mode values cannot be summed; their totals are merged instead.
+            totals_dfs = list(executor.map(
+                lambda shard: result_set_frame(self.scraper({**shard[0], 'PerMode': 'Totals'})),
+                shards))
+        return shards, totals_dfs
+
+    def get_data(self):
+        """
+        The lineups as a DataFrame, complete even when a response hit ROW_CAP rows.
+        """
+        shards, totals_dfs = self.fetch_shards()
+        if len(shards) == 1:
+            return shards[0][1]
+        return merge_shards([df for _, df in shards], totals_dfs)
     
     def clean_data(self):
         """
@@ -112,43 +295,142 @@ class NBALineupsScraper:
         dict
             A dictionary containing the cleaned lineup data.
         """
-        raw_dict_data = self.scraper()   
-        columns = raw_dict_data['resultSets'][0]['headers']
-        data    = raw_dict_data['resultSets'][0]['rowSet']
-        df      = pd.DataFrame(data=data, columns=columns)
+        df = self.get_data()
         dict_data = df.to_dict()
         return dict_data
 
-#%%
-
-# Load team ID to team name mapping from CSV
-team_df   = pd.read_csv(data_dir / 'team_and_teamid.csv')
-team_dict = pd.Series(team_df.team.values, index=team_df.team_id).to_dict()
-
-# Define the list of seasons and group quantity for lineups
-season_list = ['2013-14', '2014-15', '2015-16', '2016-17', '2017-18',
-               '2018-19', '2019-20', '2020-21', '2021-22']    
-group_quantity = '5' # Number of players in the lineup
-per_mode = 'Per100Possessions'
-# per_mode = 'Totals'
-# Initialize a dictionary to hold the scraped data
-expect_data_dict = {
-    season: {
-            team: {} for team in team_dict.values()
-    } for season in season_list
-}
-
-# NBA.com restricts data to 2000 rows per request, so be aware of this limit
-for season in tqdm(season_list, desc='Seasons'):
-    for team_id, team in tqdm(team_dict.items(), desc='Teams', leave=False):
+def scrape_lineups(data_dir, seasons=SEASONS, per_mode='Per100Possessions', group_quantity='5',
+                   output=None, journal_dir=None, refresh=False, league_wide=False, shard_jobs=4):
+    """
+    Scrape the lineups of every team and season and save them as one JSON file.
+
+    Responses truncated at ROW_CAP rows are split into shards and merged automatically.
+
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        The data root holding 'team_and_teamid.csv'.
+    seasons : list of str
+        The NBA seasons to scrape.
+    per_mode : str
+        'Per100Possessions' or 'Totals'.
+    group_quantity : str
+        The number of players in the lineup.
+    output : str or pathlib.Path, optional
+        Defaults to lineups_data/5lineups_100poss.json (or 5lineups_totals.json) under data_dir.
+    journal_dir : str or pathlib.Path, optional
+        A utils.ScrapeJournal folder. Every completed team-season is appended to it, a restart
+        skips the team-seasons already there, and the JSON is consolidated from it in one pass;
+        team-seasons scraped before a restart are recorded in the scrape manifest then.
+        The journal is cleared once the JSON and the manifest are written.
+    refresh : bool
+        Re-scrape only the team-seasons whose games played changed since they were last scraped
+        (and, in completed seasons, team-seasons missing from the existing JSON) and merge them
+        into it in place. Refresh the season players first; the teams' games played are taken
+        from the scrape manifest.
+    league_wide : bool
+        Request every season once with TeamID=0 instead of once per team; the sharding keeps
+        it complete, with far fewer requests than 30 teams per season.
+    shard_jobs : int
+        The number of shards of a truncated response requested at the same time.
+
+    Returns
+    -------
+    dict
+        {season: {team: lineups}}, as written to the JSON file.
+    """
+    data_dir = Path(data_dir)
+    if output is None:
+        name = '5lineups_totals.json' if per_mode == 'Totals' else '5lineups_100poss.json'
+        output = data_dir / 'lineups_data' / name
+
+    # Load team ID to team name mapping from CSV
+    team_df   = pd.read_csv(data_dir / 'team_and_teamid.csv')
+    team_dict = pd.Series(team_df.team.values, index=team_df.team_id).to_dict()
+
+    # Initialize a dictionary to hold the scraped data
+    expect_data_dict = {
+        season: {
+                team: {} for team in team_dict.values()
+        } for season in seasons
+    }
+
+    unit_key = lambda season, team_id: ScrapeJournal.unit_key(
+        'leaguedashlineups', per_mode, group_quantity, season, team_id)
+    manifest = ScrapeManifest(data_dir / MANIFEST_NAME)
+    games_played = {}
+    for season in seasons:
+        entry = manifest.get(ScrapeJournal.unit_key('leaguedashplayerstats', season)) or {}
+        games_played[season] = entry.get('teams_gp', {})
+    # TeamID 0 stands for all teams of a season.
+    units = [(season, team_id) for season in seasons
+             for team_id in ([0] if league_wide else team_dict)]
+
+    def upstream(season, team_id):
+        teams_gp = games_played[season]
+        if team_id == 0:
+            return sum(teams_gp.values()) if teams_gp else None
+        return teams_gp.get(str(team_id))
+
+    def assign(season, team_id, dict_data):
+        if team_id != 0:
+            expect_data_dict[season][team_dict[team_id]] = dict_data
+            return
+        df = pd.DataFrame(dict_data)
+        for other_id, team in team_dict.items():
+            team_lineups = df[df['TEAM_ID'] == other_id].reset_index(drop=True)
+            expect_data_dict[season][team] = team_lineups.to_dict()
+
+    if refresh and Path(output).exists():
+        with open(output, 'r') as f:
+            existing_data_dict = json.load(f)
+        present = {(season, team) for season, teams in existing_data_dict.items()
+                   for team, dict_data in teams.items() if dict_data}
+        # Keep every team-season already scraped, including seasons not asked for.
+        for season, teams in expect_data_dict.items():
+            for team, dict_data in teams.items():
+                existing_data_dict.setdefault(season, {}).setdefault(team, dict_data)
+        expect_data_dict = existing_data_dict
+        units = [(season, team_id) for season, team_id in units
+                 if manifest.stale(unit_key(season, team_id), season,
+                                   upstream=upstream(season, team_id),
+                                   present=all((season, team_dict[team]) in present
+                                               for team in ([team_id] if team_id else team_dict)))]
+        print(f'Refreshing {len(units)} team-seasons')
+
+    journal = ScrapeJournal(journal_dir) if journal_dir is not None else None
+    done = journal.completed() if journal is not None else set()
+
+    for season, team_id in tqdm(units, desc='Team-seasons'):
+        if unit_key(season, team_id) in done:
+            continue
+        team = team_dict[team_id] if team_id else 'all teams'
         print(f'Scraping {season} season for {team} with {group_quantity} lineups...')
-        processor = NBALineupsScraper(group_quantity, season, team_id, per_mode)
+        processor = NBALineupsScraper(group_quantity, season, team_id, per_mode, shard_jobs)
         dict_data = processor.clean_data()
-        expect_data_dict[season][team] = dict_data
+        manifest.record(unit_key(season, team_id), dict_data,
+                        rows=len(next(iter(dict_data.values()), {})),
+                        upstream=upstream(season, team_id))
+        if journal is not None:
+            journal.record(unit_key(season, team_id), dict_data)
+        else:
+            assign(season, team_id, dict_data)
 
-# Save the scraped lineup data to a JSON file
-with open(data_dir / 'lineups_data' / '5lineups_100poss.json', 'w') as f:
-    json.dump(expect_data_dict, f, indent=4)
-# with open(data_dir / 'lineups_data' / '5lineups_totals.json') as f:
-#     json.dump(expect_data_dict, f, indent=4)
+    if journal is not None:
+        # Fill every scraped team-season from the journal in one pass.
+        records = journal.load()
+        for season, team_id in units:
+            key = unit_key(season, team_id)
+            if key in done:
+                # Scraped before an interrupted run, so not yet in the manifest.
+                manifest.record(key, records[key], rows=len(next(iter(records[key].values()), {})),
+                                upstream=upstream(season, team_id))
+            assign(season, team_id, records[key])
 
+    # Save the scraped lineup data to a JSON file
+    with open(output, 'w') as f:
+        json.dump(expect_data_dict, f, indent=4)
+    manifest.save()
+    if journal is not None:
+        journal.clear()
+    return expect_data_dict
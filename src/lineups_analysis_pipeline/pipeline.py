@@ -0,0 +1,431 @@
+"""
+Incremental runner for the scrape -> process -> EVP -> regress -> LaTeX workflow.
+
+Every stage declares the files it reads, its parameters and the files it writes, all relative
+to the data root. A stage's key is the SHA-256 of its parameters, the contents of its inputs
+and its code: the source of the stage function and of every project module it imports,
+directly or through other project modules (found by parsing, nothing is imported). A stage
+whose key and outputs match the last recorded run is skipped. Stages whose inputs are ready run concurrently, and every run appends
+its per-stage timings to .pipeline/runs.jsonl under the data root.
+"""
+import os
+import ast
+import json
+import time
+import inspect
+import hashlib
+import textwrap
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from .lineups_reader import file_digest
+
+# The folder holding the project packages (src/); imports outside it are not hashed.
+SOURCE_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_LATEX_DIR = SOURCE_ROOT.parent / 'latex_table'
+
+def module_path(module):
+    """
+    The source file of a project module, or None for a module outside SOURCE_ROOT.
+    """
+    path = SOURCE_ROOT.joinpath(*module.split('.'))
+    for candidate in (path / '__init__.py', path.with_suffix('.py')):
+        if candidate.is_file():
+            return candidate
+    return None
+
+def _parse(path):
+    with open(path, 'rb') as f:
+        source = f.read()
+    return source, ast.parse(source)
+
+def _lazy_exports(package):
+    """
+    The name -> submodule mapping of a package whose __init__ defines a literal _exports dict.
+    """
+    path = module_path(package)
+    if path is None or path.name != '__init__.py':
+        return {}
+    for node in _parse(path)[1].body:
+        if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Dict)
+                and any(isinstance(target, ast.Name) and target.id == '_exports'
+                        for target in node.targets)):
+            return {key.value: f'{package}.{value.value}'
+                    for key, value in zip(node.value.keys, node.value.values)}
+    return {}
+
+def imported_modules(nodes, module, package=False):
+    """
+    Names of the modules imported anywhere in the given AST nodes of module; a name imported
+    from a package counts as its submodule, including the lazy _exports of the package.
+    """
+    modules = set()
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, ast.Import):
+                names = [alias.name for alias in child.names]
+            elif isinstance(child, ast.ImportFrom):
+                base = child.module or ''
+                if child.level:
+                    parent = module if package else module.rpartition('.')[0]
+                    for _ in range(child.level - 1):
+                        parent = parent.rpartition('.')[0]
+                    base = f'{parent}.{base}'.rstrip('.')
+                exports = _lazy_exports(base)
+                names = [base] + [exports.get(alias.name, f'{base}.{alias.name}')
+                                  for alias in child.names]
+            else:
+                continue
+            for name in names:
+                # Importing a.b.c runs the __init__ of a and a.b as well.
+                parts = name.split('.')
+                modules.update('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+    return modules
+
+def code_digests(func, modules=()):
+    """
+    SHA-256 of the source of func and of every project module it depends on.
+
+    The roots are the imports inside func, the module-level imports of its module and the
+    given modules; every project module they import, directly or transitively, is included.
+    """
+    roots = set(modules)
+    try:
+        source = textwrap.dedent(inspect.getsource(func)).encode()
+        roots |= imported_modules([ast.parse(source)], func.__module__)
+    except (OSError, TypeError):
+        # No source file (e.g. defined interactively): fall back to the bytecode.
+        source = getattr(getattr(func, '__code__', None), 'co_code', b'')
+    except SyntaxError:
+        # The source lines of a lambda are not a complete statement.
+        pass
+    digests = {func.__qualname__: hashlib.sha256(source).hexdigest()}
+    path = module_path(func.__module__)
+    if path is not None:
+        top_level = [node for node in _parse(path)[1].body
+                     if isinstance(node, (ast.Import, ast.ImportFrom))]
+        roots |= imported_modules(top_level, func.__module__, path.name == '__init__.py')
+    stack = sorted(roots)
+    while stack:
+        module = stack.pop()
+        if module in digests:
+            continue
+        path = module_path(module)
+        if path is None:
+            continue
+        source, tree = _parse(path)
+        digests[module] = hashlib.sha256(source).hexdigest()
+        stack.extend(imported_modules([tree], module, path.name == '__init__.py'))
+    return digests
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Parameters
+    ----------
+    name : str
+        The stage name.
+    func : callable
+        Called as func(data_root, **params, **options).
+    inputs, outputs : list of str
+        Files read and written by the stage, relative to the data root (or absolute).
+    params : dict, optional
+        Parameters that change the outputs; they are part of the stage key.
+    options : dict, optional
+        Parameters that do not change the outputs (e.g. the number of jobs).
+    code : list of str, optional
+        Modules hashed in addition to the ones func imports (see code_digests), e.g. modules
+        it loads dynamically.
+    source : bool
+        Whether the stage fetches data from outside (a scraper). A source stage whose outputs
+        already exist is adopted as up to date on its first run instead of re-fetched, and
+        is only re-fetched when its parameters change.
+    """
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, options=None,
+                 code=None, source=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.options = options or {}
+        self.code = list(code or ())
+        self.source = source
+
+class Pipeline:
+    """
+    Run a graph of stages over one data root.
+
+    Parameters
+    ----------
+    data_root : str or pathlib.Path
+        The data folder; stage inputs and outputs are relative to it.
+    stages : list of Stage
+        The stages; a stage depends on the stages that write its inputs.
+    jobs : int
+        Number of stages run at the same time.
+    """
+    def __init__(self, data_root, stages, jobs=2):
+        self.data_root = Path(data_root)
+        self.stages = {stage.name: stage for stage in stages}
+        self.jobs = jobs
+        self.state_dir = self.data_root / '.pipeline'
+        self.lock = threading.Lock()
+        self.state = self.load_state()
+
+        producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                producers[output] = stage.name
+        self.upstream = {
+            stage.name: {producers[path] for path in stage.inputs if path in producers}
+            for stage in stages
+        }
+
+    def load_state(self):
+        try:
+            with open(self.state_dir / 'state.json') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'files': {}, 'stages': {}}
+
+    def save_state(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_dir / 'state.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=4)
+        os.replace(tmp, self.state_dir / 'state.json')
+
+    def digest(self, path):
+        """
+        Content hash of a data file, reused while its size and mtime are unchanged.
+        """
+        full_path = self.data_root / path
+        stat = full_path.stat()
+        with self.lock:
+            recorded = self.state['files'].get(path)
+        if recorded and recorded['size'] == stat.st_size and recorded['mtime_ns'] == stat.st_mtime_ns:
+            return recorded['sha256']
+        sha256 = file_digest(full_path)
+        with self.lock:
+            self.state['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                         'sha256': sha256}
+        return sha256
+
+    def stage_key(self, stage):
+        payload = {
+            'stage' : stage.name,
+            'code'  : code_digests(stage.func, stage.code),
+            'params': stage.params,
+            'inputs': {path: self.digest(path) for path in stage.inputs}
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def up_to_date(self, stage, key):
+        with self.lock:
+            recorded = self.state['stages'].get(stage.name)
+        if not all((self.data_root / path).exists() for path in stage.outputs):
+            return False
+        if recorded is None:
+            return stage.source
+        if recorded['key'] != key and not (stage.source and recorded['params'] == stage.params):
+            return False
+        return all(recorded['outputs'].get(path) == self.digest(path) for path in stage.outputs)
+
+    def execute(self, stage, force):
+        start = time.perf_counter()
+        key = self.stage_key(stage)
+        if not force and self.up_to_date(stage, key):
+            status = 'cached'
+        else:
+            stage.func(self.data_root, **stage.params, **stage.options)
+            missing = [path for path in stage.outputs if not (self.data_root / path).exists()]
+            if missing:
+                raise FileNotFoundError(f'Stage {stage.name!r} did not write {missing}')
+            status = 'ran'
+        outputs = {path: self.digest(path) for path in stage.outputs}
+        with self.lock:
+            self.state['stages'][stage.name] = {'key': key, 'params': stage.params,
+                                                'outputs': outputs}
+            self.save_state()
+        return {'stage': stage.name, 'status': status,
+                'seconds': round(time.perf_counter() - start, 3)}
+
+    def required(self, targets):
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.upstream[name])
+        return needed
+
+    def run(self, targets=None, force=()):
+        """
+        Bring the targets and everything they depend on up to date.
+
+        Parameters
+        ----------
+        targets : list of str, optional
+            Stage names; every stage by default.
+        force : collection of str
+            Stages rerun even if they are up to date; stages downstream of them rerun
+            whenever their inputs change.
+
+        Returns
+        -------
+        list of dict
+            Per-stage 'stage', 'status' ('ran', 'cached', 'failed' or 'skipped') and 'seconds'.
+        """
+        unknown = set(targets or ()) - set(self.stages)
+        if unknown:
+            raise KeyError(f'Unknown stages: {sorted(unknown)}')
+        needed = self.required(targets or list(self.stages))
+        order = [name for name in self.stages if name in needed]
+        done = {}
+        errors = []
+        started = datetime.now().isoformat(timespec='seconds')
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            running = {}
+            while len(done) < len(order):
+                progress = len(done)
+                for name in order:
+                    if name in done or name in running.values():
+                        continue
+                    upstream = self.upstream[name]
+                    if any(done.get(up, {}).get('status') in ('failed', 'skipped') for up in upstream):
+                        done[name] = {'stage': name, 'status': 'skipped', 'seconds': 0.0}
+                    elif all(up in done for up in upstream):
+                        future = executor.submit(self.execute, self.stages[name], name in force)
+                        running[future] = name
+                if not running:
+                    if len(done) == progress:
+                        raise ValueError('The stage graph has a cycle.')
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        done[name] = future.result()
+                    except Exception as error:
+                        errors.append(error)
+                        done[name] = {'stage': name, 'status': 'failed', 'seconds': 0.0,
+                                      'error': repr(error)}
+
+        timings = [done[name] for name in order]
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.state_dir / 'runs.jsonl', 'a') as f:
+            f.write(json.dumps({'started': started, 'stages': timings}) + '\n')
+        if errors:
+            raise errors[0]
+        return timings
+
+def _scrape_season_players(data_root, seasons):
+    from pass_data_analysis_pipeline import scrape_season_players
+    scrape_season_players(data_root, seasons=seasons)
+
+def _scrape_pass_data(data_root, seasons):
+    from pass_data_analysis_pipeline import scrape_pass_data
+    scrape_pass_data(data_root, seasons=seasons,
+                     journal_dir=Path(data_root) / '.scrape_journal' / 'pass')
+
+def _scrape_lineups(data_root, seasons, per_mode):
+    from .lineups_scraper import scrape_lineups
+    scrape_lineups(data_root, seasons=seasons, per_mode=per_mode,
+                   journal_dir=Path(data_root) / '.scrape_journal' / f'lineups-{per_mode}')
+
+def _process(data_root, min_minutes):
+    from .lineups_processors import process_lineups
+    process_lineups(data_root, min_minutes=min_minutes)
+
+def _evp(data_root, gp, team_effect, **options):
+    from .evp import run_evp
+    _, std_evp_df, _, _ = run_evp(data_root, gp=gp, team_effect=team_effect, **options)
+    std_evp_df.to_csv(Path(data_root) / 'evp.csv', index=False)
+
+def _regress(data_root, specs):
+    from models import formatted_reg_model
+    from .lineups_reg import prepare_regression_data, fit_regressions
+    df = prepare_regression_data(data_root)
+    tables_dir = Path(data_root) / 'regression_tables'
+    tables_dir.mkdir(exist_ok=True)
+    for name, result in fit_regressions(df, specs).items():
+        formatted_reg_model(result).to_pickle(tables_dir / f'{name}.pkl')
+
+def _latex(data_root, names, latex_dir):
+    import pandas as pd
+    from .lineups_reg import write_latex_tables
+    tables = {name: pd.read_pickle(Path(data_root) / 'regression_tables' / f'{name}.pkl')
+              for name in names}
+    write_latex_tables(tables, latex_dir)
+
+def default_stages(seasons=None, min_minutes=100, gp=9, team_effect='PLUS_MINUS', specs=None,
+                   jobs=1, latex_dir=None):
+    """
+    The project's workflow as a list of stages.
+
+    Parameters
+    ----------
+    seasons : list of str, optional
+        Seasons scraped, 2013-14 to 2021-22 by default.
+    min_minutes : float
+        The minimum minutes of a lineup in the regression dataset.
+    gp, team_effect :
+        Passed on to EVP.
+    specs : dict, optional
+        Regression specifications, lineups_reg.REGRESSIONS by default.
+    jobs : int
+        Worker processes used by EVP.
+    latex_dir : str or pathlib.Path, optional
+        Where the LaTeX tables are written, the repository's latex_table/ by default.
+    """
+    if seasons is None:
+        seasons = [f'{year}-{str(year+1)[-2:]}' for year in range(2013, 2022)]
+    if specs is None:
+        from .lineups_reg import REGRESSIONS
+        specs = REGRESSIONS
+    specs = {name: [dependent, list(regressors)] for name, (dependent, regressors) in specs.items()}
+    lineups_100poss = 'lineups_data/5lineups_100poss.json'
+    lineups_totals = 'lineups_data/5lineups_totals.json'
+    dataset = '(new) all_100poss_lineups_data.csv'
+    tables = [f'regression_tables/{name}.pkl' for name in specs]
+    latex_dir = str(Path(latex_dir if latex_dir is not None else DEFAULT_LATEX_DIR).resolve())
+    return [
+        Stage('season_players', _scrape_season_players,
+              outputs=['season_players_id_14_22.json'],
+              params={'seasons': seasons}, source=True),
+        Stage('pass_data', _scrape_pass_data,
+              inputs=['season_players_id_14_22.json'],
+              outputs=['pass_data_14_22.csv'],
+              params={'seasons': seasons}, source=True),
+        Stage('lineups_100poss', _scrape_lineups,
+              inputs=['team_and_teamid.csv'],
+              outputs=[lineups_100poss],
+              params={'seasons': seasons, 'per_mode': 'Per100Possessions'}, source=True),
+        Stage('lineups_totals', _scrape_lineups,
+              inputs=['team_and_teamid.csv'],
+              outputs=[lineups_totals],
+              params={'seasons': seasons, 'per_mode': 'Totals'}, source=True),
+        Stage('process', _process,
+              inputs=[lineups_totals, lineups_100poss, 'players_id.csv', 'player_aliases.csv',
+                      'season_players_id_14_22.json', 'pass_data_14_22.csv',
+                      'RAPM_data/group_apm_14_22_800possup.csv',
+                      'RAPM_data/adj_apm_rapm_14_22.csv'],
+              outputs=[dataset, 'lineup_key_codes.csv'],
+              params={'min_minutes': min_minutes}),
+        Stage('evp', _evp,
+              inputs=[lineups_100poss, 'lineup_key_codes.csv'],
+              outputs=['evp.csv'],
+              params={'gp': gp, 'team_effect': team_effect}, options={'jobs': jobs}),
+        Stage('regress', _regress,
+              inputs=[dataset],
+              outputs=['team_effect.csv'] + tables,
+              params={'specs': specs}),
+        Stage('latex', _latex,
+              inputs=tables,
+              outputs=[str(Path(latex_dir) / f'{name}.tex') for name in specs],
+              params={'names': list(specs), 'latex_dir': latex_dir})
+    ]
@@ -0,0 +1,299 @@
+"""
+APM and ridge RAPM player ratings from the scraped Totals lineups.
+
+Every lineup-season contributes two observations weighted by its possessions: its offensive
+rating (points scored per 100 possessions) on the five players' offense columns (+1) and
+its defensive rating (points allowed per 100 possessions) on their defense columns (-1), so
+a positive defensive rating is good defense and the net rating is offense + defense. Both
+blocks share the lineup x player incidence matrix A, so the weighted Gram matrix A'WA is
+the same for offense and defense and one eigendecomposition serves both sides and every
+ridge penalty.
+
+APM is the minimum-norm weighted least squares solution, solved by LSQR on the sparse
+design. RAPM is the ridge solution with the penalty chosen by K-fold cross-validation over
+the lineups; each fold eigendecomposes its training Gram matrix once and evaluates the
+whole penalty grid from it. Memory grows with the number of lineups (the sparse design)
+and the square of a season's players (the Gram matrix).
+"""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy import sparse
+from scipy.sparse.linalg import lsqr
+from .lineups_processors import read_lineups_df
+
+# Ridge penalties searched by cross-validation, in possessions.
+DEFAULT_LAMBDAS = np.logspace(1, 5, 25)
+
+def lineup_ratings(lineups_df):
+    """
+    Possessions and offensive/defensive ratings of Totals lineups.
+
+    Possessions are estimated from the box score as FGA - OREB + TOV + 0.44 FTA; points
+    allowed are PTS - PLUS_MINUS.
+
+    Parameters
+    ----------
+    lineups_df : pandas.DataFrame
+        Totals lineups from read_lineups_df.
+
+    Returns
+    -------
+    pandas.DataFrame
+        'year', 'team', 'players' (five player IDs per row, as an int64 (n, 5) array in
+        df.attrs['players']), 'possessions', 'offense' and 'defense', for the lineups with
+        positive possessions.
+    """
+    possessions = (lineups_df['FGA'] - lineups_df['OREB'] + lineups_df['TOV']
+                   + 0.44 * lineups_df['FTA']).to_numpy(dtype=float)
+    keep = possessions > 0
+    lineups_df = lineups_df[keep]
+    possessions = possessions[keep]
+    players = np.array(lineups_df['GROUP_ID'].str.strip('-').str.split('-').tolist(), dtype='int64')
+    df = pd.DataFrame({
+        'year': lineups_df['year'].to_numpy(),
+        'team': lineups_df['team'].to_numpy(),
+        'possessions': possessions,
+        'offense': 100 * lineups_df['PTS'].to_numpy(dtype=float) / possessions,
+        'defense': 100 * (lineups_df['PTS'] - lineups_df['PLUS_MINUS']).to_numpy(dtype=float) / possessions,
+    })
+    df.attrs['players'] = players
+    return df
+
+class RAPM:
+    """
+    APM and ridge RAPM of one season's lineups.
+
+    Parameters
+    ----------
+    players : numpy.ndarray
+        (n, 5) player IDs of the lineups.
+    possessions : numpy.ndarray
+        Possessions of each lineup, used as regression weights.
+    offense, defense : numpy.ndarray
+        Points scored and allowed per 100 possessions of each lineup.
+    min_possessions : float
+        Players on the floor for at most this many possessions (offense and defense) share
+        one pooled replacement column instead of getting a rating of their own.
+    """
+    def __init__(self, players, possessions, offense, defense, min_possessions=0):
+        n = len(possessions)
+        self.weights = np.asarray(possessions, dtype=float)
+        self.player_ids, codes = np.unique(players, return_inverse=True)
+        codes = codes.reshape(n, -1)
+        # Every lineup row is on the floor for its possessions at both ends.
+        self.appearances = 2 * np.bincount(codes.ravel(), weights=np.repeat(self.weights, codes.shape[1]),
+                                           minlength=len(self.player_ids))
+
+        # Columns of the design: one per rated player, then the pooled replacement column.
+        self.rated = self.appearances > min_possessions
+        columns = np.cumsum(self.rated) - 1
+        n_rated = int(self.rated.sum())
+        columns[~self.rated] = n_rated
+        n_columns = n_rated + (not self.rated.all())
+        self.A = sparse.csr_matrix((np.ones(codes.size), columns[codes].ravel(),
+                                    np.arange(0, codes.size + 1, codes.shape[1])),
+                                   shape=(n, n_columns))
+        self.A.sum_duplicates()
+
+        # Ratings centered on the possession-weighted league average; defense enters with -1.
+        self.y = np.column_stack([offense - np.average(offense, weights=self.weights),
+                                  defense - np.average(defense, weights=self.weights)])
+        self.signs = np.array([1.0, -1.0])
+        WA = self.A.multiply(self.weights[:, None]).tocsr()
+        self.gram = (self.A.T @ WA).toarray()
+        self.xty = (WA.T @ self.y) * self.signs
+
+    def ridge_path(self, gram, xty, lambdas):
+        """
+        Ridge coefficients for every penalty from one eigendecomposition of gram.
+
+        Returns
+        -------
+        numpy.ndarray
+            (columns, len(lambdas), 2) offense and defense coefficients.
+        """
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        projected = eigenvectors.T @ xty
+        return np.einsum('ij,jlk->ilk', eigenvectors,
+                         projected[:, None, :] / (eigenvalues[:, None, None] + lambdas[None, :, None]))
+
+    def cross_validate(self, lambdas=DEFAULT_LAMBDAS, folds=5, seed=0):
+        """
+        Possession-weighted mean squared error of the held-out lineups for every penalty.
+
+        A fold's training Gram matrix and A'Wy are the full ones minus the held-out lineups'
+        contribution, so the design is never rebuilt.
+
+        Returns
+        -------
+        numpy.ndarray
+            The cross-validation error per penalty, offense and defense combined.
+        """
+        lambdas = np.asarray(lambdas, dtype=float)
+        fold_of = np.random.default_rng(seed).permutation(len(self.weights)) % folds
+        errors = np.zeros(len(lambdas))
+        for fold in range(folds):
+            rows = np.flatnonzero(fold_of == fold)
+            A_k = self.A[rows]
+            WA_k = A_k.multiply(self.weights[rows, None]).tocsr()
+            gram = self.gram - (A_k.T @ WA_k).toarray()
+            xty = self.xty - (WA_k.T @ self.y[rows]) * self.signs
+            coef = self.ridge_path(gram, xty, lambdas)
+            predicted = (A_k @ coef.reshape(len(coef), -1)).reshape(len(rows), *coef.shape[1:]) * self.signs
+            residuals = self.y[rows, None, :] - predicted
+            errors += np.einsum('n,nlk->l', self.weights[rows], residuals ** 2)
+        return errors / (2 * self.weights.sum())
+
+    def fit(self, lambdas=DEFAULT_LAMBDAS, folds=5, seed=0):
+        """
+        Solve APM and RAPM, choosing the ridge penalty by cross-validation.
+
+        The chosen penalty and the cross-validation errors are kept in self.lambda_ and
+        self.cv_errors. A single penalty skips the cross-validation.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per rated player: 'player_id', 'Appearances', 'O_APM', 'D_APM', 'APM',
+            'O_RAPM', 'D_RAPM' and 'RAPM' (net ratings are offense + defense).
+        """
+        lambdas = np.atleast_1d(np.asarray(lambdas, dtype=float))
+        self.cv_errors = self.cross_validate(lambdas, folds, seed) if len(lambdas) > 1 else None
+        self.lambda_ = lambdas[0] if self.cv_errors is None else lambdas[np.argmin(self.cv_errors)]
+        rapm = self.ridge_path(self.gram, self.xty, np.array([self.lambda_]))[:, 0, :]
+
+        root_weights = np.sqrt(self.weights)
+        WA = self.A.multiply(root_weights[:, None]).tocsr()
+        apm = np.column_stack([lsqr(WA, sign * root_weights * self.y[:, side], atol=1e-10, btol=1e-10)[0]
+                               for side, sign in enumerate(self.signs)])
+
+        rated = np.flatnonzero(self.rated)
+        n_rated = len(rated)
+        return pd.DataFrame({
+            'player_id': self.player_ids[rated],
+            'Appearances': np.round(self.appearances[rated]).astype('int64'),
+            'O_APM': apm[:n_rated, 0],
+            'D_APM': apm[:n_rated, 1],
+            'APM': apm[:n_rated].sum(axis=1),
+            'O_RAPM': rapm[:n_rated, 0],
+            'D_RAPM': rapm[:n_rated, 1],
+            'RAPM': rapm[:n_rated].sum(axis=1),
+        })
+
+def fit_seasons(ratings_df, min_possessions=0, **options):
+    """
+    Fit RAPM season by season.
+
+    Parameters
+    ----------
+    ratings_df : pandas.DataFrame
+        Lineups from lineup_ratings.
+    min_possessions : float
+        See RAPM.
+    **options
+        Passed on to RAPM.fit (lambdas, folds, seed).
+
+    Returns
+    -------
+    players_df : pandas.DataFrame
+        The ratings of RAPM.fit with a 'year' column.
+    lambdas : dict
+        {year: chosen penalty}.
+    """
+    players = ratings_df.attrs['players']
+    dfs, lambdas = [], {}
+    for year, rows in ratings_df.groupby('year', sort=True).indices.items():
+        season = ratings_df.iloc[rows]
+        model = RAPM(players[rows], season['possessions'].to_numpy(), season['offense'].to_numpy(),
+                     season['defense'].to_numpy(), min_possessions=min_possessions)
+        dfs.append(model.fit(**options).assign(year=year))
+        lambdas[year] = model.lambda_
+    return pd.concat(dfs, ignore_index=True), lambdas
+
+def group_apm(ratings_df, players_df, names):
+    """
+    Lineup APM as the sum of its five players' APM, in the group_apm schema.
+
+    Returns
+    -------
+    pandas.DataFrame
+        'Group' (the sorted player names as a tuple string), 'APM', 'Appearances'
+        (possessions at both ends) and 'year', one row per lineup-season.
+    """
+    players = np.sort(ratings_df.attrs['players'], axis=1)
+    apm = players_df.set_index(['year', 'player_id'])['APM']
+    years = ratings_df['year'].to_numpy()
+    lineup_apm = sum(apm.reindex(pd.MultiIndex.from_arrays([years, players[:, slot]])).to_numpy()
+                     for slot in range(players.shape[1]))
+    df = pd.DataFrame({'year': years, 'APM': lineup_apm,
+                       'Appearances': 2 * ratings_df['possessions'].to_numpy()})
+    df[[f'player_{slot}' for slot in range(players.shape[1])]] = players
+    df = (df.groupby(['year', *[f'player_{slot}' for slot in range(players.shape[1])]], sort=False)
+            .agg(APM=('APM', 'first'), Appearances=('Appearances', 'sum'))
+            .reset_index())
+    player_names = df.filter(like='player_').apply(lambda ids: ids.map(names).fillna(ids.astype(str)))
+    df['Group'] = [str(tuple(sorted(row))) for row in player_names.itertuples(index=False)]
+    df['Appearances'] = np.round(df['Appearances']).astype('int64')
+    return df[['Group', 'APM', 'Appearances', 'year']]
+
+def run_rapm(data_dir, lineups_path=None, output_dir=None, min_possessions=1200,
+             group_possessions=(200, 800), **options):
+    """
+    Rate every season's players from the scraped Totals lineups and write the RAPM CSVs.
+
+    'unadj_apm_rapm_<yy>_<yy>.csv' rates every player; 'adj_apm_rapm_<yy>_<yy>.csv' pools
+    the players with at most min_possessions into one replacement column and rates the rest;
+    'group_apm_<yy>_<yy>_<n>possup.csv' lists the lineups with at least n possessions.
+    All use the schema of the precomputed files in RAPM_data/.
+
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        The data root holding players_id.csv.
+    lineups_path : str or pathlib.Path, optional
+        The Totals lineups JSON, lineups_data/5lineups_totals.json under data_dir by default.
+    output_dir : str or pathlib.Path, optional
+        Where the CSVs are written, RAPM_fit/ under data_dir by default, so the thesis
+        ratings in RAPM_data/ are only replaced on purpose.
+    min_possessions : float
+        The possessions threshold of the adjusted ratings.
+    group_possessions : tuple of int
+        The possessions thresholds of the group APM files.
+    **options
+        Passed on to RAPM.fit (lambdas, folds, seed).
+
+    Returns
+    -------
+    dict
+        File name -> the written DataFrame, and 'lambdas' -> {year: chosen penalty} of the
+        adjusted fit.
+    """
+    data_dir = Path(data_dir)
+    lineups_path = Path(lineups_path or data_dir / 'lineups_data' / '5lineups_totals.json')
+    output_dir = Path(output_dir or data_dir / 'RAPM_fit')
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    players_id = pd.read_csv(data_dir / 'players_id.csv')
+    names = dict(zip(players_id['player_id'], players_id['player']))
+    ratings_df = lineup_ratings(read_lineups_df(lineups_path))
+    years = sorted(ratings_df['year'].unique())
+    suffix = f'{str(years[0])[-2:]}_{str(years[-1])[-2:]}'
+
+    def schema(players_df):
+        players_df = players_df.assign(Player=players_df['player_id'].map(names)
+                                       .fillna(players_df['player_id'].astype(str)))
+        return players_df[['Player', 'APM', 'Appearances', 'RAPM', 'year']]
+
+    unadj_df, _ = fit_seasons(ratings_df, min_possessions=0, **options)
+    adj_df, lambdas = fit_seasons(ratings_df, min_possessions=min_possessions, **options)
+    outputs = {f'unadj_apm_rapm_{suffix}.csv': schema(unadj_df),
+               f'adj_apm_rapm_{suffix}.csv': schema(adj_df)}
+    groups_df = group_apm(ratings_df, unadj_df, names)
+    for threshold in group_possessions:
+        outputs[f'group_apm_{suffix}_{threshold}possup.csv'] = (
+            groups_df[groups_df['Appearances'] >= threshold].reset_index(drop=True))
+    for name, df in outputs.items():
+        df.to_csv(output_dir / name, index=False)
+    outputs['lambdas'] = lambdas
+    return outputs
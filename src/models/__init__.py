@@ -1,7 +1,43 @@
-from .format_significance import format_significance
-from .formatted_reg_model import formatted_reg_model
+# Submodules are imported on first attribute access, so importing the package loads
+# neither pandas nor statsmodels.
+import sys
+import types
+import importlib
 
-__all__ = [
-    'format_significance',
-    'formatted_reg_model'
-]
+_exports = {
+    'format_significance' : 'format_significance',
+    'significance_stars'  : 'format_significance',
+    'formatted_reg_model' : 'formatted_reg_model',
+    'regression_table'    : 'regression_table',
+    'MODEL_STATISTICS'    : 'regression_table',
+    'OLSSweep'            : 'ols_sweep',
+    'SweepResults'        : 'ols_sweep',
+    'SweepResult'         : 'ols_sweep',
+    'all_specifications'  : 'ols_sweep',
+    'design_matrix'       : 'ols_sweep',
+    'ClusterInference'    : 'cluster_inference',
+    'ClusterResult'       : 'cluster_inference',
+    'WILD_WEIGHTS'        : 'cluster_inference'
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_exports[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+class _Package(types.ModuleType):
+    # Importing a submodule binds it on the package; skip that for the submodules named after
+    # their export (e.g. regression_table), so the name keeps resolving to the export.
+    def __setattr__(self, name, value):
+        if isinstance(value, types.ModuleType) and _exports.get(name) == name:
+            return
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _Package
@@ -1,3 +1,8 @@
+import numpy as np
+
+# p 值門檻與對應的顯著性標記，由嚴格到寬鬆。
+SIGNIFICANCE_LEVELS = [(0.001, '***'), (0.01, '**'), (0.05, '*')]
+
 def format_significance(p_value):
     """
     根據 p value 返回相應的統計顯著性標記。
@@ -20,3 +25,21 @@ def format_significance(p_value):
         return '*'
     else:
         return ''
+
+def significance_stars(p_values):
+    """
+    format_significance 的向量化版本，一次標記整個陣列的 p 值。
+
+    Parameters
+    ----------
+        p_values : array_like
+            p 值陣列，NaN 沒有標記。
+
+    Returns
+    -------
+        numpy.ndarray
+            與 p_values 同形狀的顯著性標記陣列。
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    return np.select([p_values < level for level, _ in SIGNIFICANCE_LEVELS],
+                     [stars for _, stars in SIGNIFICANCE_LEVELS], '')
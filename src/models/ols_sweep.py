@@ -0,0 +1,239 @@
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+def design_matrix(df, columns):
+    """
+    依欄位名稱建立設計矩陣；'A:B' 表示 A 與 B 的交乘項。
+
+    Parameters
+    ----------
+        df : pandas.DataFrame
+            資料集。
+        columns : list of str
+            欄位名稱，交乘項以 ':' 連接。
+
+    Returns
+    -------
+        numpy.ndarray
+            (len(df), len(columns)) 的 float 陣列。
+    """
+    X = np.empty((len(df), len(columns)))
+    for j, column in enumerate(columns):
+        X[:, j] = np.prod([df[name].to_numpy(dtype=float) for name in column.split(':')], axis=0)
+    return X
+
+def all_specifications(columns, required=('const',), min_size=1, max_size=None,
+                       hierarchical=True):
+    """
+    列舉 columns 所有的子集合（依大小排列），每個子集合都加上 required。
+
+    Parameters
+    ----------
+        columns : list of str
+            候選的解釋變數，可以包含 'A:B' 形式的交乘項。
+        required : tuple of str
+            每個模型都包含的變數，例如常數項。
+        min_size, max_size : int
+            候選變數個數的範圍，max_size 預設為全部。
+        hierarchical : bool
+            交乘項只出現在兩個主效果都在模型中的子集合。
+
+    Yields
+    ------
+        tuple of str
+            一組解釋變數。
+    """
+    columns = list(columns)
+    max_size = len(columns) if max_size is None else max_size
+    for size in range(min_size, max_size + 1):
+        for subset in combinations(columns, size):
+            if hierarchical:
+                included = set(subset) | set(required)
+                if any(not set(column.split(':')) <= included
+                       for column in subset if ':' in column):
+                    continue
+            yield (*required, *subset)
+
+class SweepResult:
+    """
+    單一規格的迴歸結果，具有與 statsmodels RegressionResults 相同名稱的屬性
+    （params、bse、pvalues、nobs、aic、bic、rsquared 等），可以直接傳入 regression_table。
+    """
+    def __init__(self, params, bse, pvalues, **statistics):
+        self.params = params
+        self.bse = bse
+        self.pvalues = pvalues
+        self.tvalues = params / bse
+        for name, value in statistics.items():
+            setattr(self, name, value)
+
+class SweepResults:
+    """
+    OLSSweep.fit 的結果。
+
+    Attributes
+    ----------
+        summary : pandas.DataFrame
+            index 為規格名稱（以 ' + ' 連接的變數），欄位為參數個數 k、nobs、df_resid、
+            殘差平方和 ssr、llf、aic、bic、rsquared 與 rsquared_adj。
+            共線（X'X 不可逆）的規格統計量為 NaN。
+        params, bse, pvalues : pandas.DataFrame
+            index 為規格名稱，欄位為所有變數，規格沒有的變數為 NaN。
+    """
+    def __init__(self, summary, params, bse, pvalues):
+        self.summary = summary
+        self.params = params
+        self.bse = bse
+        self.pvalues = pvalues
+
+    def best(self, criterion='bic', n=10):
+        """
+        依資訊準則（aic、bic 越小越好）或 rsquared、rsquared_adj（越大越好）排出前 n 個規格。
+        """
+        ascending = criterion not in ('rsquared', 'rsquared_adj', 'llf')
+        return self.summary.sort_values(criterion, ascending=ascending, kind='stable').head(n)
+
+    def result(self, spec):
+        """
+        取出單一規格的結果（SweepResult），spec 為規格名稱或 summary 的位置。
+        """
+        if not isinstance(spec, str):
+            spec = self.summary.index[spec]
+        variables = self.params.loc[spec].dropna().index
+        row = self.summary.loc[spec]
+        return SweepResult(self.params.loc[spec, variables], self.bse.loc[spec, variables],
+                           self.pvalues.loc[spec, variables],
+                           **{name: row[name] for name in self.summary.columns if name != 'k'},
+                           df_model=row['k'] - ('const' in variables))
+
+    def results(self, specs):
+        """
+        多個規格的 {規格名稱: SweepResult}，例如 regression_table(sweep.results(sweep.best().index))。
+        """
+        return {spec: self.result(spec) for spec in specs}
+
+class OLSSweep:
+    """
+    對同一個被解釋變數一次估計大量 OLS 規格（解釋變數的子集合與交乘項）。
+
+    只計算一次全部候選變數的交叉乘積矩陣 X'X 與 X'y，每個規格從其子區塊求解，
+    不再對每個規格重新建立設計矩陣並呼叫 sm.OLS().fit()。
+    規格依變數位置排序後，相鄰規格共用前綴，因此 Cholesky 因子 L（即 X 的 QR 分解中的 R'）
+    與 L^{-1}、L^{-1}X'y 只需在前綴之後逐欄加入（rank-one 擴充），移除欄位只是截斷，
+    每個規格的成本為 O(k^2)，與樣本數無關。
+
+    為了數值穩定，X 的每一欄先以其範數縮放，估計後再換回原本的尺度。
+    有缺值的列在所有規格中都會被剔除，使各規格的樣本相同、資訊準則可以比較。
+
+    係數、標準誤、p 值、對數概似、AIC、BIC 與 R-squared 的定義與 statsmodels 的 OLS 相同
+    （包含 const 欄的規格使用中心化的總平方和）。
+
+    Parameters
+    ----------
+        df : pandas.DataFrame
+            資料集。
+        dependent : str
+            被解釋變數。
+        columns : list of str
+            候選的解釋變數（包含常數項 'const'），可以包含 'A:B' 形式的交乘項。
+        interactions : bool
+            另外加入 columns 中（常數項以外）所有兩兩交乘項。
+    """
+    def __init__(self, df, dependent, columns, interactions=False):
+        columns = list(columns)
+        if interactions:
+            main = [column for column in columns if column != 'const' and ':' not in column]
+            columns += [f'{a}:{b}' for a, b in combinations(main, 2) if f'{a}:{b}' not in columns]
+        self.dependent = dependent
+        self.columns = columns
+        self.positions = {column: j for j, column in enumerate(columns)}
+
+        used = sorted({name for column in columns for name in column.split(':')} | {dependent})
+        df = df[used].dropna()
+        X = design_matrix(df, columns)
+        y = df[dependent].to_numpy(dtype=float)
+        self.nobs = len(y)
+
+        norms = np.sqrt(np.einsum('ij,ij->j', X, X))
+        self.scale = np.where(norms > 0, norms, 1.0)
+        Z = np.column_stack([X / self.scale, y])
+        cross = Z.T @ Z
+        self.xtx = cross[:-1, :-1]
+        self.xty = cross[:-1, -1]
+        self.yty = cross[-1, -1]
+        self.centered_tss = np.sum((y - y.mean()) ** 2)
+
+    def fit(self, specs=None, tol=1e-10):
+        """
+        估計每一個規格。
+
+        Parameters
+        ----------
+            specs : iterable of list of str, optional
+                每個規格的解釋變數，預設為 all_specifications(columns 中 const 以外的變數)。
+            tol : float
+                新加入的欄位與前面欄位的殘差平方（相對於縮放後的 1）小於 tol 時視為共線。
+
+        Returns
+        -------
+            SweepResults
+        """
+        if specs is None:
+            specs = all_specifications([column for column in self.columns if column != 'const'],
+                                       required=('const',) if 'const' in self.positions else ())
+        keys = sorted({tuple(sorted(self.positions[column] for column in spec)) for spec in specs})
+        n_specs, p = len(keys), len(self.columns)
+
+        coef = np.full((n_specs, p), np.nan)
+        inverse_diag = np.full((n_specs, p), np.nan)
+        ssr = np.full(n_specs, np.nan)
+        k = np.array([len(key) for key in keys])
+
+        kmax = k.max() if n_specs else 0
+        Linv = np.zeros((kmax, kmax))
+        z = np.zeros(kmax)
+        singular = np.zeros(kmax + 1, dtype=bool)
+        previous = ()
+        for i, key in enumerate(keys):
+            # 與上一個規格共用的前綴不必重新分解。
+            common = 0
+            while common < min(len(key), len(previous)) and key[common] == previous[common]:
+                common += 1
+            for level in range(common, len(key)):
+                j = key[level]
+                l = Linv[:level, :level] @ self.xtx[key[:level], j]
+                d2 = self.xtx[j, j] - l @ l
+                singular[level + 1] = singular[level] or d2 <= tol
+                d = np.sqrt(max(d2, tol))
+                Linv[level, :level] = -(l @ Linv[:level, :level]) / d
+                Linv[level, level] = 1 / d
+                z[level] = (self.xty[j] - l @ z[:level]) / d
+            previous = key
+            size = len(key)
+            if singular[size]:
+                continue
+            coef[i, key] = Linv[:size, :size].T @ z[:size]
+            inverse_diag[i, key] = np.einsum('ij,ij->j', Linv[:size, :size], Linv[:size, :size])
+            ssr[i] = self.yty - z[:size] @ z[:size]
+
+        n = self.nobs
+        has_const = np.array(['const' in self.positions and self.positions['const'] in key
+                              for key in keys], dtype=bool)
+        df_resid = n - k
+        sigma2 = ssr / df_resid
+        params = coef / self.scale
+        bse = np.sqrt(inverse_diag * sigma2[:, None]) / self.scale
+        pvalues = 2 * stats.t.sf(np.abs(params / bse), df_resid[:, None])
+        llf = -n / 2 * (np.log(2 * np.pi) + np.log(ssr / n) + 1)
+        tss = np.where(has_const, self.centered_tss, self.yty)
+        rsquared = 1 - ssr / tss
+        rsquared_adj = 1 - (n - has_const) / df_resid * (1 - rsquared)
+
+        index = pd.Index([' + '.join(self.columns[j] for j in key) for key in keys], name='spec')
+        summary = pd.DataFrame({'k': k, 'nobs': n, 'df_resid': df_resid, 'ssr': ssr, 'llf': llf,
+                                'aic': -2 * llf + 2 * k, 'bic': -2 * llf + np.log(n) * k,
+                                'rsquared': rsquared, 'rsquared_adj': rsquared_adj}, index=index)
+        frame = lambda values: pd.DataFrame(values, index=index, columns=self.columns)
+        return SweepResults(summary, frame(params), frame(bse), frame(pvalues))
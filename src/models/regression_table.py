@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from .format_significance import significance_stars
+
+# 表格下方的模型統計量：列名稱 -> (結果物件的屬性, 格式)。
+MODEL_STATISTICS = {
+    'Observations': ('nobs', '{:.0f}'),
+    'AIC': ('aic', '{:.0f}'),
+    'BIC': ('bic', '{:.0f}'),
+    'R-squared': ('rsquared', '{:.3f}'),
+    'Adj R-squared': ('rsquared_adj', '{:.3f}')
+}
+
+def model_arrays(model):
+    """
+    取出結果物件的變數名稱與 params、bse、pvalues 陣列。
+
+    statsmodels 的結果物件每次讀取屬性都會包裝成 pandas 物件，因此直接讀取其內部
+    的 numpy 結果（_results）；變數名稱來自 model.model.exog_names，
+    沒有 model 的物件則使用 params 的 index。
+    """
+    results = getattr(model, '_results', model)
+    if hasattr(model, 'model'):
+        names = model.model.exog_names
+    else:
+        names = list(model.params.index)
+    return (names, np.asarray(results.params, dtype=float), np.asarray(results.bse, dtype=float),
+            np.asarray(results.pvalues, dtype=float))
+
+def summary_values(values, prec):
+    """
+    數值在 statsmodels summary() 表格中顯示的值（同 statsmodels.iolib.summary.forg）：
+    prec 位小數，絕對值 >= 1e4 或 < 1e-4 時改為 prec 位有效數字。
+
+    原本的表格由 summary() 的文字再取 3 位小數，先經過這一次進位；
+    例如係數 0.09052 在 summary() 中為 0.0905，表格中為 0.090 而不是 0.091。
+    """
+    values = np.asarray(values, dtype=float)
+    scientific = (np.abs(values) >= 1e4) | (np.abs(values) < 1e-4)
+    return np.where(scientific,
+                    np.char.mod(f'%.{prec}g', values).astype(float),
+                    np.char.mod(f'%.{prec}f', values).astype(float))
+
+def regression_table(models, model_names=None, digits=3, statistics=MODEL_STATISTICS,
+                     summary_rounding=True):
+    """
+    將多個迴歸結果整理成一個符合論文格式的多欄 DataFrame，可直接傳入 generate_latex_table。
+
+    直接讀取結果物件的 params、bse、pvalues 與 nobs、aic、bic、rsquared 等屬性，
+    不產生 summary() 文字表格；所有模型依變數名稱對齊（取聯集，依出現順序排列），
+    模型沒有的變數留白。每個變數佔兩列：係數加顯著性標記，以及括弧內的標準誤（'<變數>_stderr'）。
+
+    Parameters
+    ----------
+        models : list or dict
+            statsmodels 的 RegressionResults，或任何具有上述屬性的物件；
+            dict 時以 key 作為模型名稱。
+        model_names : list of str, optional
+            各模型的欄位名稱，預設為 (1), (2), ...。
+        digits : int
+            係數與標準誤的小數位數。
+        statistics : dict
+            表格下方的統計量，列名稱 -> (屬性, 格式)；結果物件沒有的屬性留白。
+        summary_rounding : bool
+            是否先依 summary() 的顯示進位（係數 4 位、標準誤 3 位、p 值 3 位小數，見 summary_values），
+            與原本由 summary() 文字建立的論文表格數字一致；False 時由完整精度直接進位。
+
+    Returns
+    -------
+        DataFrame
+            index 為變數、標準誤與統計量，columns 為模型名稱。
+    """
+    if isinstance(models, dict):
+        model_names = list(models)
+        models = list(models.values())
+    if model_names is None:
+        model_names = [f'({i})' for i in range(1, len(models) + 1)]
+
+    # 以聯集對齊所有模型的變數。
+    arrays = [model_arrays(model) for model in models]
+    positions = {}
+    for names, *_ in arrays:
+        for name in names:
+            positions.setdefault(name, len(positions))
+    variables = list(positions)
+    params, bse, pvalues = (np.full((len(variables), len(models)), np.nan) for _ in range(3))
+    for j, (names, model_params, model_bse, model_pvalues) in enumerate(arrays):
+        rows = [positions[name] for name in names]
+        params[rows, j] = model_params
+        bse[rows, j] = model_bse
+        pvalues[rows, j] = model_pvalues
+
+    missing = np.isnan(params)
+    if summary_rounding:
+        params, bse = summary_values(params, 4), summary_values(bse, 3)
+        pvalues = np.char.mod('%.3f', pvalues).astype(float)
+    coef = np.char.add(np.char.mod(f'%.{digits}f', params), significance_stars(pvalues))
+    stderr = np.char.add(np.char.add('(', np.char.mod(f'%.{digits}f', bse)), ')')
+
+    # 係數與標準誤交錯排列。
+    body = np.empty((2 * len(variables), len(models)), dtype=object)
+    body[0::2] = np.where(missing, '', coef)
+    body[1::2] = np.where(missing, '', stderr)
+    index = np.empty(2 * len(variables), dtype=object)
+    index[0::2] = variables
+    index[1::2] = [f'{variable}_stderr' for variable in variables]
+
+    results = [getattr(model, '_results', model) for model in models]
+    stats = [[fmt.format(getattr(result, attribute)) if hasattr(result, attribute) else ''
+              for result in results]
+             for attribute, fmt in statistics.values()]
+
+    return pd.DataFrame(np.vstack([body, np.array(stats, dtype=object).reshape(-1, len(models))]),
+                        index=[*index, *statistics], columns=model_names)
@@ -1,7 +1,22 @@
-from .pass_to_scraper import pass_to_scraper
-from .players_data_scraper import players_data_scraper
+# Submodules are imported on first attribute access, so importing the package loads
+# neither pandas nor requests and does no I/O.
+import importlib
 
-__all__ = [
-    'pass_to_scraper',
-    'players_data_scraper'
-]
+_exports = {
+    'NBAPassScraper'        : 'pass_to_scraper',
+    'scrape_pass_data'      : 'pass_to_scraper',
+    'NBAScraper'            : 'players_data_scraper',
+    'scrape_season_players' : 'players_data_scraper'
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_exports[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
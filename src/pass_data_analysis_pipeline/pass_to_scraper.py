@@ -4,8 +4,18 @@
 # Parameters are appended to the URL after the `?` to specify the desired data.
 import requests
 import json
+import time
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from tqdm import tqdm 
+from pathlib import Path
+from utils import get_client, result_set_frame, ScrapeJournal, ScrapeManifest, MANIFEST_NAME
+
+# Responses worth retrying: throttling and server errors.
+RETRY_STATUS = {429, 500, 502, 503, 504}
 
 # The 'pass_to' and 'pass_from' data are complementary; only 'pass_to' data is used here.
 class NBAPassScraper:
@@ -27,9 +37,12 @@ class NBAPassScraper:
         The endpoint URL for scraping NBA player passing data.
     parameters : dict
         The parameters required for the API request.
+    timeout : float, optional
+        Seconds to wait for the server; None waits forever.
     """
-    def __init__(self, season, player_id):
+    def __init__(self, season, player_id, timeout=None):
         self.season = season 
+        self.timeout = timeout
         self.url = 'https://stats.nba.com/stats/playerdashptpass'
         self.parameters = {
                 'Season': season,
@@ -49,18 +62,13 @@ class NBAPassScraper:
                 'VsConference': None,
                 'VsDivision': None
         }
-        self.headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
-                'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-                'Referer': 'https://www.nba.com/',
-        }
     
     def scraper(self):
-        response = requests.get(
+        # The shared client keeps connections alive and goes through the response cache.
+        dict_data = get_client().get_json(
             url     = self.url,
             params  = self.parameters,
-            headers = self.headers)
-        dict_data = json.loads(response.text)
+            timeout = self.timeout)
         return dict_data
     
     def split_name(self, name):
@@ -76,43 +84,247 @@ class NBAPassScraper:
     
     def clean_data(self):
         dict_data = self.scraper()
-        columns   = dict_data['resultSets'][0]['headers']
-        data      = dict_data['resultSets'][0]['rowSet']
-        df        = pd.DataFrame(data = data, columns = columns)
+        df        = result_set_frame(dict_data)
         
         df['PLAYER_NAME_LAST_FIRST'] = df['PLAYER_NAME_LAST_FIRST'].apply(lambda x : self.split_name(x))
         df['PASS_TO'] = df['PASS_TO'].apply(lambda x : self.split_name(x))
         df['season'] = self.season
         return df
    
-#%%
-import os
-import sys
-from pathlib import Path
-# Set up the project root directory and append to system path for module imports
-current_working_directory = Path(os.getcwd())
-project_root = current_working_directory.parents[1]
-sys.path.append(str(project_root / 'src'))
-
-# Define the directory for data storage
-data_dir = project_root / 'data'
-season_list = [f'{year}-{str(year+1)[-2:]}' for year in range(2013, 2022)]
-# Expected output DataFrame structure
-expect_columns = ['season', 'PLAYER_ID', 'PLAYER_NAME_LAST_FIRST', 'TEAM_ID', 'TEAM_NAME', 'TEAM_ABBREVIATION', 'PASS_TYPE', 'G', 'PASS_TEAMMATE_PLAYER_ID', 'PASS_TO', 'FREQUENCY', 'PASS', 'AST', 'FGM', 'FGA', 'FG_PCT', 'FG2M', 'FG2A', 'FG2_PCT', 'FG3M', 'FG3A', 'FG3_PCT']
-expect_df = pd.DataFrame(columns=expect_columns)
-
-#%% Generate DataFrame for all players' passing data from 2014 to 2022
-# 2024/07/25 Update: Search only for players who actually played each season. 
-# This approach scrapes 11 seasons in about 100 minutes.
-with open(data_dir / 'season_players_id_14_22.json', 'r') as json_file:
-    season_players_dict = json.load(json_file)
-
-for season in tqdm(season_list, desc='Seasons'):
-    for player_id, player in tqdm(season_players_dict[season].items(),
-                                  desc='Players', leave=False):
-        print(f'Scraping passing data for {player} in the {season} season')
-        processor = NBAPassScraper(season, player_id)
-        df = processor.clean_data()
-        expect_df = pd.concat([expect_df, df])
-
-# expect_df.to_csv(data_dir / 'pass_data_14_22.csv', index=False)
+class TokenBucket:
+    """
+    An asyncio token bucket: requests take one token each, and tokens refill at a steady
+    rate up to a burst capacity.
+
+    Parameters
+    ----------
+    rate : float
+        Tokens added per second.
+    capacity : float, optional
+        The largest burst, rate by default (at least 1).
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def retry_delay(error, attempt, backoff):
+    """
+    Seconds to wait before retrying: the server's Retry-After when it sends one, otherwise
+    exponential backoff with jitter. Returns None when the error should not be retried.
+    """
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        if response is None or response.status_code not in RETRY_STATUS:
+            return None
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return float(retry_after)
+    elif not isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return None
+    return backoff * 2 ** attempt * (0.5 + random.random())
+
+async def scrape_pass_data_async(units, concurrency=8, rate=4.0, burst=None, max_retries=5,
+                                 backoff=1.0, timeout=30, on_result=None):
+    """
+    Scrape many (season, player_id) units concurrently.
+
+    At most `concurrency` requests are in flight, requests start at no more than `rate` per
+    second (token bucket with capacity `burst`), and throttled (429), failed (5xx) or timed
+    out requests are retried with exponential backoff.
+
+    Parameters
+    ----------
+    units : list of tuple
+        (season, player_id) pairs.
+    concurrency : int
+        The maximum number of requests in flight.
+    rate : float
+        The maximum number of requests started per second.
+    burst : float, optional
+        The token bucket capacity, rate by default.
+    max_retries : int
+        Retries per unit before its error is raised.
+    backoff : float
+        The first retry delay in seconds; it doubles with every retry.
+    timeout : float
+        Seconds to wait for each response.
+    on_result : callable, optional
+        Called as on_result(season, player_id, df) as soon as a unit completes.
+
+    Returns
+    -------
+    list of pandas.DataFrame
+        One DataFrame per unit, in the order of units.
+    """
+    loop = asyncio.get_running_loop()
+    bucket = TokenBucket(rate, burst)
+    semaphore = asyncio.Semaphore(concurrency)
+    progress = tqdm(total=len(units), desc='Players')
+
+    async def fetch(executor, season, player_id):
+        processor = NBAPassScraper(season, player_id, timeout=timeout)
+        for attempt in range(max_retries + 1):
+            try:
+                async with semaphore:
+                    await bucket.acquire()
+                    df = await loop.run_in_executor(executor, processor.clean_data)
+            except Exception as error:
+                delay = retry_delay(error, attempt, backoff)
+                if delay is None or attempt == max_retries:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            progress.update()
+            if on_result is not None:
+                on_result(season, player_id, df)
+            return df
+
+    # The blocking requests run on a pool with one thread per request in flight.
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            return await asyncio.gather(*(fetch(executor, season, player_id)
+                                          for season, player_id in units))
+        finally:
+            progress.close()
+
+def scrape_pass_data(data_dir, seasons=None, output=None, mode='sync', journal_dir=None,
+                     refresh=False, **options):
+    """
+    Scrape the passing data of every player who appeared in each season.
+
+    2024/07/25 Update: Search only for players who actually played each season.
+    This approach scrapes 11 seasons in about 100 minutes; mode='async' runs the requests
+    concurrently under a rate limit instead.
+
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        The data root holding 'season_players_id_14_22.json'.
+    seasons : list of str, optional
+        Seasons in the format 'YYYY-YY', 2013-14 to 2021-22 by default.
+    output : str or pathlib.Path, optional
+        Where the CSV is written, 'pass_data_14_22.csv' under data_dir by default.
+    mode : str
+        'sync' scrapes one player at a time, 'async' uses scrape_pass_data_async.
+    journal_dir : str or pathlib.Path, optional
+        A utils.ScrapeJournal folder. Every completed player is appended to it, a restart
+        skips the players already there, and the CSV is consolidated from it in one pass;
+        players scraped before a restart are recorded in the scrape manifest then.
+        The journal is cleared once the CSV and the manifest are written.
+    refresh : bool
+        Re-scrape only the players whose games played changed since they were last scraped
+        (and, in completed seasons, players missing from the existing CSV) and merge them
+        into it in place. Refresh the season players first; their games played are taken
+        from the scrape manifest.
+    **options
+        Passed on to scrape_pass_data_async (concurrency, rate, burst, max_retries, ...).
+
+    Returns
+    -------
+    pandas.DataFrame
+        All players' passing data.
+    """
+    if mode not in ('sync', 'async'):
+        raise ValueError(f"mode must be 'sync' or 'async', got {mode!r}")
+    data_dir = Path(data_dir)
+    output = output or data_dir / 'pass_data_14_22.csv'
+    seasons = seasons or [f'{year}-{str(year+1)[-2:]}' for year in range(2013, 2022)]
+    # Expected output DataFrame structure
+    expect_columns = ['season', 'PLAYER_ID', 'PLAYER_NAME_LAST_FIRST', 'TEAM_ID', 'TEAM_NAME', 'TEAM_ABBREVIATION', 'PASS_TYPE', 'G', 'PASS_TEAMMATE_PLAYER_ID', 'PASS_TO', 'FREQUENCY', 'PASS', 'AST', 'FGM', 'FGA', 'FG_PCT', 'FG2M', 'FG2A', 'FG2_PCT', 'FG3M', 'FG3A', 'FG3_PCT']
+    expect_df = pd.DataFrame(columns=expect_columns)
+
+    with open(data_dir / 'season_players_id_14_22.json', 'r') as json_file:
+        season_players_dict = json.load(json_file)
+
+    units = [(season, player_id)
+             for season in seasons for player_id in season_players_dict[season]]
+    unit_key = lambda season, player_id: ScrapeJournal.unit_key('playerdashptpass', season, player_id)
+    manifest = ScrapeManifest(data_dir / MANIFEST_NAME)
+    games_played = {}
+    for season in seasons:
+        entry = manifest.get(ScrapeJournal.unit_key('leaguedashplayerstats', season)) or {}
+        games_played[season] = entry.get('players_gp', {})
+    existing_df = None
+    if refresh and Path(output).exists():
+        # Read as text so the kept rows are written back exactly as they were.
+        existing_df = pd.read_csv(output, dtype=str, keep_default_na=False)
+        present = set(zip(existing_df['season'], existing_df['PLAYER_ID']))
+        units = [(season, player_id) for season, player_id in units
+                 if manifest.stale(unit_key(season, player_id), season,
+                                   upstream=games_played[season].get(player_id),
+                                   present=(season, player_id) in present)]
+        print(f'Refreshing {len(units)} players')
+
+    journal = ScrapeJournal(journal_dir) if journal_dir is not None else None
+    done = journal.completed() if journal is not None else set()
+    pending = [unit for unit in units if unit_key(*unit) not in done]
+
+    def on_result(season, player_id, df):
+        record = {'columns': df.columns.tolist(), 'rows': df.values.tolist()}
+        manifest.record(unit_key(season, player_id), record, rows=len(df),
+                        upstream=games_played[season].get(player_id))
+        if journal is not None:
+            journal.record(unit_key(season, player_id), record)
+
+    if mode == 'async':
+        dfs = asyncio.run(scrape_pass_data_async(pending, on_result=on_result, **options))
+    else:
+        dfs = []
+        for season, player_id in tqdm(pending, desc='Players'):
+            player = season_players_dict[season][player_id]
+            print(f'Scraping passing data for {player} in the {season} season')
+            processor = NBAPassScraper(season, player_id)
+            dfs.append(processor.clean_data())
+            on_result(season, player_id, dfs[-1])
+
+    if journal is not None:
+        # Rebuild every player's rows from the journal, in the original order, in one pass.
+        records = journal.load()
+        dfs = []
+        columns, rows = None, []
+        for unit in units:
+            record = records[unit_key(*unit)]
+            if unit_key(*unit) in done:
+                # Scraped before an interrupted run, so not yet in the manifest.
+                manifest.record(unit_key(*unit), record, rows=len(record['rows']),
+                                upstream=games_played[unit[0]].get(unit[1]))
+            if record['columns'] != columns and rows:
+                dfs.append(pd.DataFrame(rows, columns=columns))
+                rows = []
+            columns = record['columns']
+            rows.extend(record['rows'])
+        if rows:
+            dfs.append(pd.DataFrame(rows, columns=columns))
+
+    # Concatenate once at the end instead of growing the DataFrame for every player.
+    expect_df = pd.concat([expect_df] + dfs)
+    if existing_df is not None:
+        # Replace the refreshed players' rows and keep every row in season and player order.
+        refreshed = pd.Series(list(zip(existing_df['season'], existing_df['PLAYER_ID'])))
+        kept_df = existing_df[~refreshed.isin(set(units)).to_numpy()]
+        expect_df = pd.concat([kept_df, expect_df], ignore_index=True)
+        order = {unit: position for position, unit in enumerate(
+            (season, player_id) for season in season_players_dict
+            for player_id in season_players_dict[season])}
+        position = [order.get(unit, -1)
+                    for unit in zip(expect_df['season'], expect_df['PLAYER_ID'].astype(str))]
+        expect_df = expect_df.iloc[np.argsort(position, kind='stable')]
+    expect_df.to_csv(output, index=False)
+    manifest.save()
+    if journal is not None:
+        journal.clear()
+    return expect_df
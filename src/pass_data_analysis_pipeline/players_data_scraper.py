@@ -1,35 +1,30 @@
 # The specific endpoint for this data is https://stats.nba.com/stats/leaguedashplayerstats?
 # The `leaguedashplayerstats` is an endpoint where the NBA website stores different types of data.
 # Parameters are appended to the URL after the `?` to specify the desired data.
-import requests
 import json
 import time
+from collections import defaultdict
+from pathlib import Path
 import pandas as pd
 from tqdm import tqdm
+from utils import (get_client, result_set_frame, season_completed, ScrapeJournal,
+                   ScrapeManifest, MANIFEST_NAME)
 
 class NBAScraper:
     def __init__(self, endpoint: str, parameters: dict):
         self.url = f'https://stats.nba.com/stats/{endpoint}'
         self.parameters = parameters
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.nba.com/',
-        }
     
     def scraper(self):
-        response = requests.get(
+        # The shared client keeps connections alive and goes through the response cache.
+        raw_dict_data = get_client().get_json(
             url     = self.url,
-            params  = self.parameters,
-            headers = self.headers)
-        raw_dict_data = json.loads(response.text)
+            params  = self.parameters)
         return raw_dict_data
     
     def get_data(self):
         raw_dict_data = self.scraper()
-        columns = raw_dict_data['resultSets'][0]['headers'] # data columns
-        data    = raw_dict_data['resultSets'][0]['rowSet']  # data location
-        df      = pd.DataFrame(data=data, columns=columns)
+        df = result_set_frame(raw_dict_data)
         return df
 
 #%% 
@@ -83,58 +78,86 @@ class NBAScraper:
 #%%
 # Obtain the player IDs of all players with recorded appearances for the current season,
 # and efficiently scrape the interactive passing data for each season.
-from collections import defaultdict
-import os
-import sys
-from pathlib import Path
-# Set up the project root directory and append to system path for module imports
-current_working_directory = Path(os.getcwd())
-project_root = current_working_directory.parents[1]
-sys.path.append(str(project_root / 'src'))
+def scrape_season_players(data_dir, seasons=None, refresh=False):
+    """
+    Scrape the IDs and names of all players with recorded appearances in each season
+    and save them to 'season_players_id_14_22.json'.
+
+    Every season is recorded in the scrape manifest together with each player's and each
+    team's games played, which refreshes of the pass and lineups data compare against.
 
-# Define the directory for data storage
-data_dir = project_root / 'data'
-season_players_dict = defaultdict(dict)
-seasons = [f'{year}-{str(year+1)[-2:]}' for year in range(2013, 2022)]
-season_type = 'Regular Season'
-per_mode = 'Totals'
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        The data root.
+    seasons : list of str, optional
+        Seasons in the format 'YYYY-YY', 2013-14 to 2021-22 by default.
+    refresh : bool
+        Re-scrape only the seasons still in progress (and seasons missing from the existing
+        JSON) and merge them into it in place.
 
-for season in tqdm(seasons):
-    parameters = {
-        'LastNGames': '0', 
-        'LeagueID': '00',
-        'MeasureType': 'Base',
-        'Month': '0',
-        'TeamID': '0',
-        'OpponentTeamID': '0',
-        'PORound': '0',
-        'Period': '0',
-        'PaceAdjust': 'N',
-        'PlusMinus': 'N',
-        'Rank': 'N',
-        'Season': f'{season}',
-        'SeasonType': f'{season_type}',
-        'PerMode': f'{per_mode}'
-    }
-    processor = NBAScraper('leaguedashplayerstats', parameters)
-    df = processor.get_data()
-    df = df[['PLAYER_ID', 'PLAYER_NAME']]
-    df = df.rename(columns={'PLAYER_ID': 'player_id',
-                            'PLAYER_NAME': 'player'})
-    df['year'] = season
+    Returns
+    -------
+    dict
+        {season: {player_id: player}}.
+    """
+    data_dir = Path(data_dir)
+    output = data_dir / 'season_players_id_14_22.json'
+    manifest = ScrapeManifest(data_dir / MANIFEST_NAME)
+    season_players_dict = defaultdict(dict)
+    seasons = seasons or [f'{year}-{str(year+1)[-2:]}' for year in range(2013, 2022)]
+    season_type = 'Regular Season'
+    per_mode = 'Totals'
 
-    for index, row in df.iterrows():
-        year        = row['year']
-        player_id   = row['player_id']
-        player_name = row['player']
-        season_players_dict[year][player_id] = player_name
+    if refresh and output.exists():
+        with open(output, 'r') as json_file:
+            season_players_dict.update(json.load(json_file))
+        seasons = [season for season in seasons
+                   if season not in season_players_dict or not season_completed(season)]
+
+    for season in tqdm(seasons):
+        parameters = {
+            'LastNGames': '0', 
+            'LeagueID': '00',
+            'MeasureType': 'Base',
+            'Month': '0',
+            'TeamID': '0',
+            'OpponentTeamID': '0',
+            'PORound': '0',
+            'Period': '0',
+            'PaceAdjust': 'N',
+            'PlusMinus': 'N',
+            'Rank': 'N',
+            'Season': f'{season}',
+            'SeasonType': f'{season_type}',
+            'PerMode': f'{per_mode}'
+        }
+        processor = NBAScraper('leaguedashplayerstats', parameters)
+        df = processor.get_data()
+        # Games played are the upstream row counts of the passing and lineups data.
+        players_gp = {str(player_id): int(gp) for player_id, gp in zip(df['PLAYER_ID'], df['GP'])}
+        teams_gp = {str(team_id): int(gp) for team_id, gp in df.groupby('TEAM_ID')['GP'].sum().items()}
+        df = df[['PLAYER_ID', 'PLAYER_NAME']]
+        df = df.rename(columns={'PLAYER_ID': 'player_id',
+                                'PLAYER_NAME': 'player'})
+        df['year'] = season
 
-    time.sleep(1)
+        # A refreshed season replaces its previous players.
+        season_players_dict[season] = {}
+        for index, row in df.iterrows():
+            year        = row['year']
+            player_id   = row['player_id']
+            player_name = row['player']
+            season_players_dict[year][player_id] = player_name
 
-season_players_dict = dict(season_players_dict)
+        manifest.record(ScrapeJournal.unit_key('leaguedashplayerstats', season),
+                        season_players_dict[season], rows=len(df),
+                        players_gp=players_gp, teams_gp=teams_gp)
+        time.sleep(1)
 
-with open(data_dir / 'season_players_id_14_22.json', 'w') as json_file:
-    json.dump(season_players_dict, json_file, indent=4)
+    season_players_dict = dict(season_players_dict)
 
-# with open('data_dir / season_players_id_14_22.json', 'r') as json_file:
-#     season_players_dict = json.load(json_file)
+    with open(output, 'w') as json_file:
+        json.dump(season_players_dict, json_file, indent=4)
+    manifest.save()
+    return season_players_dict
@@ -1,5 +1,48 @@
-from .generate_latex_table import generate_latex_table
+# Submodules are imported on first attribute access, so importing the package loads
+# neither pandas nor requests and does no I/O.
+import sys
+import types
+import importlib
 
-__all__ = [
-    'generate_latex_table'
-]
+_exports = {
+    'generate_latex_table' : 'generate_latex_table',
+    'LineupKeyCodec'       : 'lineup_keys',
+    'group_ids_to_array'   : 'lineup_keys',
+    'ResponseCache'        : 'response_cache',
+    'CacheMissError'       : 'response_cache',
+    'cached_get'           : 'response_cache',
+    'season_completed'     : 'response_cache',
+    'set_response_cache'   : 'response_cache',
+    'get_response_cache'   : 'response_cache',
+    'ScrapeJournal'        : 'scrape_journal',
+    'ScrapeManifest'       : 'scrape_manifest',
+    'MANIFEST_NAME'        : 'scrape_manifest',
+    'data_digest'          : 'scrape_manifest',
+    'NBAStatsClient'       : 'stats_client',
+    'HEADERS'              : 'stats_client',
+    'result_set_frame'     : 'stats_client',
+    'get_client'           : 'stats_client',
+    'set_client'           : 'stats_client'
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_exports[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+class _Package(types.ModuleType):
+    # Importing a submodule binds it on the package; skip that for the submodules named after
+    # their export (e.g. generate_latex_table), so the name keeps resolving to the export.
+    def __setattr__(self, name, value):
+        if isinstance(value, types.ModuleType) and _exports.get(name) == name:
+            return
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _Package
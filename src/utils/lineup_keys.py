@@ -0,0 +1,138 @@
+import math
+import numpy as np
+import pandas as pd
+
+def group_ids_to_array(group_ids):
+    """
+    將 '-id-id-id-id-id-' 格式的陣容字串轉為球員 ID 陣列。
+
+    Parameters
+    ----------
+        group_ids : Series
+            陣容字串，例如 Lineups 資料的 GROUP_ID 或處理後的 Group。
+
+    Returns
+    -------
+        ndarray
+            (陣容數, 5) 的 int64 球員 ID 陣列，順序與字串相同。
+    """
+    return (pd.Series(group_ids)
+            .str.strip('-')
+            .str.split('-', expand=True)
+            .astype('int64')
+            .to_numpy())
+
+class LineupKeyCodec:
+    """
+    將五人陣容編碼為單一 int64 的 lineup key。
+
+    以資料集中出現過的球員建立連續編碼（依球員 ID 排序），
+    每個陣容的 5 個編碼排序後依序打包進一個 int64，
+    因此同一組球員不論原始順序都得到相同的 key，合併與分組時只需比較整數。
+
+    球員數上限：每個編碼佔 ceil(log2(球員數)) 位元，5 個編碼共 63 位元，
+    因此最多 4096 名球員（12 位元）以位元打包。超過時改以組合數系統編碼
+    （排序後的編碼 c1 < ... < c5 編為 C(c1, 1) + ... + C(c5, 5)），
+    只要 C(球員數, 5) 小於 2**63，即最多 16175 名球員；更多球員時拋出 ValueError。
+    組合數編碼要求陣容內的球員不重複。
+
+    Parameters
+    ----------
+        player_ids : array-like
+            資料集中所有球員 ID，可重複。
+        size : int
+            每個陣容的球員數，預設為 5。
+    """
+    def __init__(self, player_ids, size=5):
+        self.player_ids = np.unique(np.asarray(player_ids, dtype='int64'))
+        self.size = size
+        n_players = len(self.player_ids)
+        self.bits = max(1, int(np.ceil(np.log2(max(n_players, 2)))))
+        # binomials[k - 1, c] = C(c, k)，只在位元打包放不下時使用組合數編碼。
+        self.binomials = None
+        if self.bits * size > 63:
+            if math.comb(n_players, size) > 2 ** 63:
+                raise ValueError(
+                    f'{n_players} players do not fit {size} codes in one int64 key.'
+                )
+            self.binomials = np.array([[math.comb(code, k) for code in range(n_players)]
+                                       for k in range(1, size + 1)], dtype='int64')
+
+    def codes(self, player_ids):
+        """
+        將球員 ID 轉為連續編碼，找不到的 ID 會拋出 KeyError。
+        """
+        player_ids = np.asarray(player_ids, dtype='int64')
+        codes = np.searchsorted(self.player_ids, player_ids)
+        found = (codes < len(self.player_ids)) & (self.player_ids[np.minimum(codes, len(self.player_ids) - 1)] == player_ids)
+        if not found.all():
+            raise KeyError(f'Player IDs outside the code space: {np.unique(player_ids[~found]).tolist()}')
+        return codes
+
+    def encode(self, player_ids):
+        """
+        將 (陣容數, 5) 的球員 ID 陣列編碼為 lineup key。
+
+        Returns
+        -------
+            ndarray
+                int64 lineup key，陣容內球員順序不影響結果。
+        """
+        codes = np.sort(self.codes(player_ids), axis=1).astype('int64')
+        keys = np.zeros(len(codes), dtype='int64')
+        if self.binomials is not None:
+            if (np.diff(codes, axis=1) == 0).any():
+                raise ValueError('Lineups with a repeated player cannot be encoded.')
+            for slot in range(self.size):
+                keys += self.binomials[slot, codes[:, slot]]
+            return keys
+        for slot in range(self.size):
+            keys = (keys << self.bits) | codes[:, slot]
+        return keys
+
+    def decode(self, keys):
+        """
+        將 lineup key 還原為 (陣容數, 5) 的球員 ID 陣列，球員依 ID 由小到大排序。
+        """
+        keys = np.asarray(keys, dtype='int64')
+        codes = np.empty((len(keys), self.size), dtype='int64')
+        if self.binomials is not None:
+            # 由最大的編碼開始，每次取 C(c, k) 不超過剩餘值的最大 c。
+            for slot in range(self.size - 1, -1, -1):
+                codes[:, slot] = np.searchsorted(self.binomials[slot], keys, side='right') - 1
+                keys = keys - self.binomials[slot, codes[:, slot]]
+            return self.player_ids[codes]
+        mask = (1 << self.bits) - 1
+        for slot in range(self.size - 1, -1, -1):
+            codes[:, slot] = keys & mask
+            keys = keys >> self.bits
+        return self.player_ids[codes]
+
+    def encode_group_ids(self, group_ids):
+        """
+        將 '-id-id-id-id-id-' 格式的陣容字串編碼為 lineup key。
+        """
+        return self.encode(group_ids_to_array(group_ids))
+
+    def decode_group_ids(self, keys):
+        """
+        將 lineup key 還原為排序後的 '-id-id-id-id-id-' 陣容字串。
+        """
+        ids = pd.DataFrame(self.decode(keys)).astype(str)
+        return '-' + ids.agg('-'.join, axis=1) + '-'
+
+    def to_csv(self, path):
+        """
+        儲存編碼表（code 與 player_id），讓其他步驟使用相同的 key。
+        """
+        pd.DataFrame({
+            'code'     : np.arange(len(self.player_ids)),
+            'player_id': self.player_ids
+        }).to_csv(path, index=False)
+
+    @classmethod
+    def from_csv(cls, path, size=5):
+        """
+        讀取 to_csv 儲存的編碼表。
+        """
+        return cls(pd.read_csv(path)['player_id'], size=size)
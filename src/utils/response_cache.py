@@ -0,0 +1,198 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import tempfile
+import threading
+from datetime import date
+from pathlib import Path
+import requests
+
+class CacheMissError(LookupError):
+    """
+    離線模式下，快取中沒有對應請求的回應。
+    """
+
+def season_completed(season, today=None):
+    """
+    判斷球季是否已結束（'2021-22' 球季在 2022/07/01 之後視為結束）。
+
+    Parameters
+    ----------
+        season : str
+            球季，格式為 'YYYY-YY'。
+        today : date, optional
+            比較的日期，預設為今天。
+
+    Returns
+    -------
+        bool
+            球季是否已結束。
+    """
+    end_year = int(season[:4]) + 1
+    return (today or date.today()) >= date(end_year, 7, 1)
+
+def normalize_params(params):
+    """
+    將請求參數正規化：移除值為 None 的參數（requests 不會送出）、值轉為字串並依名稱排序，
+    讓相同的請求不論參數順序或型別都得到相同的快取 key。
+    """
+    return {name: str(value) for name, value in sorted(params.items()) if value is not None}
+
+class ResponseCache:
+    """
+    stats.nba.com 回應的磁碟快取。
+
+    以 endpoint 與正規化參數的 SHA-256 為 key，回應內容以 gzip 壓縮儲存，
+    旁邊的 .meta.json 記錄 url、參數與抓取時間。
+    已結束球季的資料不會再變動，因此永不過期；其他請求（例如進行中的球季）在 ttl 秒後過期。
+
+    Parameters
+    ----------
+        cache_dir : str or Path
+            快取資料夾。
+        ttl : float
+            未結束球季回應的有效秒數，預設 6 小時。
+        offline : bool
+            嚴格離線重播模式：只讀取快取（不論是否過期），快取中沒有的請求拋出 CacheMissError，
+            不會發出任何網路請求。
+    """
+    def __init__(self, cache_dir, ttl=6 * 3600, offline=False):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, url, params):
+        payload = json.dumps([url, normalize_params(params)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def paths(self, key):
+        folder = self.cache_dir / key[:2]
+        return folder / f'{key}.json.gz', folder / f'{key}.meta.json'
+
+    def expires(self, params):
+        """
+        回應的有效秒數；已結束球季回傳 None（永不過期）。
+        """
+        season = params.get('Season')
+        if season and season_completed(season):
+            return None
+        return self.ttl
+
+    def load(self, url, params):
+        """
+        讀取快取的回應內容，沒有或已過期時回傳 None（離線模式忽略過期）。
+        """
+        body_path, meta_path = self.paths(self.key(url, params))
+        if not body_path.exists() or not meta_path.exists():
+            return None
+        if not self.offline:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            ttl = self.expires(params)
+            if ttl is not None and time.time() - meta['fetched_at'] > ttl:
+                return None
+        with gzip.open(body_path, 'rb') as f:
+            return f.read()
+
+    def store(self, url, params, content):
+        """
+        寫入回應內容；先寫暫存檔再改名，中斷時不會留下不完整的快取。
+        """
+        body_path, meta_path = self.paths(self.key(url, params))
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {'url': url, 'params': normalize_params(params), 'fetched_at': time.time()}
+        for path, data in ((body_path, gzip.compress(content)),
+                           (meta_path, json.dumps(meta, ensure_ascii=False, indent=4).encode('utf-8'))):
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    def lookup(self, url, params, headers=None, timeout=None, fetch=None):
+        """
+        取得回應內容（bytes），優先使用快取，否則發出請求並寫入快取（只快取成功的回應）。
+
+        Parameters
+        ----------
+            fetch : callable, optional
+                快取沒有時發出請求的函式 fetch(url, params, headers, timeout)，回傳回應內容；
+                預設直接使用 requests.get。
+
+        Raises
+        ------
+            CacheMissError
+                離線模式下快取中沒有此請求。
+
+        Returns
+        -------
+            tuple of (bytes, bool)
+                回應內容，以及這次請求是否命中快取。多個執行緒共用快取時，應以此判斷命中，
+                而不是比較 hits 計數。
+        """
+        content = self.load(url, params)
+        with self.lock:
+            if content is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if content is not None:
+            return content, True
+        if self.offline:
+            raise CacheMissError(f'No cached response for {url} {normalize_params(params)}')
+        if fetch is None:
+            response = requests.get(url=url, params=params, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            content = response.content
+        else:
+            content = fetch(url, params, headers, timeout)
+        self.store(url, params, content)
+        return content, False
+
+    def get_content(self, url, params, headers=None, timeout=None, fetch=None):
+        """
+        同 lookup，但只回傳回應內容。
+        """
+        return self.lookup(url, params, headers, timeout, fetch)[0]
+
+    def get(self, url, params, headers=None, timeout=None):
+        """
+        同 get_content，但回傳解碼後的 JSON 文字。
+        """
+        return self.get_content(url, params, headers, timeout).decode('utf-8')
+
+_response_cache = None
+
+def set_response_cache(cache):
+    """
+    設定所有爬蟲共用的 ResponseCache；傳入 None 則停用快取。
+    """
+    global _response_cache
+    _response_cache = cache
+
+def get_response_cache():
+    """
+    取得共用的 ResponseCache。未設定時，若有環境變數 NBA_STATS_CACHE_DIR 則以其建立
+    （NBA_STATS_OFFLINE=1 開啟離線模式），否則回傳 None。
+    """
+    global _response_cache
+    if _response_cache is None and os.environ.get('NBA_STATS_CACHE_DIR'):
+        _response_cache = ResponseCache(os.environ['NBA_STATS_CACHE_DIR'],
+                                        offline=os.environ.get('NBA_STATS_OFFLINE') == '1')
+    return _response_cache
+
+def cached_get(url, params, headers=None, timeout=None):
+    """
+    所有爬蟲共用的 GET：經由共用的 NBAStatsClient（連線池），有共用快取時先經由快取。
+
+    Returns
+    -------
+        str
+            回應的 JSON 文字。
+    """
+    from .stats_client import get_client
+    return get_client().get_content(url, params, headers, timeout).decode('utf-8')
@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+
+class ScrapeJournal:
+    """
+    可續傳的爬蟲紀錄：每完成一個單位（endpoint, season, team/player）就把結果附加到分片檔。
+
+    每個單位寫成一行 '<key>\t<data JSON>\n'，以單次 write 附加並 fsync，
+    中斷時最多只留下最後一行不完整的資料，讀取時會忽略沒有換行結尾的行。
+    每次執行寫入新的分片檔，重新執行時跳過已完成的單位，最後再一次讀入所有分片合併成完整資料集。
+
+    Parameters
+    ----------
+        journal_dir : str or Path
+            分片檔所在的資料夾。
+        shard_size : int
+            每個分片檔最多的單位數，超過後換新檔。
+        fsync : bool
+            每個單位寫入後是否 fsync，確保斷電時也不會遺失已完成的單位。
+    """
+    def __init__(self, journal_dir, shard_size=1000, fsync=True):
+        self.journal_dir = Path(journal_dir)
+        self.shard_size = shard_size
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.shard = None
+        self.count = 0
+
+    @staticmethod
+    def unit_key(*parts):
+        """
+        單位的 key，例如 unit_key('playerdashptpass', '2021-22', 201939)。
+        """
+        return json.dumps([str(part) for part in parts])
+
+    def lines(self):
+        for path in sorted(self.journal_dir.glob('shard-*.jsonl')):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    # 沒有換行結尾代表寫入中斷，視為未完成。
+                    if line.endswith('\n'):
+                        yield line
+
+    def completed(self):
+        """
+        已完成單位的 key 集合（只解析每行的 key，不解析資料）。
+        """
+        return {line.partition('\t')[0] for line in self.lines()}
+
+    def load(self):
+        """
+        讀入所有分片，回傳 key 對應資料的 dict；同一單位出現多次時以最後一次為準。
+        """
+        records = {}
+        for line in self.lines():
+            key, _, data = line.partition('\t')
+            records[key] = json.loads(data)
+        return records
+
+    def record(self, key, data):
+        """
+        附加一個已完成的單位，可由多個執行緒同時呼叫。
+        """
+        line = f'{key}\t{json.dumps(data, ensure_ascii=False)}\n'
+        with self.lock:
+            if self.shard is None:
+                self.journal_dir.mkdir(parents=True, exist_ok=True)
+                name = f'shard-{time.time_ns()}-{os.getpid()}.jsonl'
+                self.shard = open(self.journal_dir / name, 'a', encoding='utf-8')
+            self.shard.write(line)
+            self.shard.flush()
+            if self.fsync:
+                os.fsync(self.shard.fileno())
+            self.count += 1
+            if self.count >= self.shard_size:
+                self.close_shard()
+
+    def close_shard(self):
+        if self.shard is not None:
+            self.shard.close()
+            self.shard = None
+            self.count = 0
+
+    def clear(self):
+        """
+        資料集寫出後刪除所有分片，下次執行重新開始。
+        """
+        with self.lock:
+            self.close_shard()
+            shutil.rmtree(self.journal_dir, ignore_errors=True)
@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from .response_cache import season_completed
+
+# 清單在資料夾中的預設檔名。
+MANIFEST_NAME = 'scrape_manifest.json'
+
+def data_digest(data):
+    """
+    資料的 SHA-256（以排序 key 的 JSON 表示計算），用來判斷重新抓取的結果是否有變動。
+    """
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ScrapeManifest:
+    """
+    爬蟲的紀錄清單：每個單位（endpoint, season, team/player）抓取的時間、資料摘要與筆數。
+
+    key 與 ScrapeJournal.unit_key 相同。除了摘要之外，每個單位可以記錄抓取當時的上游筆數
+    （upstream，例如球員的出賽場次），之後的 refresh 只重新抓取進行中球季裡上游筆數有變動的單位，
+    已結束球季的資料不會再變動，只補抓資料集中沒有的單位。
+
+    Parameters
+    ----------
+        path : str or Path
+            清單的 JSON 檔，不存在時視為空的清單。
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.units = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                self.units = json.load(f)
+
+    def get(self, key):
+        return self.units.get(key)
+
+    def record(self, key, data, rows, **extra):
+        """
+        記錄一個剛抓取的單位，可由多個執行緒同時呼叫。
+
+        Parameters
+        ----------
+            key : str
+                單位的 key。
+            data : object
+                可轉為 JSON 的單位資料，用來計算摘要。
+            rows : int
+                資料筆數。
+            **extra
+                其他要記錄的值，例如 upstream。
+
+        Returns
+        -------
+            bool
+                資料是否與上一次抓取不同（第一次抓取視為不同）。
+        """
+        digest = data_digest(data)
+        with self.lock:
+            previous = self.units.get(key)
+            self.units[key] = {'fetched_at': time.time(), 'digest': digest, 'rows': rows, **extra}
+        return previous is None or previous['digest'] != digest
+
+    def stale(self, key, season, upstream=None, present=False):
+        """
+        refresh 時此單位是否需要重新抓取。
+
+        已結束的球季只在資料集中沒有此單位（present 為 False）且清單中也沒有紀錄時重新抓取；
+        進行中的球季在沒有紀錄、不知道上游筆數（upstream 為 None）或上游筆數改變時重新抓取。
+        """
+        entry = self.units.get(key)
+        if season_completed(season):
+            return entry is None and not present
+        return entry is None or upstream is None or entry.get('upstream') != upstream
+
+    def save(self):
+        """
+        寫入清單；先寫暫存檔再改名，中斷時不會留下不完整的清單。
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix='.tmp-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.units, f, ensure_ascii=False, indent=4)
+            os.replace(tmp, self.path)
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from .response_cache import get_response_cache
+
+STATS_URL = 'https://stats.nba.com/stats'
+
+# 所有爬蟲共用的 headers；Accept-Encoding 只列出 urllib3 能解壓縮的格式（安裝 brotli 時包含 br）。
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+    'Referer': 'https://www.nba.com/',
+}
+
+def result_set_frame(raw_dict_data, result_set=0):
+    """
+    將 stats.nba.com 回應中的 resultSets 轉為 DataFrame。
+
+    Parameters
+    ----------
+        raw_dict_data : dict
+            解析後的回應 JSON。
+        result_set : int or str
+            resultSets 的位置或名稱，預設為第一個。
+            只有單一 resultSet（dict）的 endpoint 忽略此參數。
+
+    Returns
+    -------
+        pandas.DataFrame
+            欄位為 headers、資料為 rowSet 的 DataFrame。
+    """
+    result_sets = raw_dict_data.get('resultSets', raw_dict_data.get('resultSet'))
+    if isinstance(result_sets, dict):
+        table = result_sets
+    elif isinstance(result_set, str):
+        table = next(table for table in result_sets if table['name'] == result_set)
+    else:
+        table = result_sets[result_set]
+    return pd.DataFrame(data=table['rowSet'], columns=table['headers'])
+
+class NBAStatsClient:
+    """
+    所有爬蟲共用的 stats.nba.com 客戶端。
+
+    以同一個連線池保持連線（keep-alive），不必每個請求重新建立 TCP/TLS 連線；
+    要求壓縮傳輸，並直接從 bytes 解析 JSON。有共用的 ResponseCache 時先經由快取。
+    每個 endpoint 記錄請求數、快取命中、錯誤、狀態碼、耗時與傳輸量。
+
+    requests.Session 的 cookies 不是執行緒安全的，因此每個執行緒使用自己的 Session，
+    但都掛載同一個 HTTPAdapter，共用連線池。
+
+    Parameters
+    ----------
+        headers : dict, optional
+            請求的 headers，預設為 HEADERS。
+        pool_size : int
+            連線池保留的連線數，應不少於同時進行的請求數。
+        timeout : float, optional
+            預設的逾時秒數，None 表示一直等待。
+        base_url : str, optional
+            取代 STATS_URL 的網址，例如本機的模擬伺服器 'http://127.0.0.1:8000/stats'。
+    """
+    def __init__(self, headers=None, pool_size=16, timeout=None, base_url=None):
+        self.headers = dict(headers or HEADERS)
+        self.timeout = timeout
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.endpoints = defaultdict(lambda: {'requests': 0, 'cache_hits': 0, 'errors': 0,
+                                              'seconds': 0.0, 'bytes': 0, 'wire_bytes': 0,
+                                              'status': defaultdict(int)})
+
+    @property
+    def session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount('https://', self.adapter)
+            session.mount('http://', self.adapter)
+            self.local.session = session
+        return session
+
+    def record(self, endpoint, seconds, status=None, content=b'', wire_bytes=0, cache_hit=False):
+        with self.lock:
+            metrics = self.endpoints[endpoint]
+            metrics['requests'] += 1
+            metrics['seconds'] += seconds
+            metrics['bytes'] += len(content)
+            metrics['wire_bytes'] += wire_bytes
+            if cache_hit:
+                metrics['cache_hits'] += 1
+            elif status is None or status >= 400:
+                metrics['errors'] += 1
+            if status is not None:
+                metrics['status'][status] += 1
+
+    def resolve(self, url):
+        """
+        實際請求的網址：設定 base_url 時以它取代 STATS_URL。
+        """
+        if self.base_url is not None and url.startswith(STATS_URL):
+            return self.base_url + url[len(STATS_URL):]
+        return url
+
+    def fetch(self, url, params, headers=None, timeout=None):
+        """
+        經由連線池發出 GET 請求，回傳（已解壓縮的）回應內容。
+
+        Raises
+        ------
+            requests.HTTPError
+                回應狀態碼為 4xx 或 5xx。
+        """
+        endpoint = url.rstrip('/').rsplit('/', 1)[-1]
+        url = self.resolve(url)
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, headers=headers,
+                                        timeout=timeout if timeout is not None else self.timeout)
+        except requests.RequestException:
+            self.record(endpoint, time.perf_counter() - start)
+            raise
+        content = response.content
+        # urllib3 的 tell() 是實際從網路讀入（壓縮後）的位元組數。
+        wire_bytes = response.raw.tell() if hasattr(response.raw, 'tell') else len(content)
+        self.record(endpoint, time.perf_counter() - start, response.status_code, content, wire_bytes)
+        response.raise_for_status()
+        return content
+
+    def get_content(self, url, params, headers=None, timeout=None):
+        """
+        取得回應內容（bytes），有共用快取時優先使用快取。快取鍵使用實際請求的網址，
+        模擬伺服器的回應不會被當成 stats.nba.com 的回應重播。
+        """
+        url = self.resolve(url)
+        cache = get_response_cache()
+        if cache is None:
+            return self.fetch(url, params, headers, timeout)
+        start = time.perf_counter()
+        content, hit = cache.lookup(url, params, headers, timeout, fetch=self.fetch)
+        if hit:
+            endpoint = url.rstrip('/').rsplit('/', 1)[-1]
+            self.record(endpoint, time.perf_counter() - start, content=content, cache_hit=True)
+        return content
+
+    def get_json(self, url, params, headers=None, timeout=None):
+        """
+        取得回應並直接從 bytes 解析 JSON。url 可為完整網址或 endpoint 名稱（例如 'playerindex'）。
+        """
+        if '/' not in url:
+            url = f'{STATS_URL}/{url}'
+        return json.loads(self.get_content(url, params, headers, timeout))
+
+    def get_frame(self, url, params, result_set=0, headers=None, timeout=None):
+        """
+        取得回應並將 resultSets 轉為 DataFrame，見 result_set_frame。
+        """
+        return result_set_frame(self.get_json(url, params, headers, timeout), result_set)
+
+    def metrics(self):
+        """
+        每個 endpoint 的統計。
+
+        Returns
+        -------
+            pandas.DataFrame
+                index 為 endpoint，欄位為請求數、快取命中、錯誤、平均耗時（毫秒）、
+                總耗時、解壓縮後與網路傳輸的位元組數，以及各狀態碼的次數。
+        """
+        with self.lock:
+            rows = {endpoint: {'requests': metrics['requests'],
+                               'cache_hits': metrics['cache_hits'],
+                               'errors': metrics['errors'],
+                               'mean_ms': 1000 * metrics['seconds'] / metrics['requests'],
+                               'seconds': metrics['seconds'],
+                               'bytes': metrics['bytes'],
+                               'wire_bytes': metrics['wire_bytes'],
+                               **{f'status_{status}': count
+                                  for status, count in sorted(metrics['status'].items())}}
+                    for endpoint, metrics in self.endpoints.items()}
+        return pd.DataFrame.from_dict(rows, orient='index').fillna(0)
+
+    def reset_metrics(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def close(self):
+        self.adapter.close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def set_client(client):
+    """
+    設定所有爬蟲共用的 NBAStatsClient；傳入 None 則下次使用時重新建立。
+    """
+    global _client
+    with _client_lock:
+        _client = client
+
+def get_client():
+    """
+    取得所有爬蟲共用的 NBAStatsClient，未設定時以預設值建立
+    （有環境變數 NBA_STATS_BASE_URL 時以其取代 stats.nba.com）。
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = NBAStatsClient(base_url=os.environ.get('NBA_STATS_BASE_URL'))
+        return _client